@@ -0,0 +1,154 @@
+
+"""Benchmarks of the scoring, rent, DVF and finance hot paths on synthetic data.
+
+Each case is timed (best of --repeat) and run once more under tracemalloc for peak memory.
+Results can be saved as the baseline (bench/baseline.json) and compared against it; the
+exit code is 1 when a case is slower than baseline × (1 + tolerance).
+
+    python -m bench.run --sizes 1k,100k,1M
+    python -m bench.run --sizes 1k,100k --save        # refresh the stored baseline
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+from . import synthetic
+from core.dvf import build_dvf_index, dvf_price_gaps, price_gap_vs_dvf
+from core.finance import amortization_schedule, build_financing_table
+from core.params import load_params
+from core.rents import build_rent_index, estimate_rent_per_m2, estimate_rent_per_m2_batch
+from core.scoring import compute_scores
+
+BASELINE = Path(__file__).with_name("baseline.json")
+SCALAR_CALLS = 200  # per-row scalar functions are timed on a sample, reported per call
+
+def _data(n, seed=0):
+    cities = synthetic.make_cities(seed=seed)
+    params = load_params()
+    params["rent_bench_df"] = synthetic.rent_grid(cities, seed)
+    return {"listings": synthetic.listings(n, cities, seed), "params": params,
+            "dvf": synthetic.dvf_medians(cities, seed), "rates": synthetic.rates(seed=seed)}
+
+# Case name -> setup(data, n) returning (callable, items processed per call)
+def _compute_scores(d, n):
+    return lambda: compute_scores(d["listings"], d["params"]), n
+
+def _estimate_rent_batch(d, n):
+    l, bench = d["listings"], d["params"]["rent_bench_df"]
+    fallback = d["params"]["rpm2_fallback"]
+    return lambda: estimate_rent_per_m2_batch(l["city"], l["property_type"], build_rent_index(bench), fallback), n
+
+def _estimate_rent_scalar(d, n):
+    k = min(n, SCALAR_CALLS)
+    rows = d["listings"][["city", "property_type"]].head(k).astype(str).values.tolist()
+    bench, fallback = d["params"]["rent_bench_df"], d["params"]["rpm2_fallback"]
+    return lambda: [estimate_rent_per_m2(c, t, bench, fallback) for c, t in rows], k
+
+def _dvf_gaps_batch(d, n):
+    l = d["listings"]
+    return lambda: dvf_price_gaps(l, build_dvf_index(d["dvf"]), "price", "surface_m2", "city", "zipcode", "property_type"), n
+
+def _dvf_gap_scalar(d, n):
+    k = min(n, SCALAR_CALLS)
+    rows = d["listings"].head(k)[["price", "surface_m2", "city", "property_type"]].values.tolist()
+    dvf = d["dvf"]
+    return lambda: [price_gap_vs_dvf(p, s, str(c), dvf, str(t)) for p, s, c, t in rows], k
+
+def _amortization(d, n):
+    k = min(n, SCALAR_CALLS)
+    principals = np.linspace(50_000, 800_000, k)
+    return lambda: [amortization_schedule(p, 0.0311, 25, 0.003) for p in principals], k
+
+def _financing_table(d, n):
+    k = min(n, SCALAR_CALLS)
+    r = d["rates"].groupby("duration_years")["rate_percent"].mean() / 100.0
+    rates_by_years = r.to_dict()
+    principals = np.linspace(50_000, 800_000, k)
+    return lambda: [build_financing_table(p, rates_by_years, 0.003, [0, 50, 100, 200]) for p in principals], k
+
+CASES = {
+    "compute_scores": _compute_scores,
+    "estimate_rent_per_m2_batch": _estimate_rent_batch,
+    "estimate_rent_per_m2": _estimate_rent_scalar,
+    "dvf_price_gaps": _dvf_gaps_batch,
+    "price_gap_vs_dvf": _dvf_gap_scalar,
+    "amortization_schedule": _amortization,
+    "build_financing_table": _financing_table,
+}
+
+def run_case(fn, repeat=3):
+    """(best seconds over `repeat` runs, peak traced MB of one extra run)."""
+    fn()  # warm-up (imports, caches)
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+def run(sizes, cases=None, repeat=3, seed=0, log=print):
+    results = {}
+    for n in sizes:
+        data = _data(n, seed)
+        for name in cases or CASES:
+            fn, items = CASES[name](data, n)
+            seconds, peak_mb = run_case(fn, repeat)
+            key = f"{name}@{n}"
+            results[key] = {"seconds": seconds, "items_per_s": items / seconds, "peak_mb": peak_mb}
+            log(f"{key:<40} {seconds * 1000:>10.1f} ms {items / seconds:>14,.0f} /s {peak_mb:>9.1f} MB")
+        del data
+    return results
+
+def compare(results, baseline, tolerance=0.25):
+    """Print the speed ratio against the baseline; return the keys slower than allowed."""
+    slower = []
+    for key, r in results.items():
+        b = baseline.get("results", {}).get(key)
+        if not b:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "  <-- regression" if ratio > 1 + tolerance else ""
+        print(f"{key:<40} x{ratio:5.2f} time  x{r['peak_mb'] / max(b['peak_mb'], 1e-9):5.2f} mem{flag}")
+        if flag:
+            slower.append(key)
+    return slower
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks scoring / loyers / DVF / financement.")
+    ap.add_argument("--sizes", default="1k,100k", help="ex. 1k,100k,1M,10M")
+    ap.add_argument("--cases", help=f"parmi {','.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save", action="store_true", help="enregistrer comme baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--json", help="écrire les résultats dans ce fichier")
+    args = ap.parse_args(argv)
+    sizes = [synthetic.parse_size(s) for s in args.sizes.split(",")]
+    cases = args.cases.split(",") if args.cases else None
+    results = run(sizes, cases, args.repeat, args.seed)
+    report = {"python": sys.version.split()[0], "machine": platform.machine(), "numpy": np.__version__,
+              "results": results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.save:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"baseline -> {args.baseline}")
+    elif Path(args.baseline).exists():
+        slower = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if slower:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
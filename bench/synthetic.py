@@ -0,0 +1,140 @@
+
+"""Synthetic, seeded datasets shaped like the real inputs (listings, rent grid, DVF medians, rates).
+
+City popularity follows a Zipf law over a pool of real large cities followed by generated communes,
+so a few cities dominate while the long tail stays large, as in scraped listing feeds.
+
+    python -m bench.synthetic --rows 1M -o data/synthetic
+"""
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# city -> (€/m² purchase, number of zipcodes)
+MAJOR_CITIES = {
+    "Paris": (10000, 20), "Lyon": (5000, 9), "Marseille": (3500, 16), "Toulouse": (3600, 6), "Nice": (5000, 6),
+    "Nantes": (3800, 4), "Montpellier": (3700, 4), "Strasbourg": (3300, 4), "Bordeaux": (4500, 4), "Lille": (3500, 3),
+    "Rennes": (3900, 3), "Reims": (2500, 2), "Toulon": (3000, 3), "Saint-Étienne": (1400, 4), "Grenoble": (2700, 2),
+    "Dijon": (2800, 2), "Angers": (3000, 2), "Villeurbanne": (3800, 1), "Le Mans": (1900, 3), "Brest": (2200, 3),
+}
+# type -> (draw weight, mean surface m², sd surface, €/m² factor)
+PROPERTY_TYPES = {
+    "Studio": (0.14, 22, 5, 1.15), "T1": (0.06, 28, 5, 1.10), "T2": (0.26, 44, 8, 1.00), "T3": (0.24, 64, 10, 0.95),
+    "T4": (0.14, 82, 12, 0.92), "T5": (0.04, 105, 15, 0.90), "Maison": (0.12, 110, 35, 0.85),
+}
+GROSS_YIELD = 0.055  # typical annual rent / price, used to derive the rent grid
+
+def make_cities(n_cities=2000, seed=0):
+    """City table (city, price_sqm, n_zip, zip_base, weight) with Zipf popularity weights."""
+    rng = np.random.default_rng(seed)
+    names = list(MAJOR_CITIES)[:n_cities]
+    n_extra = max(n_cities - len(names), 0)
+    names += [f"Commune-{i:05d}" for i in range(n_extra)]
+    price = [MAJOR_CITIES[c][0] for c in names[:len(MAJOR_CITIES)]]
+    price = np.r_[price, rng.lognormal(np.log(2200), 0.35, n_extra).round(-1)][:len(names)]
+    n_zip = np.r_[[MAJOR_CITIES[c][1] for c in names[:len(MAJOR_CITIES)]], np.ones(n_extra, dtype=int)][:len(names)]
+    zip_base = 1000 + 25 * np.arange(len(names))  # one block of zipcodes per city
+    if len(names) and names[0] == "Paris":
+        zip_base[0] = 75001
+    weight = 1.0 / np.arange(1, len(names) + 1) ** 1.1
+    return pd.DataFrame({"city": names, "price_sqm": price, "n_zip": n_zip.astype(int),
+                         "zip_base": zip_base, "weight": weight / weight.sum()})
+
+def listings(n, cities=None, seed=0, text=False):
+    """n listings with the columns of listings_example.csv (title/url only when text=True)."""
+    rng = np.random.default_rng(seed + 1)
+    cities = make_cities(seed=seed) if cities is None else cities
+    ci = rng.choice(len(cities), n, p=cities["weight"].values)
+    types = list(PROPERTY_TYPES)
+    w, mu, sd, fac = (np.array([v[i] for v in PROPERTY_TYPES.values()]) for i in range(4))
+    ti = rng.choice(len(types), n, p=w / w.sum())
+    surface = np.clip(rng.normal(mu[ti], sd[ti]), 9, 400).round(1)
+    ppm2 = cities["price_sqm"].values[ci] * fac[ti] * rng.lognormal(0, 0.2, n)
+    zipcode = cities["zip_base"].values[ci] + rng.integers(0, cities["n_zip"].values[ci])
+    df = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "city": pd.Categorical.from_codes(ci, cities["city"].values),
+        "zipcode": zipcode.astype(np.int32),
+        "price": (surface * ppm2).round(-3).astype(np.int64),
+        "surface_m2": surface,
+        "property_type": pd.Categorical.from_codes(ti, types),
+        "days_on_market": rng.geometric(1 / 60.0, n).astype(np.int32),
+    })
+    if text:
+        df.insert(1, "title", df["property_type"].astype(str) + " - " + df["city"].astype(str))
+        df["url"] = "https://exemple/" + df["id"].astype(str)
+    return df
+
+def rent_grid(cities, seed=0, coverage=0.8):
+    """Rent benchmark (city, property_type, rent_per_m2): per-type rows for covered cities,
+    a single 'all' row for the others, as in rents_example.csv."""
+    rng = np.random.default_rng(seed + 2)
+    covered = rng.random(len(cities)) < coverage
+    base = cities["price_sqm"].values * GROSS_YIELD / 12.0
+    rows = [pd.DataFrame({"city": cities["city"].values[~covered], "property_type": "all",
+                          "rent_per_m2": base[~covered].round(1)})]
+    for t, (_, _, _, fac) in PROPERTY_TYPES.items():
+        rows.append(pd.DataFrame({"city": cities["city"].values[covered], "property_type": t,
+                                  "rent_per_m2": (base[covered] * fac * rng.lognormal(0, 0.05, covered.sum())).round(1)}))
+    return pd.concat(rows, ignore_index=True)
+
+def dvf_medians(cities, seed=0):
+    """DVF medians per (city, zipcode, appartement/maison) plus one city-wide aggregate row per city."""
+    rng = np.random.default_rng(seed + 3)
+    n_zip = cities["n_zip"].values
+    ci = np.repeat(np.arange(len(cities)), n_zip)
+    zipcode = cities["zip_base"].values[ci] + (np.arange(len(ci)) - np.repeat(np.cumsum(n_zip) - n_zip, n_zip))
+    parts = []
+    for pt, fac in (("appartement", 1.0), ("maison", 0.85)):
+        parts.append(pd.DataFrame({"city": cities["city"].values[ci], "zipcode": zipcode.astype(str),
+                                   "property_type": pt,
+                                   "median_price_sqm": (cities["price_sqm"].values[ci] * fac * rng.lognormal(0, 0.1, len(ci))).round(0)}))
+    parts.append(pd.DataFrame({"city": cities["city"].values, "zipcode": np.nan, "property_type": np.nan,
+                               "median_price_sqm": cities["price_sqm"].values}))
+    return pd.concat(parts, ignore_index=True)
+
+def rates(durations=range(10, 31), sources=("CL/CSA", "Courtier A", "Courtier B"), seed=0):
+    """Rate table (duration_years, rate_percent, source) like rates_2025-08.csv."""
+    rng = np.random.default_rng(seed + 4)
+    d = np.tile(np.asarray(list(durations)), len(sources))
+    src = np.repeat(list(sources), len(d) // len(sources))
+    pct = 2.7 + (d - 10) * 0.025 + rng.normal(0, 0.05, len(d))
+    return pd.DataFrame({"duration_years": d, "rate_percent": pct.round(2), "source": src})
+
+def rate_history(months=120, durations=range(10, 31), end="2025-08", seed=0):
+    """Monthly rate history (date, duration_years, rate_percent): a random walk of the level plus the
+    duration spread of rates()."""
+    rng = np.random.default_rng(seed + 5)
+    dates = pd.period_range(end=end, periods=months, freq="M").to_timestamp()
+    level = np.clip(2.7 + np.cumsum(rng.normal(0, 0.08, months)), 0.5, 6.0)
+    d = np.asarray(list(durations))
+    pct = level[:, None] + (d[None, :] - 10) * 0.025
+    return pd.DataFrame({"date": np.repeat(dates.strftime("%Y-%m"), len(d)), "duration_years": np.tile(d, months),
+                         "rate_percent": pct.ravel().round(2)})
+
+def parse_size(text):
+    """'1k' -> 1000, '2.5M' -> 2500000."""
+    text = str(text).strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Jeux de données synthétiques (annonces, barème loyers, DVF, taux).")
+    ap.add_argument("--rows", default="100k")
+    ap.add_argument("--cities", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", default="data/synthetic")
+    args = ap.parse_args(argv)
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+    cities = make_cities(args.cities, args.seed)
+    listings(parse_size(args.rows), cities, args.seed, text=True).to_csv(out / "listings.csv", index=False)
+    rent_grid(cities, args.seed).to_csv(out / "rents.csv", index=False)
+    dvf_medians(cities, args.seed).to_csv(out / "dvf_medians.csv", index=False)
+    rates(seed=args.seed).to_csv(out / "rates.csv", index=False)
+    rate_history(seed=args.seed).to_csv(out / "rates_history.csv", index=False)
+    print(f"-> {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+
+"""Headless batch scoring of large listing files (CSV or Parquet), chunked across a process pool.
+
+Pass 1 scores each chunk in a worker, spills it to a temporary Feather part and returns the chunk's
+score-feature bounds. Pass 2 merges the bounds, recomputes investor_score with them (so scores match
+a single-process compute_scores over the whole file) and appends each part to the output in input order.
+
+    python -m core.batch listings.csv -o scored.parquet --params params.toml --rents rents.csv --workers 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from .params import load_params
+from .profiling import Profiler, NULL_PROFILER
+from .scoring import compute_scores, rent_index, resolve_columns, score_bounds, merge_score_bounds, investor_score
+
+_worker = {}
+
+def _init_worker(params, strategy, profile=False):
+    rent_index(params.get("rent_bench_df"))  # built once per process, then memoized
+    _worker.update(params=params, strategy=strategy, profile=profile)
+
+def _groups(df, c, params):
+    return df[c["city"]].astype(str).values if params.get("score_scope", "global") == "city" else None
+
+def _score_chunk(chunk, part_path):
+    """Pass 1 (worker): score a chunk, write it to part_path, return its score bounds
+    (and the chunk's stage records when profiling)."""
+    params, strategy = _worker["params"], _worker["strategy"]
+    prof = Profiler() if _worker["profile"] else NULL_PROFILER
+    scored = compute_scores(chunk, params, strategy=strategy, sort=False, profiler=prof)
+    c = resolve_columns(chunk)
+    if "id" in chunk.columns and "id" not in scored.columns:
+        scored.insert(0, "id", chunk["id"].values)
+    dom = scored[c["dom"]] if c["dom"] else None
+    with prof.stage("batch.bounds", rows=len(scored)):
+        bounds = score_bounds(scored["cashflow_monthly"], scored["net_yield_%"], scored["gross_yield_%"], dom,
+                              _groups(scored, c, params))
+    with prof.stage("batch.spill", rows=len(scored)):
+        feather.write_feather(scored.reset_index(), part_path, compression="uncompressed")
+    return bounds, prof.records
+
+def iter_chunks(path, chunksize=200_000):
+    """Yield DataFrame chunks of a CSV or Parquet file, indexed by global row number."""
+    start = 0
+    if str(path).lower().endswith((".parquet", ".pq")):
+        batches = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    else:
+        # Explicit dtypes: read_csv infers them per chunk (an all-empty url column would be float)
+        c = resolve_columns(pd.read_csv(path, nrows=0))
+        dtype = {c[k]: float for k in ("price", "surface", "dom") if c[k]}
+        dtype.update({c[k]: str for k in ("city", "type", "zipcode", "url") if c[k]})
+        batches = pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+    for chunk in batches:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+class _Writer:
+    """Incremental CSV or Parquet writer. The Parquet schema is fixed by the first chunk, so integer
+    columns are written as float64 (read_csv infers dtypes per chunk: 45 then 45.5) and all-null
+    columns as strings."""
+
+    def __init__(self, path):
+        self.path, self.parquet, self.writer = str(path), str(path).lower().endswith((".parquet", ".pq")), None
+
+    def write(self, df):
+        if self.parquet:
+            df = df.astype({col: "float64" for col in df.columns
+                            if pd.api.types.is_integer_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])})
+            if self.writer is None:
+                schema = pa.Table.from_pandas(df, preserve_index=False).schema
+                for i, field in enumerate(schema):
+                    if pa.types.is_null(field.type):
+                        schema = schema.set(i, field.with_type(pa.string()))
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self.writer else "w", header=not self.writer, index=False)
+            self.writer = True
+
+    def close(self):
+        if self.parquet and self.writer is not None:
+            self.writer.close()
+
+def score_file(input_path, output_path, params, strategy=None, chunksize=200_000, workers=None, profiler=None):
+    """Score a listings file chunk by chunk across `workers` processes and write the results
+    incrementally to `output_path` (.csv or .parquet), in input order. Returns the number of rows.
+    With a Profiler, worker stages are recorded per chunk (worker time) next to the driver's own stages."""
+    prof = profiler or NULL_PROFILER
+    strategy = strategy or params.get("strategy", "meuble")
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="batch_scores_") as tmp:
+        parts, futures = [], []
+        with prof.stage("batch.pass1"):
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(params, strategy, prof.enabled)) as pool:
+                t_read = time.perf_counter()
+                for i, chunk in enumerate(iter_chunks(input_path, chunksize)):
+                    prof.add("batch.read_chunk", time.perf_counter() - t_read, rows=len(chunk), chunk=i)
+                    part = Path(tmp) / f"part_{i:06d}.feather"
+                    parts.append(part)
+                    futures.append(pool.submit(_score_chunk, chunk, part))
+                    # Bound the number of chunks held in memory by the pool
+                    while sum(not f.done() for f in futures) > 2 * workers:
+                        next(f for f in futures if not f.done()).result()
+                    t_read = time.perf_counter()
+                results = [f.result() for f in futures]
+        for i, (_, records) in enumerate(results):
+            for r in records:
+                prof.add(r["name"], r["seconds"], rows=r["rows"], chunk=i, worker=True)
+        bounds = merge_score_bounds([b for b, _ in results]) if results else None
+
+        # Pass 2: global normalization, then incremental write
+        writer, rows = _Writer(output_path), 0
+        try:
+            for i, part in enumerate(parts):
+                with prof.stage("batch.pass2", chunk=i):
+                    scored = feather.read_table(part).to_pandas().set_index("index")
+                    c = resolve_columns(scored)
+                    dom = scored[c["dom"]] if c["dom"] else None
+                    scored["investor_score"] = investor_score(scored["cashflow_monthly"], scored["net_yield_%"],
+                                                              scored["gross_yield_%"], dom, _groups(scored, c, params), bounds)
+                    writer.write(scored)
+                rows += len(scored)
+                part.unlink()
+        finally:
+            writer.close()
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Scoring des annonces en lot (sans Streamlit).")
+    ap.add_argument("input", help="annonces .csv ou .parquet")
+    ap.add_argument("-o", "--output", required=True, help="résultat .csv ou .parquet")
+    ap.add_argument("--params", help="paramètres JSON/TOML (mêmes clés que la page Paramètres)")
+    ap.add_argument("--rents", help="barème loyers CSV (city, property_type, rent_per_m2)")
+    ap.add_argument("--strategy", choices=["nu", "meuble", "colocation"])
+    ap.add_argument("--scope", choices=["global", "city"], help="normalisation du score")
+    ap.add_argument("--chunksize", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--profile", help="écrire les temps par étape (JSON) dans ce fichier")
+    args = ap.parse_args(argv)
+    overrides = {"score_scope": args.scope} if args.scope else {}
+    params = load_params(args.params, **overrides)
+    if args.rents:
+        params["rent_bench_df"] = pd.read_csv(args.rents)
+    prof = Profiler(memory=False) if args.profile else None
+    t0 = time.perf_counter()
+    n = score_file(args.input, args.output, params, strategy=args.strategy, chunksize=args.chunksize,
+                   workers=args.workers, profiler=prof)
+    if prof is not None:
+        prof.to_json(args.profile, rows=n, workers=args.workers or os.cpu_count(), chunksize=args.chunksize,
+                     wall_seconds=time.perf_counter() - t0, summary=prof.summary().to_dict("records"))
+    print(f"{n} annonces -> {args.output}")
+
+if __name__ == "__main__":
+    main()
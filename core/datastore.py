@@ -0,0 +1,85 @@
+
+"""Local columnar cache for uploaded CSVs.
+
+Each CSV is parsed once, compacted (categorical city/type, downcast integers; float32 floats only on
+request, rates and amounts stay float64) and written as uncompressed Feather under STORE_DIR, keyed by
+the SHA-1 of its bytes and of the parsing options. Later loads memory-map the Feather file instead of
+re-parsing. The store is capped in size and evicts the
+least recently used files first.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow.feather as feather
+
+STORE_DIR = Path(".cache/datasets")
+MAX_STORE_BYTES = 2 * 1024 ** 3
+CATEGORICAL_COLUMNS = {"city", "ville", "property_type", "type", "source", "zipcode", "code_postal"}
+
+def content_hash(source):
+    """SHA-1 of a path's content, or of an in-memory upload (bytes / object with getbuffer())."""
+    h = hashlib.sha1()
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    elif hasattr(source, "getbuffer"):
+        h.update(source.getbuffer())
+    else:
+        h.update(source)
+    return h.hexdigest()
+
+def compact_frame(df, float_dtype=None):
+    """Categorical city/type-like columns, smallest integer dtypes, floats cast to float_dtype if given."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if str(col).lower() in CATEGORICAL_COLUMNS:
+            s = s.astype("category")
+        elif float_dtype is not None and pd.api.types.is_float_dtype(s):
+            s = s.astype(float_dtype)
+        elif pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast="integer")
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+def evict(store_dir=STORE_DIR, max_bytes=MAX_STORE_BYTES):
+    """Delete least recently used files until the store fits in max_bytes."""
+    files = sorted(Path(store_dir).glob("*.feather"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    for p in files:
+        if total <= max_bytes:
+            break
+        total -= p.stat().st_size
+        p.unlink(missing_ok=True)
+
+def _options_hash(float_dtype, read_csv_kwargs):
+    """Short fingerprint of the parsing options: the same bytes read differently are another entry."""
+    text = repr((float_dtype, sorted(read_csv_kwargs.items())))
+    return hashlib.sha1(text.encode()).hexdigest()[:10]
+
+def load_csv(source, store_dir=STORE_DIR, max_bytes=MAX_STORE_BYTES, float_dtype=None, **read_csv_kwargs):
+    """Return (DataFrame, key) for a CSV path or upload, parsing it only on the first call per set of
+    options. key = content hash + options fingerprint; float_dtype="float32" halves big listing files."""
+    key = f"{content_hash(source)}-{_options_hash(float_dtype, read_csv_kwargs)}"
+    store_dir = Path(store_dir)
+    path = store_dir / f"{key}.feather"
+    if path.exists():
+        os.utime(path)  # mark as recently used
+        return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True), key
+    if hasattr(source, "seek"):
+        source.seek(0)
+    df = compact_frame(pd.read_csv(source, **read_csv_kwargs), float_dtype)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    # Unique temporary name: concurrent sessions uploading the same file must not share it
+    with tempfile.NamedTemporaryFile(dir=store_dir, prefix=f"{key}-", suffix=".tmp", delete=False) as f:
+        tmp = Path(f.name)
+    try:
+        feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    evict(store_dir, max_bytes)
+    return df.reset_index(drop=True), key
@@ -1,6 +1,15 @@
 
+import weakref
+import numpy as np
 import pandas as pd
 
+# Join keys tried from most to least specific; a level is skipped when the DVF table lacks one of its keys
+DVF_MATCH_LEVELS = [("city", "zipcode", "property_type"), ("city", "zipcode"), ("city", "property_type"), ("city",)]
+
+# Listing types (T2, Studio...) -> DVF "type_local" classes
+PROPERTY_CLASSES = {"studio": "appartement", "appartement": "appartement", "appart": "appartement", "duplex": "appartement",
+                    "loft": "appartement", "maison": "maison", "villa": "maison", "pavillon": "maison"}
+
 def load_dvf_medians(dvf_df):
     """Expect columns: city, zipcode(optional), property_type(optional), median_price_sqm"""
     if dvf_df is None or dvf_df.empty:
@@ -12,21 +21,106 @@ def load_dvf_medians(dvf_df):
         raise ValueError("DVF medians CSV doit contenir au minimum: city, median_price_sqm")
     return dvf_df
 
-def price_gap_vs_dvf(price, surface_m2, city, dvf_df):
-    """Return % gap of listing price/m² vs DVF median for the city's property type if available."""
-    if dvf_df is None or dvf_df.empty or surface_m2 <= 0:
+def _map_unique(values, fn):
+    """Apply a Series -> Series string transform to the distinct values only, then broadcast back."""
+    codes, uniques = pd.factorize(pd.Series(values), sort=False)
+    mapped = fn(pd.Series(uniques).astype("string")).astype(object).values
+    out = np.full(len(codes), np.nan, dtype=object)
+    out[codes >= 0] = mapped[codes[codes >= 0]]
+    return pd.Series(out, index=getattr(values, "index", None))
+
+def normalize_zipcode(values):
+    """'29200', 29200, 29200.0 and '1000' (lost leading zero) -> '29200' / '01000'; blanks -> NaN."""
+    s = pd.Series(values).astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    return s.where(s.str.len() > 0).str.zfill(5)
+
+def property_class(values):
+    """Lower-cased DVF class: T1..T6/F1..F6/studio -> appartement, villa -> maison, others unchanged."""
+    s = pd.Series(values).astype("string").str.lower().str.strip()
+    s = s.where(~s.str.fullmatch(r"[tf]\d+(\s*bis)?", na=False), "appartement")
+    return s.map(lambda v: PROPERTY_CLASSES.get(v, v) if isinstance(v, str) else v).astype("string")
+
+def _dvf_keys(df, city_col, zip_col=None, pt_col=None):
+    keys = pd.DataFrame({"city": _map_unique(df[city_col], lambda s: s.str.lower().str.strip()).values}, index=df.index)
+    if zip_col:
+        keys["zipcode"] = _map_unique(df[zip_col], normalize_zipcode).values
+    if pt_col:
+        keys["property_type"] = _map_unique(df[pt_col], property_class).values
+    return keys
+
+def build_dvf_index(dvf_df):
+    """Median €/m² per match level, built once per DVF table: {level: Series keyed by the level's keys}.
+    Rows whose finer keys are blank are aggregates for that level and take precedence;
+    otherwise the level's value is the median of the finer medians."""
+    if dvf_df is None or dvf_df.empty:
         return None
     cols = {c.lower(): c for c in dvf_df.columns}
-    city_col = cols.get("city"); med_col = cols.get("median_price_sqm"); pt_col = cols.get("property_type")
-    sub = dvf_df[dvf_df[city_col].str.lower() == str(city).lower()]
-    if sub.empty:
-        return None
-    # Try match on property_type if present
-    if pt_col and pt_col in dvf_df.columns and "property_type" in cols:
-        # not strict; if not found, use any for city
-        pass
-    med = float(sub.iloc[0][med_col])
-    if med <= 0:
+    keys = _dvf_keys(dvf_df, cols["city"], cols.get("zipcode"), cols.get("property_type"))
+    keys["median"] = pd.to_numeric(dvf_df[cols["median_price_sqm"]], errors="coerce").astype(float).values
+    keys = keys.dropna(subset=["city", "median"])
+    index = {}
+    for level in DVF_MATCH_LEVELS:
+        if any(k not in keys.columns for k in level):
+            continue
+        finer = [k for k in ("zipcode", "property_type") if k in keys.columns and k not in level]
+        sub = keys.dropna(subset=list(level))
+        med = sub.groupby(list(level))["median"].median()
+        if finer:
+            agg_rows = sub[sub[finer].isna().all(axis=1)]
+            if not agg_rows.empty:
+                med = agg_rows.groupby(list(level))["median"].first().combine_first(med)
+        index[level] = med
+    return index
+
+def dvf_price_gaps(listings, dvf_index, price_col, surf_col, city_col, zip_col=None, pt_col=None):
+    """Join listings to DVF medians in one pass per match level (see DVF_MATCH_LEVELS).
+    Returns a frame aligned on `listings` with dvf_median_price_sqm, price_gap_vs_dvf_% and dvf_match_level."""
+    out = pd.DataFrame({"dvf_median_price_sqm": np.nan, "price_gap_vs_dvf_%": np.nan, "dvf_match_level": None},
+                       index=listings.index)
+    if not dvf_index or listings.empty:
+        return out
+    keys = _dvf_keys(listings, city_col, zip_col, pt_col)
+    median = np.full(len(listings), np.nan)
+    level_name = np.full(len(listings), None, dtype=object)
+    for level, med in dvf_index.items():
+        if any(k not in keys.columns for k in level):
+            continue
+        todo = np.isnan(median)
+        if not todo.any():
+            break
+        sub = keys.loc[todo, list(level)]
+        idx = pd.MultiIndex.from_frame(sub) if len(level) > 1 else pd.Index(sub[level[0]])
+        found = med.reindex(idx).values.astype(float)
+        hit = np.flatnonzero(todo)[~np.isnan(found)]
+        median[hit] = found[~np.isnan(found)]
+        level_name[hit] = "+".join(level)
+    price = listings[price_col].astype(float).values
+    surface = listings[surf_col].astype(float).values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ppm2 = np.where(surface > 0, price / surface, np.nan)
+        gap = np.where(median > 0, (ppm2 - median) / median * 100.0, np.nan)
+    out["dvf_median_price_sqm"] = median
+    out["price_gap_vs_dvf_%"] = gap
+    out["dvf_match_level"] = level_name
+    return out
+
+_indexes = {}  # id -> (weakref, index); DVF tables are treated as immutable
+
+def _index_of(dvf_df):
+    ref, index = _indexes.get(id(dvf_df), (None, None))
+    if ref is None or ref() is not dvf_df:
+        index = build_dvf_index(dvf_df)
+        _indexes[id(dvf_df)] = (weakref.ref(dvf_df, lambda _, k=id(dvf_df): _indexes.pop(k, None)), index)
+    return index
+
+def price_gap_vs_dvf(price, surface_m2, city, dvf_df, property_type=None, zipcode=None):
+    """Return % gap of listing price/m² vs the DVF median for one listing: dvf_price_gaps on the same
+    index (built once per table), so the matched median is the same as in the vectorized join."""
+    if dvf_df is None or dvf_df.empty or surface_m2 <= 0:
         return None
-    listing_ppm2 = price / surface_m2
-    return (listing_ppm2 - med) / med * 100.0
+    one = pd.DataFrame({"price": [price], "surface": [surface_m2], "city": [city],
+                        "zipcode": [zipcode], "property_type": [property_type]})
+    gap = dvf_price_gaps(one, _index_of(dvf_df), "price", "surface", "city",
+                         "zipcode" if zipcode is not None else None,
+                         "property_type" if property_type is not None else None)["price_gap_vs_dvf_%"].iloc[0]
+    return None if np.isnan(gap) else float(gap)
@@ -0,0 +1,176 @@
+
+"""Stream raw DVF "valeurs foncières" files into the medians table consumed by load_dvf_medians.
+
+Accepts the official yearly files (pipe-separated, decimal comma) and the Etalab geo-DVF CSVs.
+Prices/m² are accumulated into fixed log-scale histograms per (city, zipcode, type), so memory
+depends on the number of groups, never on the number of rows read.
+
+    python -m core.dvf_ingest valeursfoncieres-2024.txt [more files...] -o dvf_medians.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from .dvf import DVF_MATCH_LEVELS, _map_unique
+
+# logical field -> accepted column names (official file, geo-DVF)
+RAW_COLUMNS = {
+    "mutation_id": ["id_mutation"],
+    "date": ["Date mutation", "date_mutation"],
+    "nature": ["Nature mutation", "nature_mutation"],
+    "value": ["Valeur fonciere", "valeur_fonciere"],
+    "zipcode": ["Code postal", "code_postal"],
+    "city": ["Commune", "nom_commune"],
+    "type": ["Type local", "type_local"],
+    "surface": ["Surface reelle bati", "surface_reelle_bati"],
+}
+SALE_NATURES = {"Vente", "Vente en l'état futur d'achèvement"}
+RESIDENTIAL_TYPES = {"Appartement", "Maison"}
+QUANTILES = {"q25_price_sqm": 0.25, "median_price_sqm": 0.50, "q75_price_sqm": 0.75}
+
+# Histogram sketch over log10(€/m²): 100 €/m² .. 100 000 €/m², ~2.3% wide bins, interpolated
+LOG_MIN, LOG_MAX, N_BINS = 2.0, 5.0, 300
+
+def _open_chunks(path, chunksize):
+    """Chunked reader selecting only the needed columns with compact dtypes. Returns (chunks, field->column)."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        header = f.readline()
+    sep = "|" if header.count("|") > header.count(",") else ","
+    names = header.rstrip("\r\n").split(sep)
+    found = {k: next((c for c in cands if c in names), None) for k, cands in RAW_COLUMNS.items()}
+    missing = [k for k in ("value", "zipcode", "city", "type", "surface") if found[k] is None]
+    if missing:
+        raise ValueError(f"Fichier DVF brut: colonnes manquantes {missing}")
+    found = {k: c for k, c in found.items() if c is not None}
+    dtypes = {found["zipcode"]: str, found["city"]: "category", found["type"]: "category", found["surface"]: "float32"}
+    for k in ("nature", "date", "mutation_id"):
+        if k in found:
+            dtypes[found[k]] = "category" if k == "nature" else str
+    chunks = pd.read_csv(path, sep=sep, usecols=list(found.values()), dtype=dtypes, chunksize=chunksize,
+                         decimal="," if sep == "|" else ".", encoding="utf-8", encoding_errors="replace")
+    return chunks, found
+
+def _city_name(city):
+    # "PARIS 15" / "Marseille 8e Arrondissement" -> "Paris"; the arrondissement lives in the zipcode
+    return city.str.replace(r"^(?i:(paris|lyon|marseille))\s+\d+.*$", r"\1", regex=True).str.title()
+
+def _residential_sales(rows, f):
+    """One row per residential sale: price/m² from the mutation value over its summed living surface."""
+    keep = rows[f["type"]].isin(RESIDENTIAL_TYPES) & (rows[f["surface"]] > 0) & rows[f["value"]].notna()
+    if "nature" in f:
+        keep &= rows[f["nature"]].isin(SALE_NATURES)
+    rows = rows[keep]
+    if rows.empty:
+        return pd.DataFrame(columns=["city", "zipcode", "property_type", "price_sqm"])
+    g = rows.groupby("_mutation", sort=False, observed=True)
+    sales = pd.DataFrame({
+        "city": g[f["city"]].first().astype(str),
+        "zipcode": g[f["zipcode"]].first(),
+        "property_type": g[f["type"]].first().astype(str),
+        "n_types": g[f["type"]].nunique(),
+        "price_sqm": g[f["value"]].first().astype(float) / g[f["surface"]].sum().astype(float),
+    })
+    sales = sales[sales["n_types"] == 1]  # mixed house + flat mutations have no meaningful €/m²
+    sales["city"] = _map_unique(sales["city"], _city_name).values
+    return sales.drop(columns="n_types")
+
+class _HistogramSketch:
+    """Per-group fixed-bin histograms, grown on demand (rows = groups)."""
+
+    def __init__(self):
+        self.ids = {}
+        self.counts = np.zeros((1024, N_BINS), dtype=np.uint32)
+
+    def add(self, keys, values):
+        codes, uniques = pd.MultiIndex.from_frame(keys).factorize()
+        gid = np.array([self.ids.setdefault(k, len(self.ids)) for k in uniques], dtype=np.int64)
+        if len(self.ids) > len(self.counts):
+            grown = np.zeros((max(len(self.ids), 2 * len(self.counts)), N_BINS), dtype=np.uint32)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        b = np.clip(((np.log10(values) - LOG_MIN) / (LOG_MAX - LOG_MIN) * N_BINS).astype(np.int64), 0, N_BINS - 1)
+        # Histogram of this chunk's groups only, then added to their global rows
+        local = np.bincount(codes * N_BINS + b, minlength=len(uniques) * N_BINS).reshape(len(uniques), N_BINS)
+        self.counts[gid] += local.astype(np.uint32)
+
+    def table(self):
+        keys = pd.DataFrame(list(self.ids.keys()), columns=["city", "zipcode", "property_type"])
+        return keys, self.counts[:len(self.ids)].astype(np.int64)
+
+def _quantiles(counts, q):
+    """Quantile per histogram row, linearly interpolated inside the bin (log scale)."""
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1]
+    target = q * total
+    b = np.minimum((cum < target[:, None]).sum(axis=1), N_BINS - 1)
+    rows = np.arange(len(counts))
+    before = np.where(b > 0, cum[rows, np.maximum(b - 1, 0)], 0)
+    inside = counts[rows, b]
+    frac = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0.5)
+    log_v = LOG_MIN + (b + np.clip(frac, 0, 1)) / N_BINS * (LOG_MAX - LOG_MIN)
+    return np.where(total > 0, 10 ** log_v, np.nan)
+
+def ingest_dvf(paths, chunksize=500_000, min_sales=5, levels=DVF_MATCH_LEVELS):
+    """Stream one or more raw DVF files and return the medians table
+    (city, zipcode, property_type, median_price_sqm, q25_price_sqm, q75_price_sqm, n_sales).
+    Coarser `levels` are emitted as aggregate rows with the finer keys left blank."""
+    if isinstance(paths, str):
+        paths = [paths]
+    sketch = _HistogramSketch()
+    for path in paths:
+        chunks, f = _open_chunks(path, chunksize)
+        carry = None
+        for chunk in chunks:
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            if "mutation_id" in f:
+                chunk["_mutation"] = chunk[f["mutation_id"]]
+            else:
+                key_cols = [f[k] for k in ("date", "value", "zipcode", "city") if k in f]
+                chunk["_mutation"] = pd.MultiIndex.from_frame(chunk[key_cols].astype(str)).factorize()[0]
+            # A mutation may straddle the chunk boundary: keep its rows for the next chunk
+            last = chunk["_mutation"].iloc[-1]
+            tail = (chunk["_mutation"] == last).values
+            carry = chunk[tail].drop(columns="_mutation")
+            sales = _residential_sales(chunk[~tail], f)
+            if not sales.empty:
+                sketch.add(sales[["city", "zipcode", "property_type"]].fillna(""), sales["price_sqm"].values)
+        if carry is not None and not carry.empty:
+            carry["_mutation"] = 0
+            sales = _residential_sales(carry, f)
+            if not sales.empty:
+                sketch.add(sales[["city", "zipcode", "property_type"]].fillna(""), sales["price_sqm"].values)
+
+    keys, counts = sketch.table()
+    out = []
+    for level in levels:
+        if keys.empty:
+            break
+        codes, uniques = pd.MultiIndex.from_frame(keys[list(level)]).factorize()
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+        merged = np.add.reduceat(counts[order], starts, axis=0)  # sketches merge exactly by summing histograms
+        part = pd.DataFrame(list(uniques), columns=list(level))
+        for col, q in QUANTILES.items():
+            part[col] = _quantiles(merged, q).round(0)
+        part["n_sales"] = merged.sum(axis=1)
+        out.append(part)
+    cols = ["city", "zipcode", "property_type", "median_price_sqm", "q25_price_sqm", "q75_price_sqm", "n_sales"]
+    if not out:
+        return pd.DataFrame(columns=cols)
+    table = pd.concat(out, ignore_index=True).reindex(columns=cols)
+    table = table.replace({"zipcode": {"": np.nan}, "property_type": {"": np.nan}})
+    return table[table["n_sales"] >= min_sales].reset_index(drop=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Médianes DVF (prix/m²) depuis les fichiers bruts 'valeurs foncières'.")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("-o", "--output", default="dvf_medians.csv")
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--min-sales", type=int, default=5)
+    args = ap.parse_args(argv)
+    table = ingest_dvf(args.paths, chunksize=args.chunksize, min_sales=args.min_sales)
+    table.to_csv(args.output, index=False)
+    print(f"{len(table)} lignes -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
 import math
+import numpy as np
 import pandas as pd
 
 def pmt(rate_m, n_periods, principal):
@@ -10,35 +11,139 @@ def pmt(rate_m, n_periods, principal):
         return principal / n_periods
     return principal * (rate_m * (1 + rate_m) ** n_periods) / ((1 + rate_m) ** n_periods - 1)
 
-def amortization_schedule(principal, annual_rate, years, insurance_rate_annual=0.0, start_month=1, start_year=2025):
-    """Return a DataFrame with monthly amortization including optional borrower insurance (linear on principal)."""
+def pmt_array(rate_m, n_periods, principal):
+    """Vectorized pmt: broadcasts arrays of monthly rates, durations (months) and principals."""
+    rate_m, n_periods, principal = np.broadcast_arrays(np.asarray(rate_m, dtype=float),
+                                                       np.asarray(n_periods, dtype=float),
+                                                       np.asarray(principal, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + rate_m) ** n_periods
+        annuity = np.where(rate_m == 0, principal / n_periods, principal * (rate_m * growth) / (growth - 1))
+    return np.where(principal <= 0, 0.0, annuity)
+
+def remaining_balance(principal, rate_m, n_periods, k):
+    """Closed-form outstanding balance after k payments (broadcasts like pmt_array)."""
+    principal = np.asarray(principal, dtype=float)
+    rate_m = np.asarray(rate_m, dtype=float)
+    k = np.asarray(k, dtype=float)
+    annuity = pmt_array(rate_m, n_periods, principal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + rate_m) ** k
+        balance = np.where(rate_m == 0, principal - annuity * k, principal * growth - annuity * (growth - 1) / rate_m)
+    return np.maximum(balance, 0.0)
+
+def _npv_cols(cols, r, derivative=False):
+    """NPV of cash-flow columns (T, rows) at per-row rates r by Horner in v = 1/(1+r), optionally with dNPV/dr."""
+    v = 1.0 / (1.0 + r)
+    npv, d_npv = cols[-1].copy(), np.zeros_like(r)
+    for k in range(len(cols) - 2, -1, -1):
+        if derivative:
+            d_npv *= v
+            d_npv += npv
+        npv *= v
+        npv += cols[k]
+    return (npv, -d_npv * v * v) if derivative else npv
+
+def irr(flows, tol=1e-7, max_iter=30, bounds=(-0.99, 10.0)):
+    """Batched internal rate of return of cash-flow rows (..., T) for periods t = 0..T-1.
+    Vectorized Newton iterations on the rows not yet converged, started from the money multiple
+    spread over the horizon; rows where Newton fails fall back to bisection within `bounds`.
+    NaN where the flows do not change sign or no root lies within `bounds`."""
+    flows = np.asarray(flows, dtype=float)
+    shape, T = flows.shape[:-1], flows.shape[-1]
+    cols = np.ascontiguousarray(flows.reshape(-1, T).T)  # (T, rows): contiguous per period
+    out = np.full(cols.shape[1], np.nan)
+    valid = np.flatnonzero((cols > 0).any(axis=0) & (cols < 0).any(axis=0))
+    c = cols[:, valid]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        multiple = np.maximum(c, 0).sum(axis=0) / -np.minimum(c, 0).sum(axis=0)
+        r = np.clip(np.nan_to_num(multiple ** (1.0 / max(T - 1, 1)) - 1.0), -0.9, 1.0)
+        active = np.arange(len(valid))
+        for _ in range(max_iter):
+            if not len(active):
+                break
+            npv, d_npv = _npv_cols(c[:, active] if len(active) < c.shape[1] else c, r, derivative=True)
+            step = npv / d_npv
+            r = r - step
+            done = np.abs(step) < tol
+            ok = done & (r > bounds[0]) & (r < bounds[1])
+            out[valid[active[ok]]] = r[ok]
+            keep = ~done & np.isfinite(r) & (r > bounds[0]) & (r < bounds[1])
+            active, r = active[keep], r[keep]
+        # Bisection for the rows Newton did not settle
+        rest = np.flatnonzero(np.isnan(out[valid]))
+        if len(rest):
+            cr = c[:, rest]
+            lo, hi = np.full(len(rest), bounds[0]), np.full(len(rest), bounds[1])
+            f_lo = _npv_cols(cr, lo)
+            bracketed = np.sign(f_lo) != np.sign(_npv_cols(cr, hi))
+            for _ in range(60):
+                mid = 0.5 * (lo + hi)
+                f_mid = _npv_cols(cr, mid)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+                hi = np.where(left, hi, mid)
+            out[valid[rest[bracketed]]] = (0.5 * (lo + hi))[bracketed]
+    return out.reshape(shape)
+
+def npv(flows, rate):
+    """Batched net present value of cash-flow rows (..., T), periods t = 0..T-1, at `rate` (scalar or per row)."""
+    flows = np.asarray(flows, dtype=float)
+    discount = (1.0 + np.asarray(rate, dtype=float)[..., None]) ** -np.arange(flows.shape[-1])
+    return (flows * discount).sum(axis=-1)
+
+def loan_years(principal, annual_rate, years, horizon_years, insurance_rate_annual=0.0):
+    """Yearly loan aggregates for an array of principals, shape (loans, horizon_years): interest,
+    principal_paid, insurance and end-of-year balance (same closed form as amortization_arrays,
+    zero once the loan is repaid)."""
+    principal = np.asarray(principal, dtype=float)[:, None]
     months = int(years * 12)
     rate_m = annual_rate / 12.0
-    ins_m = insurance_rate_annual / 12.0
-    annuity = pmt(rate_m, months, principal)
-    rows = []
-    balance = principal
-    y, m = start_year, start_month
-    for i in range(1, months + 1):
-        interest = balance * rate_m
-        principal_paid = annuity - interest
-        balance = max(0.0, balance - principal_paid)
-        insurance = principal * ins_m
-        total = annuity + insurance
-        rows.append({
-            "period": i,
-            "year": y, "month": m,
-            "payment_annuity": annuity,
-            "interest": interest,
-            "principal_paid": principal_paid,
-            "insurance": insurance,
-            "payment_total": total,
-            "balance": balance
-        })
-        m += 1
-        if m > 12:
-            m = 1; y += 1
-    df = pd.DataFrame(rows)
+    start = np.minimum(12 * np.arange(horizon_years), months)
+    end = np.minimum(start + 12, months)
+    annuity = pmt_array(rate_m, months, principal)
+    balance_start = remaining_balance(principal, rate_m, months, start)
+    balance_end = remaining_balance(principal, rate_m, months, end)
+    paid_months = end - start
+    principal_paid = balance_start - balance_end
+    return {
+        "interest": annuity * paid_months - principal_paid,
+        "principal_paid": principal_paid,
+        "insurance": principal * (insurance_rate_annual / 12.0) * paid_months,
+        "balance": balance_end,
+    }
+
+def amortization_arrays(principal, annual_rate, years, insurance_rate_annual=0.0, first=1, count=None):
+    """Monthly amortization as preallocated column arrays (closed form, no Python loop over months).
+    first / count restrict it to periods first .. first + count - 1 (only that window is computed)."""
+    months = int(years * 12)
+    rate_m = annual_rate / 12.0
+    first = max(1, int(first))
+    last = months if count is None else min(months, first + int(count) - 1)
+    period = np.arange(first, last + 1)
+    annuity = np.full(len(period), float(pmt_array(rate_m, months, principal)))
+    balance = remaining_balance(principal, rate_m, months, period)
+    interest = remaining_balance(principal, rate_m, months, period - 1) * rate_m
+    insurance = np.full(len(period), principal * insurance_rate_annual / 12.0)
+    return {
+        "period": period,
+        "payment_annuity": annuity,
+        "interest": interest,
+        "principal_paid": annuity - interest,
+        "insurance": insurance,
+        "payment_total": annuity + insurance,
+        "balance": balance,
+    }
+
+def amortization_schedule(principal, annual_rate, years, insurance_rate_annual=0.0, start_month=1, start_year=2025,
+                          first=1, count=None):
+    """Return a DataFrame with monthly amortization including optional borrower insurance (linear on principal).
+    first / count: only that window of periods (e.g. the rows on screen)."""
+    cols = amortization_arrays(principal, annual_rate, years, insurance_rate_annual, first, count)
+    offset = start_month - 1 + cols["period"] - 1
+    df = pd.DataFrame(cols)
+    df.insert(1, "year", start_year + offset // 12)
+    df.insert(2, "month", offset % 12 + 1)
     return df
 
 def scenario_monthly_payment(principal, rate_annual, years, insurance_rate_annual=0.0):
@@ -52,17 +157,17 @@ def scenario_monthly_payment(principal, rate_annual, years, insurance_rate_annua
 
 def build_financing_table(principal, rates_by_years, insurance_rate_annual=0.0, stress_bp=[0, 50, 100]):
     """Create a table of monthly payments for multiple durations and stressed rates in basis points (+bp)."""
-    rows = []
-    for years, base_rate in rates_by_years.items():
-        for bp in stress_bp:
-            rate = base_rate + bp / 10000.0
-            ann, ins, tot = scenario_monthly_payment(principal, rate, years, insurance_rate_annual)
-            rows.append({
-                "duration_years": years,
-                "rate_%": round(rate * 100, 3),
-                "annuity": ann,
-                "insurance": ins,
-                "monthly_payment_total": tot,
-                "stress_bp": bp
-            })
-    return pd.DataFrame(rows).sort_values(["duration_years", "stress_bp"])
+    years = np.repeat(np.array(list(rates_by_years.keys()), dtype=int), len(stress_bp))
+    base = np.repeat(np.array(list(rates_by_years.values()), dtype=float), len(stress_bp))
+    bp = np.tile(np.array(stress_bp, dtype=int), len(rates_by_years))
+    rate = base + bp / 10000.0
+    ann = pmt_array(rate / 12.0, (years * 12).astype(int), principal)
+    ins = np.full(len(rate), principal * (insurance_rate_annual / 12.0))
+    return pd.DataFrame({
+        "duration_years": years,
+        "rate_%": np.round(rate * 100, 3),
+        "annuity": ann,
+        "insurance": ins,
+        "monthly_payment_total": ann + ins,
+        "stress_bp": bp
+    }).sort_values(["duration_years", "stress_bp"])
@@ -0,0 +1,131 @@
+
+"""Offline geocoding of listings from city / zipcode to commune centroids.
+
+The commune table (city, zipcode, lat, lon; bundled: data/communes.csv, main French communes) goes
+through the local columnar store like any upload, so it is parsed once and memory-mapped afterwards.
+Lookups are hash joins on normalized keys (accents, case, punctuation, "St"/"Ste", arrondissement
+suffixes), tried from most to least precise: city + zipcode, city, zipcode, then a fuzzy match (difflib)
+of the city name. Only distinct (city, zipcode) pairs are resolved, then broadcast back to the rows.
+
+The full La Poste table (base officielle des codes postaux, data.gouv.fr) can replace the bundled one:
+    python -m core.geocode laposte_hexasmal.csv -o data/communes.csv
+"""
+import argparse
+import difflib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .datastore import load_csv
+from .dvf import normalize_zipcode
+
+COMMUNES_PATH = Path(__file__).resolve().parent.parent / "data" / "communes.csv"
+GEO_MATCH_LEVELS = ["ville+cp", "ville", "cp", "approx"]
+FUZZY_CUTOFF = 0.85
+
+def city_key(values):
+    """Vectorized lookup key: 'Saint-Étienne', 'ST ETIENNE ', 'saint etienne' -> 'saint etienne';
+    'Paris 15e' / 'Lyon 3ème arrondissement' -> 'paris' / 'lyon'."""
+    s = pd.Series(values).astype("string").str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    s = s.str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+    s = s.str.replace(r"\s+\d{1,2}\s*(e|er|eme)?(\s+arrondissement)?$", "", regex=True)
+    s = s.str.replace(r"\s+cedex(\s+\d+)?$", "", regex=True)
+    s = s.str.replace(r"\bst\b", "saint", regex=True).str.replace(r"\bste\b", "sainte", regex=True)
+    return s.where(s.str.len() > 0)
+
+def _department(zipcodes):
+    return zipcodes.str[:2].where(~zipcodes.str.startswith("97"), zipcodes.str[:3])
+
+def build_geocoder(table):
+    """Lookup index from a commune table (city, zipcode, lat, lon), ordered by decreasing population:
+    a city name alone resolves to the first département it appears in (Saint-Denis -> La Réunion
+    before Seine-Saint-Denis in the bundled table)."""
+    cols = {c.lower(): c for c in table.columns}
+    t = pd.DataFrame({"key": city_key(table[cols["city"]]).values,
+                      "zipcode": normalize_zipcode(table[cols["zipcode"]]).values,
+                      "lat": table[cols["lat"]].astype(float).values, "lon": table[cols["lon"]].astype(float).values})
+    t = t.dropna(subset=["lat", "lon"])
+    t["dep"] = _department(t["zipcode"].astype("string"))
+    first_dep = t.groupby("key", sort=False)["dep"].transform("first")
+    by_city = t[t["dep"] == first_dep].groupby("key", sort=False)[["lat", "lon"]].mean()
+    keys = sorted(by_city.index)
+    return {
+        "city_zip": t.dropna(subset=["key", "zipcode"]).groupby(["key", "zipcode"], sort=False)[["lat", "lon"]].mean(),
+        "city": by_city,
+        "zip": t.dropna(subset=["zipcode"]).groupby("zipcode", sort=False)[["lat", "lon"]].mean(),
+        # Fuzzy candidates by first letter (typos rarely hit the first one)
+        "by_initial": pd.Series(keys, dtype=object).groupby([k[:1] for k in keys]).agg(list).to_dict(),
+    }
+
+def load_geocoder(path=COMMUNES_PATH):
+    table, _ = load_csv(path, dtype={"zipcode": str})
+    return build_geocoder(table)
+
+def _fuzzy(key, geocoder):
+    """Closest known city key (None below FUZZY_CUTOFF); only called once per distinct unknown key."""
+    match = difflib.get_close_matches(key, geocoder["by_initial"].get(key[:1], []), n=1, cutoff=FUZZY_CUTOFF)
+    return match[0] if match else None
+
+def geocode(geocoder, cities, zipcodes=None, fuzzy=True):
+    """lat, lon and geo_match (GEO_MATCH_LEVELS, None when unresolved) per row of `cities`/`zipcodes`."""
+    cities = pd.Series(cities)
+    # Normalize distinct values only, then resolve each distinct (city, zipcode) pair once
+    city_codes, city_values = pd.factorize(cities, sort=False)
+    city_keys = np.append(city_key(city_values).astype(object).values, None)  # code -1 -> None
+    if zipcodes is None:
+        zip_codes, zip_keys = np.full(len(cities), -1), np.array([None], dtype=object)
+    else:
+        zip_codes, zip_values = pd.factorize(pd.Series(zipcodes), sort=False)
+        zip_keys = np.append(normalize_zipcode(zip_values).astype(object).values, None)
+    # -1 (missing) wraps to the trailing None
+    city_codes, zip_codes = city_codes % len(city_keys), zip_codes % len(zip_keys)
+    pairs, codes = np.unique(city_codes.astype(np.int64) * len(zip_keys) + zip_codes, return_inverse=True)
+    k = city_keys[pairs // len(zip_keys)]
+    z = zip_keys[pairs % len(zip_keys)]
+    k = np.where(pd.isna(k), None, k)
+    z = np.where(pd.isna(z), None, z)
+
+    lat = np.full(len(pairs), np.nan)
+    lon = np.full(len(pairs), np.nan)
+    level = np.full(len(pairs), None, dtype=object)
+    steps = [("city_zip", lambda m: pd.MultiIndex.from_arrays([k[m], z[m]]), "ville+cp"),
+             ("city", lambda m: k[m], "ville"), ("zip", lambda m: z[m], "cp")]
+    if fuzzy:
+        steps.append(("city", lambda m: [_fuzzy(v, geocoder) for v in k[m]], "approx"))
+    for name, lookup, label in steps:
+        todo = np.isnan(lat) & (k != None) if name == "city" else np.isnan(lat) & (z != None)
+        if name == "city_zip":
+            todo &= k != None
+        if not todo.any():
+            continue
+        table = geocoder[name]
+        pos = table.index.get_indexer(lookup(todo))
+        hit = np.flatnonzero(todo)[pos >= 0]
+        lat[hit] = table["lat"].values[pos[pos >= 0]]
+        lon[hit] = table["lon"].values[pos[pos >= 0]]
+        level[hit] = label
+    return pd.DataFrame({"lat": lat[codes], "lon": lon[codes], "geo_match": level[codes]}, index=cities.index)
+
+def convert_laposte(src, dst=COMMUNES_PATH):
+    """La Poste 'base officielle des codes postaux' CSV (';' or ',' separated, coordinates as
+    'lat, lon' or in _geopoint) -> commune table. Keeps its row order (no population ranking)."""
+    raw = pd.read_csv(src, sep=None, engine="python", dtype=str, encoding="utf-8-sig")
+    cols = {c.lower().lstrip("#"): c for c in raw.columns}
+    name = next(cols[c] for c in cols if "nom_de_la_commune" in c or c == "nom_commune")
+    zipcode = next(cols[c] for c in cols if "code_postal" in c)
+    gps = next(cols[c] for c in cols if "gps" in c or "geopoint" in c)
+    coords = raw[gps].str.split(",", n=1, expand=True)
+    table = pd.DataFrame({"city": raw[name].str.title(), "zipcode": raw[zipcode],
+                          "lat": pd.to_numeric(coords[0], errors="coerce"), "lon": pd.to_numeric(coords[1], errors="coerce")})
+    table = table.dropna().drop_duplicates(["city", "zipcode"])
+    table.to_csv(dst, index=False)
+    return table
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Convertit la base La Poste des codes postaux en table de géocodage.")
+    ap.add_argument("source")
+    ap.add_argument("-o", "--output", default=str(COMMUNES_PATH))
+    args = ap.parse_args(argv)
+    print(f"{len(convert_laposte(args.source, args.output))} communes -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+
+"""Multi-source ingestion: read several listing feeds concurrently, normalize their columns and merge
+near-duplicate listings (the same property posted on several portals or by several agencies).
+
+Sources are local CSV / Parquet paths or http(s) URLs, fetched by a thread pool (I/O bound). Columns
+are renamed with the aliases of scoring.resolve_columns. Deduplication never compares all pairs:
+rows are blocked by city, sorted by surface inside each block, and each row is compared to the next
+DUP_WINDOW rows only (sorted neighbourhood). Two rows from different sources are candidates when surface
+and price agree within DUP_TOLERANCES and, when both are known, zipcode and property type match (a feed
+without zipcodes still meets the others); each row keeps its
+closest candidate per source when the choice is mutual and the titles are close enough, and the kept
+links are merged transitively (connected components).
+
+    python -m core.ingest portal_a.csv agency_b.parquet https://feed.example/c.csv -o merged.csv
+"""
+import argparse
+import io
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .dvf import normalize_zipcode, _map_unique
+from .geocode import city_key
+from .scoring import resolve_columns
+
+CANONICAL = {"price": "price", "surface": "surface_m2", "city": "city", "type": "property_type",
+             "zipcode": "zipcode", "dom": "days_on_market", "url": "url"}
+DUP_WINDOW = 16
+DUP_TOLERANCES = {"surface_rel": 0.03, "surface_abs": 1.0, "price_rel": 0.06, "title": 0.5}
+
+def read_source(source, timeout=30):
+    """DataFrame from a CSV / Parquet path or URL."""
+    name = str(source)
+    if name.startswith(("http://", "https://")):
+        with urllib.request.urlopen(name, timeout=timeout) as resp:
+            data = io.BytesIO(resp.read())
+        return pd.read_parquet(data) if name.lower().split("?")[0].endswith((".parquet", ".pq")) else pd.read_csv(data)
+    if name.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+def normalize_listings(df, source=None):
+    """Canonical column names (price, surface_m2, city, property_type, zipcode, days_on_market, url)
+    plus the source label; other columns (id, title...) are kept as is."""
+    c = resolve_columns(df)
+    out = df.rename(columns={c[k]: v for k, v in CANONICAL.items() if c[k] and c[k] != v})
+    if "titre" in out.columns and "title" not in out.columns:
+        out = out.rename(columns={"titre": "title"})
+    if "zipcode" in out.columns:
+        out["zipcode"] = normalize_zipcode(out["zipcode"]).values
+    out["source"] = source if source is not None else "?"
+    return out
+
+def load_sources(sources, workers=8):
+    """Read and normalize sources concurrently. Returns (frames, errors): frames in input order,
+    errors as {source: message} for the sources that could not be read."""
+    def load(src):
+        try:
+            return normalize_listings(read_source(src), Path(str(src)).name), None
+        except Exception as e:  # one broken feed must not block the others
+            return None, f"{type(e).__name__}: {e}"
+    with ThreadPoolExecutor(max(1, min(workers, len(sources)))) as pool:
+        results = list(pool.map(load, sources))
+    frames = [f for f, _ in results if f is not None]
+    errors = {str(src): err for src, (_, err) in zip(sources, results) if err}
+    return frames, errors
+
+def _tokens(titles):
+    keys = _map_unique(titles, city_key)
+    return [frozenset(t.split()) if isinstance(t, str) else None for t in keys]
+
+def _components(n, left, right):
+    """Connected-component label (smallest member) of n nodes linked by (left, right) pairs."""
+    labels = np.arange(n)
+    while len(left):
+        low = np.minimum(labels[left], labels[right])
+        before = labels.copy()
+        np.minimum.at(labels, left, low)
+        np.minimum.at(labels, right, low)
+        labels = labels[labels]  # pointer jumping
+        if np.array_equal(labels, before):
+            break
+    return labels
+
+def _codes(values):
+    """Integer codes, -1 = unknown."""
+    return pd.factorize(_map_unique(values, lambda s: s.str.lower().str.strip()))[0]
+
+def _candidate_pairs(df, block_id, window, tol, same_source):
+    """(left, right, distance) of the rows within the surface / price tolerances whose zipcode and type
+    do not conflict, comparing each row to the next `window` rows of its block in surface order."""
+    surface = df["surface_m2"].to_numpy(dtype=float, na_value=np.nan)
+    price = df["price"].to_numpy(dtype=float, na_value=np.nan)
+    soft = [_codes(df[col]) for col in ("zipcode", "property_type") if col in df.columns]  # match when both known
+    source = pd.factorize(df["source"])[0] if "source" in df.columns and not same_source else None
+    order = np.lexsort((price, surface, block_id))
+    left, right, dist = [], [], []
+    for k in range(1, window + 1):
+        a, b = order[:-k], order[k:]
+        if not len(a):
+            break
+        d_surface = np.abs(surface[a] - surface[b]) / np.maximum(tol["surface_abs"], tol["surface_rel"] * surface[a])
+        d_price = np.abs(price[a] - price[b]) / (tol["price_rel"] * np.maximum(price[a], price[b]))
+        ok = (block_id[a] == block_id[b]) & (d_surface <= 1) & (d_price <= 1)
+        for codes in soft:
+            ok &= (codes[a] < 0) | (codes[b] < 0) | (codes[a] == codes[b])
+        if source is not None:
+            ok &= source[a] != source[b]
+        left.append(a[ok]); right.append(b[ok]); dist.append((d_surface + d_price)[ok])
+    if not left:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+    return np.concatenate(left), np.concatenate(right), np.concatenate(dist)
+
+def duplicate_groups(df, window=DUP_WINDOW, tolerances=None, same_source=False):
+    """Group label per row (position of the group's first row); rows with the same label are
+    near-duplicates. df has canonical columns (normalize_listings). Each row is linked to its closest
+    candidate in every other source, when that choice is mutual, which keeps look-alike listings of
+    one street from chaining into one group. same_source=True also merges reposts within a source."""
+    tol = dict(DUP_TOLERANCES, **(tolerances or {}))
+    block_id = pd.factorize(_map_unique(df["city"], city_key))[0]
+    left, right, dist = _candidate_pairs(df, block_id, window, tol, same_source)
+
+    # Mutual closest candidate per (row, other source)
+    source = pd.factorize(df["source"])[0] if "source" in df.columns and not same_source else np.zeros(len(df), dtype=int)
+    pairs = pd.DataFrame({"row": np.r_[left, right], "other": np.r_[right, left], "dist": np.r_[dist, dist]})
+    pairs["other_source"] = source[pairs["other"].values]
+    best = pairs.loc[pairs.sort_values("dist", kind="stable").groupby(["row", "other_source"], sort=False).head(1).index]
+    chosen = pd.MultiIndex.from_arrays([best["row"].values, best["other"].values])
+    mutual = chosen.isin(pd.MultiIndex.from_arrays([best["other"].values, best["row"].values]))
+    links = best[mutual & (best["row"].values < best["other"].values)]
+    left, right = links["row"].values, links["other"].values
+
+    # Title check (Jaccard on normalized words) on the retained links only
+    if "title" in df.columns and len(left):
+        rows = np.unique(np.r_[left, right])
+        words = dict(zip(rows, _tokens(df["title"].values[rows])))
+        keep = np.array([words[i] is None or words[j] is None or not (words[i] | words[j])
+                         or len(words[i] & words[j]) / len(words[i] | words[j]) >= tol["title"]
+                         for i, j in zip(left, right)], dtype=bool)
+        left, right = left[keep], right[keep]
+    return _components(len(df), left, right)
+
+def deduplicate(df, **kwargs):
+    """One row per duplicate group: the first one in input order (source order, then row order),
+    with dup_count, the group's lowest price (min_price) and its sources."""
+    df = df.reset_index(drop=True)
+    groups = duplicate_groups(df, **kwargs)
+    g = df.groupby(groups, sort=False)
+    out = df.loc[np.unique(groups)].copy()  # labels are the groups' first rows
+    out["dup_count"] = g.size().reindex(out.index).values
+    out["min_price"] = g["price"].min().reindex(out.index).values
+    if "source" in df.columns:
+        sources = df["source"].astype(str)
+        out["sources"] = sources.groupby(groups, sort=False).agg(lambda s: ", ".join(dict.fromkeys(s))).reindex(out.index).values
+    return out.reset_index(drop=True)
+
+def ingest(sources, workers=8, dedup=True, **kwargs):
+    """Read, normalize and merge sources; returns (listings, errors)."""
+    frames, errors = load_sources(sources, workers)
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if dedup and len(merged):
+        merged = deduplicate(merged, **kwargs)
+    return merged, errors
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fusionne plusieurs flux d'annonces (CSV/Parquet/URL) et supprime les doublons.")
+    ap.add_argument("sources", nargs="+")
+    ap.add_argument("-o", "--output", required=True)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--no-dedup", action="store_true")
+    args = ap.parse_args(argv)
+    merged, errors = ingest(args.sources, args.workers, dedup=not args.no_dedup)
+    for src, err in errors.items():
+        print(f"! {src}: {err}")
+    if args.output.lower().endswith((".parquet", ".pq")):
+        merged.to_parquet(args.output, index=False)
+    else:
+        merged.to_csv(args.output, index=False)
+    print(f"{len(merged)} annonces -> {args.output}")
+
+if __name__ == "__main__":
+    main()
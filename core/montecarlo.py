@@ -0,0 +1,125 @@
+
+"""Monte Carlo distribution of cashflows and IRR per listing.
+
+Every random input is drawn once per (path, year) and shared by all listings (common random numbers):
+vacancy months, capex shocks, rent growth, market rate (for loans resetting every `rate_reset_years`)
+and resale price growth. Given a path, each listing's yearly cashflow is linear in four listing
+coefficients (rent, 1, amount financed, price), so the whole simulation is a matrix product
+(listings × 4) @ (4 × paths) per year instead of a loop over rows or paths. Per-listing statistics
+are exact marginals; sharing draws only correlates listings, which also makes their ranking steadier.
+"""
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .finance import pmt_array, remaining_balance, irr
+from .scoring import cash_paid_in, run_stages
+
+# Yearly assumptions (fractions). Vacancy follows params["vacancy_rate"] on average.
+MC_ASSUMPTIONS = {
+    "rent_growth_mu": 0.015, "rent_growth_sigma": 0.010,
+    "capex_shock_prob": 0.10, "capex_shock_pct": 0.010,   # shock size ~ exponential, mean % of price
+    "rate_sigma_bp": 50.0, "rate_reset_years": None,      # None: fixed-rate loan (French norm)
+    "price_growth_mu": 0.010, "price_growth_sigma": 0.040, "resale_fee": 0.05,
+}
+MC_COLUMNS = ["mc_p_loss_%", "mc_cf_p5", "mc_cf_p50", "mc_cf_p95", "mc_irr_p5", "mc_irr_p50", "mc_irr_p95"]
+
+def risk_factors(params, n_paths=2000, horizon_years=10, seed=42, assumptions=None):
+    """Per-path factor arrays (paths, years) multiplying the listing coefficients:
+    rent (A), amount financed (F, debt service + insurance), price (S, capex shocks), plus the
+    resale factors at the horizon: price index (resale) and balance per € financed (balance)."""
+    a = dict(MC_ASSUMPTIONS, **(assumptions or {}))
+    rng = np.random.default_rng(seed)
+    P, H = int(n_paths), int(horizon_years)
+
+    vacancy = rng.binomial(12, min(max(params["vacancy_rate"], 0.0), 1.0), (P, H)) / 12.0
+    growth = rng.normal(a["rent_growth_mu"], a["rent_growth_sigma"], (P, H))
+    rent_index = np.cumprod(np.c_[np.ones(P), 1 + growth[:, :-1]], axis=1)  # year 1 = current rent
+    other = params["mgmt_rate"] + params["nonrecup_rate"] + params["capex_rate"] + params["gli_rate"]
+    A = 12.0 * rent_index * (1 - np.clip(vacancy + other, 0.0, 0.95))  # same 95% cap as monthly_net_rent
+
+    shocks = (rng.random((P, H)) < a["capex_shock_prob"]) * rng.exponential(a["capex_shock_pct"], (P, H))
+
+    # Debt service per € financed, year by year (vectorized over paths)
+    n_loan = int(params["duree_annees"] * 12)
+    market = params["taux"] + np.cumsum(rng.normal(0.0, a["rate_sigma_bp"] / 1e4, (P, H)), axis=1)
+    rate = np.full(P, params["taux"])
+    balance = np.ones(P)
+    F = np.empty((P, H))
+    for h in range(H):
+        left = n_loan - 12 * h
+        if a["rate_reset_years"] and h > 0 and h % int(a["rate_reset_years"]) == 0:
+            rate = np.maximum(market[:, h - 1], 0.0)
+        months = min(max(left, 0), 12)
+        payment = pmt_array(rate / 12.0, max(left, 1), balance) if left > 0 else np.zeros(P)
+        F[:, h] = (payment + params["assurance"] / 12.0) * months
+        balance = remaining_balance(balance, rate / 12.0, max(left, 1), months) if left > 0 else balance * 0.0
+
+    price_growth = rng.normal(a["price_growth_mu"], a["price_growth_sigma"], (P, H))
+    resale = np.prod(1 + price_growth, axis=1) * (1 - a["resale_fee"])
+    return {"A": A, "F": F, "S": shocks, "resale": resale, "balance": balance,
+            "fixed": 12.0 * (params["pno_monthly"] + params["taxe_fonciere_monthly"] + params["compta_monthly"])}
+
+def listing_coefficients(df, params, strategy="meuble", cache=None, data_key=None):
+    """(rent_monthly, to_finance, expected_price, cash_in) arrays from the scoring stages;
+    cash_in is the cash actually paid in (scoring.cash_paid_in), the loan covering the rest."""
+    _, x = run_stages(df, params, strategy, cache=cache, data_key=data_key)
+    cash_in = cash_paid_in(x["expected_price"], x["notary_fees"], x["to_finance"], params)
+    return x["rent_est_monthly"], x["to_finance"], x["expected_price"], cash_in
+
+def yearly_cashflows(rent, to_finance, price, f):
+    """Annual cashflows (listings, paths, years) for a chunk of listings."""
+    return (rent[:, None, None] * f["A"][None] - f["fixed"]
+            - to_finance[:, None, None] * f["F"][None] - price[:, None, None] * f["S"][None])
+
+def _summarize(rent, to_finance, price, cash_in, f, irr_paths):
+    """MC_COLUMNS arrays for a chunk of listings."""
+    H = f["A"].shape[1]
+    # Mean monthly cashflow over the horizon, per path: one small matrix product
+    coef = np.c_[rent, np.ones(len(rent)), to_finance, price]
+    per_path = np.stack([f["A"].sum(1), np.full(len(f["A"]), -f["fixed"] * H), -f["F"].sum(1), -f["S"].sum(1)])
+    cf = coef @ per_path / (12.0 * H)
+    q_cf = np.quantile(cf, [0.05, 0.5, 0.95], axis=1)
+
+    # IRR on the first irr_paths paths: equity flows -cash_in, yearly cashflows, resale net of the loan
+    k = min(int(irr_paths), len(f["A"]))
+    sub = {key: (v[:k] if np.ndim(v) else v) for key, v in f.items()}
+    flows = np.empty((len(rent), k, H + 1))
+    flows[..., 0] = -cash_in[:, None]
+    flows[..., 1:] = yearly_cashflows(rent, to_finance, price, sub)
+    flows[..., -1] += price[:, None] * sub["resale"][None] - to_finance[:, None] * sub["balance"][None]
+    rates = irr(flows)
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # listings whose IRR is undefined on every path
+        q_irr = np.nanquantile(np.where(np.isfinite(rates), rates, np.nan), [0.05, 0.5, 0.95], axis=1) \
+            if k else np.full((3, len(rent)), np.nan)
+    return np.column_stack([(cf < 0).mean(axis=1) * 100.0, *q_cf, *(q_irr * 100.0)])
+
+_factors = {}
+
+def _init_worker(factors, irr_paths):
+    _factors.update(f=factors, irr_paths=irr_paths)
+
+def _summarize_chunk(args):
+    return _summarize(*args, _factors["f"], _factors["irr_paths"])
+
+def monte_carlo(df, params, strategy="meuble", n_paths=2000, horizon_years=10, seed=42, assumptions=None,
+                irr_paths=500, chunk_rows=None, workers=None, cache=None, data_key=None):
+    """Risk columns per listing (index of df): P(mean monthly cashflow < 0) in %, P5/P50/P95 of the mean
+    monthly cashflow over the horizon, and P5/P50/P95 of the equity IRR (%, on the first irr_paths paths).
+    Listings are processed in chunks (optionally across `workers` processes); the draws depend only on
+    `seed`, so results do not depend on chunking or workers."""
+    f = risk_factors(params, n_paths, horizon_years, seed, assumptions)
+    rent, to_finance, price, cash_in = (np.asarray(v, dtype=float) for v in
+                                        listing_coefficients(df, params, strategy, cache, data_key))
+    # ~16M float64 per chunk for the IRR flows
+    chunk_rows = chunk_rows or max(1, 16_000_000 // max(1, min(irr_paths, n_paths) * (horizon_years + 1)))
+    chunks = [(rent[i:i + chunk_rows], to_finance[i:i + chunk_rows], price[i:i + chunk_rows], cash_in[i:i + chunk_rows])
+              for i in range(0, len(rent), chunk_rows)]
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(f, irr_paths)) as pool:
+            parts = list(pool.map(_summarize_chunk, chunks))
+    else:
+        parts = [_summarize(*chunk, f, irr_paths) for chunk in chunks]
+    values = np.vstack(parts) if parts else np.empty((0, len(MC_COLUMNS)))
+    return pd.DataFrame(values, index=df.index, columns=MC_COLUMNS)
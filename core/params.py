@@ -0,0 +1,46 @@
+
+import json
+from pathlib import Path
+
+# Same defaults as the widgets of pages/4_Parametres.py (rates as fractions, amounts in €)
+DEFAULT_PARAMS = {
+    "strategy": "meuble",
+    "apply_cap": True, "cap_per_m2": 0.0,
+    "rent_control_cities": ["Paris", "Lille", "Lyon", "Villeurbanne", "Montpellier", "Bordeaux"],
+    "taux": 0.0305, "assurance": 0.003, "duree_annees": 25,
+    "frais_notaires": 0.075, "travaux": 0, "apport": 0,
+    "base_neg": 0.03, "extra_per_30d": 0.005, "neg_max": 0.10,
+    "vacancy_rate": 0.08, "mgmt_rate": 0.07, "nonrecup_rate": 0.05, "capex_rate": 0.05, "gli_rate": 0.025,
+    "pno_monthly": 12.0, "taxe_fonciere_monthly": 0.0, "compta_monthly": 0.0,
+    "proj_horizon": 10, "rent_indexation": 0.015, "charges_indexation": 0.02,
+    "price_growth": 0.01, "resale_fee": 0.05, "discount_rate": 0.05,
+    "tax_enabled": False, "tax_regime": "auto", "tmi": 0.30, "social_rate": 0.172,
+    "land_share": 0.15, "building_years": 30, "furniture_share": 0.05, "furniture_years": 7, "works_years": 10,
+    "rpm2_fallback": {"brest": 9.5, "paris": 30.0},
+    "score_scope": "global",
+}
+
+def load_params(path=None, **overrides):
+    """Scoring params from DEFAULT_PARAMS, updated by a JSON or TOML file and keyword overrides.
+    Normalizes rent_control_cities to a lower-case set and rpm2_fallback to lower-case keys with a 'default'."""
+    params = dict(DEFAULT_PARAMS)
+    if path is not None:
+        path = Path(path)
+        if path.suffix.lower() == ".toml":
+            try:
+                import tomllib  # Python 3.11+
+            except ImportError:
+                import tomli as tomllib  # same API, pip install tomli on Python < 3.11
+            with open(path, "rb") as f:
+                params.update(tomllib.load(f))
+        else:
+            with open(path, encoding="utf-8") as f:
+                params.update(json.load(f))
+    params.update(overrides)
+    params["rent_control_cities"] = {str(c).lower() for c in params["rent_control_cities"]}
+    fallback = {str(k).lower(): float(v) for k, v in params["rpm2_fallback"].items()}
+    if "default" not in fallback:
+        fallback["default"] = sum(fallback.values()) / len(fallback) if fallback else 20.0
+    params["rpm2_fallback"] = fallback
+    params.setdefault("rent_bench_df", None)
+    return params
@@ -0,0 +1,257 @@
+
+"""Portfolio selection: the set of scored listings to buy together under the household's constraints.
+
+Each listing of a compute_scores() output uses equity (the cash paid in: cost minus the loan, i.e. apport
+unless the loan is clipped at 0), a loan (to_finance) and a monthly payment (loan + insurance). The selection maximizes the sum of an
+objective column (cashflow_monthly, cashflow_after_tax, investor_score...; irr_% is weighted by the
+equity it applies to) subject to:
+  - total equity <= apport_total;
+  - debt ratio (credits + new payments) / (income + rent_weight × rents) <= taux_endettement_max
+    (HCSF rule, rents counted at 70%), which is linear: sum(payment - max × rent_weight × rent)
+    <= max × income - credits;
+  - total loans <= capacite_emprunt, at most max_par_ville listings per city and max_biens in all.
+A multi-constraint knapsack. Candidates are ordered by value per unit of the most oversubscribed
+resource (equity, or the debt ratio when loans finance everything): branch and bound with a fractional
+bound on that resource solves it exactly up to EXACT_MAX candidates. Above, two greedy passes (value per
+share of the remaining resources, and plain value) run on a pruned pool (the best listings of each city
+by value and by value per unit of that resource, a few times as many as it can hold); the better one is
+refined by add / swap local search, vectorized over candidates. The result then seeds a branch and bound
+restricted to it and the EXACT_MAX best candidates, when that pool stays under POOL_MAX.
+"""
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+from .scoring import acquisition_costs, cash_paid_in
+
+PORTFOLIO_DEFAULTS = {
+    "apport_total": 50_000.0, "revenus_mensuels": 4_000.0, "credits_mensuels": 0.0,
+    "taux_endettement_max": 0.35, "rent_weight": 0.70,
+    "capacite_emprunt": 0.0,  # 0 = no limit besides the debt ratio
+    "max_par_ville": 2, "max_biens": 0,  # 0 = no limit
+}
+PORTFOLIO_OBJECTIVES = ["cashflow_monthly", "cashflow_after_tax", "irr_%", "investor_score", "npv"]
+EXACT_MAX = 30
+EXACT_NODES = 200_000
+POOL_NODES = 20_000  # node budget of the restricted search after the heuristic
+POOL_MAX = 600  # no restricted search beyond (one recursion level per candidate, POOL_NODES spent anyway)
+PRUNE_KEEP = 4  # heuristic pool: best PRUNE_KEEP × max_par_ville per city, PRUNE_KEEP × max portfolio size overall
+SWAP_CELLS = 2_000_000  # (out, in) pairs evaluated per swap step
+
+def _c(constraints, key):
+    return (constraints or {}).get(key, PORTFOLIO_DEFAULTS[key])
+
+def portfolio_inputs(scored, params, objective="cashflow_monthly"):
+    """Per-listing value, equity, loan, payment and rent (DataFrame aligned on `scored`)."""
+    price = scored["expected_price"].to_numpy(dtype=float, na_value=np.nan)
+    notary, loan = acquisition_costs(price, params)
+    equity = cash_paid_in(price, notary, loan, params)
+    value = scored[objective].to_numpy(dtype=float, na_value=np.nan)
+    if objective == "irr_%":  # a rate: weight it by the equity it earns on
+        value = value / 100.0 * equity
+    return pd.DataFrame({
+        "value": value, "equity": equity,
+        "loan": loan,
+        "payment": (scored["monthly_payment"].to_numpy(dtype=float, na_value=np.nan)
+                    + scored["insurance_monthly"].to_numpy(dtype=float, na_value=np.nan)),
+        "rent": scored["rent_est_monthly"].to_numpy(dtype=float, na_value=np.nan),
+    }, index=scored.index)
+
+def _problem(inputs, constraints):
+    """(resource matrix (n, 3), capacities (3,)) for equity, debt-ratio weight and loan."""
+    max_ratio = _c(constraints, "taux_endettement_max")
+    income = _c(constraints, "revenus_mensuels")
+    debt = inputs["payment"].values - max_ratio * _c(constraints, "rent_weight") * inputs["rent"].values
+    R = np.column_stack([inputs["equity"].values, debt, inputs["loan"].values])
+    caps = np.array([_c(constraints, "apport_total"),
+                     max_ratio * income - _c(constraints, "credits_mensuels") if income > 0 else np.inf,
+                     _c(constraints, "capacite_emprunt") or np.inf], dtype=float)
+    return R, caps
+
+def _key_resource(R, caps):
+    """Column of the most oversubscribed resource (total positive demand / capacity), which orders the
+    candidates and bounds the exact search: equity, or the debt ratio when the loans finance everything."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        load = np.maximum(R, 0.0).sum(axis=0) / caps
+    return int(np.argmax(np.nan_to_num(load, nan=0.0)))
+
+def _branch_and_bound(v, R, caps, city, max_city, max_count, start=None, max_nodes=EXACT_NODES):
+    """Optimal subset (positions) of a small candidate set; (subset, proven optimal)."""
+    n = len(v)
+    b = _key_resource(R, caps)
+    w = np.maximum(R[:, b], 0.0)
+    order = np.argsort(-v / np.maximum(w, 1e-9), kind="stable")  # value per unit of the key resource
+    v, R, city, w = v[order].tolist(), R[order], city[order].tolist(), w[order]
+    eq = w.tolist()
+    cum_eq, cum_v = np.r_[0.0, np.cumsum(w)].tolist(), np.r_[0.0, np.cumsum(v)].tolist()
+    # Room that the remaining items k.. can free (negative demand, e.g. rent above the payment)
+    freed = np.r_[np.cumsum(np.maximum(-R[::-1, b], 0.0))[::-1], 0.0].tolist()
+    rows = [r.tolist() for r in R]
+    best = [0.0, []]
+    if start is not None and len(start):
+        pos = np.argsort(order)[start]
+        best = [float(sum(v[i] for i in pos)), sorted(pos.tolist())]
+    counts = {}
+    nodes = [0]
+
+    def bound(k, value, room):
+        # Fractional knapsack on the key resource alone over items k.. (the other constraints relaxed, the
+        # room they could free granted upfront): items k..m-1 fit whole (prefix sums), then a fraction of item m
+        m = max(bisect_right(cum_eq, cum_eq[k] + room, k) - 1, k)
+        value += cum_v[m] - cum_v[k]
+        return value + v[m] * (room - cum_eq[m] + cum_eq[k]) / eq[m] if m < n else value
+
+    def visit(k, value, used, chosen):
+        nodes[0] += 1
+        if value > best[0]:
+            best[0], best[1] = value, list(chosen)
+        if k == n or len(chosen) == max_count or nodes[0] > max_nodes:
+            return
+        if bound(k, value, caps[b] - used[b] + freed[k]) <= best[0] + 1e-9:
+            return
+        r = rows[k]
+        if counts.get(city[k], 0) < max_city and all(u + x <= c + 1e-9 for u, x, c in zip(used, r, caps)):
+            counts[city[k]] = counts.get(city[k], 0) + 1
+            chosen.append(k)
+            visit(k + 1, value + v[k], [u + x for u, x in zip(used, r)], chosen)
+            chosen.pop()
+            counts[city[k]] -= 1
+        visit(k + 1, value, used, chosen)
+
+    visit(0, 0.0, [0.0] * R.shape[1], [])
+    return order[best[1]], nodes[0] <= max_nodes
+
+def _greedy(v, R, caps, city, max_city, max_count, by_share=True):
+    """Add candidates by best value per share of the remaining resources (or simply by best value when
+    by_share is False), skipping those that no longer fit. Shares are recomputed only once a resource's
+    room has shrunk by a quarter, and passes repeat while one adds something (negative demand can free room)."""
+    chosen = np.zeros(len(v), dtype=bool)
+    used = [0.0] * R.shape[1]
+    counts = [0] * (city.max() + 1)
+    rows, cities, cap = R.tolist(), city.tolist(), caps.tolist()
+    pos_R = np.maximum(R, 0.0)
+    n, added = 0, True
+    while added and n < max_count:
+        room = caps - np.array(used)
+        share = (pos_R / np.where(np.isfinite(room), np.maximum(room, 1e-9), np.inf)).sum(axis=1) if by_share else 1.0
+        order = np.argsort(-(v / np.maximum(share, 1e-9)), kind="stable")
+        shrunk = [u + (c - u) / 4 for u, c in zip(used, cap)]  # recompute shares past these
+        added = False
+        for i in order[~chosen[order]].tolist():
+            r = rows[i]
+            if counts[cities[i]] < max_city and all(u + x <= c + 1e-9 for u, x, c in zip(used, r, cap)):
+                chosen[i] = True; counts[cities[i]] += 1; n += 1; added = True
+                used = [u + x for u, x in zip(used, r)]
+                if n == max_count or (by_share and any(u > h for u, h in zip(used, shrunk))):
+                    break
+    return np.flatnonzero(chosen)
+
+def _prune(v, R, city, max_city, size, b=0, keep=PRUNE_KEEP):
+    """Positions worth a heuristic search: for both orders (value, value per unit of the key resource b),
+    the best keep × max_city of each city among the best keep × size overall. At most max_city listings of
+    a city and `size` in all are picked, so one beaten on both orders by that many others seldom is."""
+    pool = []
+    for score in (v, v / np.maximum(R[:, b], 1e-9)):
+        order = np.argsort(-score, kind="stable")
+        city_rank = pd.Series(city[order]).groupby(city[order]).cumcount().values
+        pool.append(order[city_rank < keep * max_city][:keep * size])
+    return np.unique(np.concatenate(pool))
+
+def _local_search(selected, v, R, caps, city, max_city, max_count, max_rounds=200):
+    """Improving adds (best value first), then improving 1-for-1 swaps: the best swap of every selected
+    listing is evaluated at once, and those still feasible applied by decreasing gain; until neither improves."""
+    chosen = np.zeros(len(v), dtype=bool)
+    chosen[selected] = True
+    counts = np.bincount(city[chosen], minlength=city.max() + 1)
+    used = R[chosen].sum(axis=0)
+    for _ in range(max_rounds):
+        while chosen.sum() < max_count:
+            ok = ~chosen & np.all(R <= caps - used + 1e-9, axis=1) & (counts[city] < max_city)
+            if not ok.any():
+                break
+            i = int(np.argmax(np.where(ok, v, -np.inf)))
+            chosen[i] = True; counts[city[i]] += 1; used += R[i]
+        sel = np.flatnonzero(chosen)
+        better = np.flatnonzero(~chosen & (v > v[sel].min())) if len(sel) else sel  # only these can improve
+        if not len(better):
+            break
+        sel = sel[v[sel] < v[better].max()]
+        R_in, v_in, city_in = R[better], v[better], city[better]
+        chunk = max(1, SWAP_CELLS // len(better))
+        moves = []
+        for s in range(0, len(sel), chunk):  # (out j, in i) matrices of a bounded size
+            j = sel[s:s + chunk]
+            room = caps - used + R[j]
+            ok = counts[city_in][None, :] - (city_in[None, :] == city[j][:, None]) < max_city
+            for d in range(R.shape[1]):
+                ok &= R_in[None, :, d] <= room[:, d, None] + 1e-9
+            gain = np.where(ok, v_in[None, :] - v[j][:, None], -np.inf)
+            k = gain.argmax(axis=1)
+            g = gain[np.arange(len(j)), k]
+            moves += [(g[t], j[t], better[k[t]]) for t in np.flatnonzero(g > 1e-9)]
+        applied = 0
+        for _, j, i in sorted(moves, key=lambda m: -m[0]):
+            room = caps - used + R[j]
+            if (chosen[j] and not chosen[i] and np.all(R[i] <= room + 1e-9)
+                    and counts[city[i]] - (city[i] == city[j]) < max_city):
+                chosen[j], chosen[i] = False, True
+                counts[city[j]] -= 1; counts[city[i]] += 1
+                used += R[i] - R[j]
+                applied += 1
+        if not applied:
+            break
+    return np.flatnonzero(chosen)
+
+def optimize_portfolio(scored, params, objective="cashflow_monthly", constraints=None, city_col=None, method="auto"):
+    """Best combination of the rows of a compute_scores() output. method: "exact" (branch and bound),
+    "heuristic" (greedy + local search) or "auto" (exact up to EXACT_MAX candidates).
+    Returns (selection, summary): the selected rows with their equity / loan / payment, and totals."""
+    inputs = portfolio_inputs(scored, params, objective)
+    R, caps = _problem(inputs, constraints)
+    v = inputs["value"].values
+    # Only listings that add value and fit on their own can be part of an optimal portfolio
+    cand = np.flatnonzero(np.isfinite(v) & (v > 0) & np.all(np.isfinite(R), axis=1) & np.all(R <= caps + 1e-9, axis=1))
+    if city_col is None:
+        city_col = next((c for c in scored.columns if c.lower() in ("city", "ville")), None)
+    city = pd.factorize(scored[city_col].astype(str).values[cand])[0] if city_col else np.zeros(len(cand), dtype=int)
+    max_city = _c(constraints, "max_par_ville") or len(cand)
+    max_count = _c(constraints, "max_biens") or len(cand)
+    v_c, R_c = v[cand], R[cand]
+
+    optimal = False
+    if not len(cand):
+        picked, method = np.empty(0, dtype=int), "exact"
+    else:
+        if method == "auto":
+            method = "exact" if len(cand) <= EXACT_MAX else "heuristic"
+        # At most `size` listings fit in the key resource (the cheapest ones): heuristics run on a pruned pool
+        b = _key_resource(R_c, caps)
+        fit = np.searchsorted(np.cumsum(np.sort(np.maximum(R_c[:, b], 0.0))), caps[b] + 1e-9, side="right")
+        size = min(max_count, int(fit), int(city.max() + 1) * max_city)
+        pool = _prune(v_c, R_c, city, max_city, max(size, 1), b)
+        v_p, R_p, city_p = v_c[pool], R_c[pool], city[pool]
+        starts = [_greedy(v_p, R_p, caps, city_p, max_city, max_count, by_share) for by_share in (True, False)]
+        start = max(starts, key=lambda p: v_p[p].sum())
+        picked = pool[_local_search(start, v_p, R_p, caps, city_p, max_city, max_count)]
+        if method == "exact":  # the heuristic result seeds the incumbent
+            picked, optimal = _branch_and_bound(v_c, R_c, caps, city, max_city, max_count, start=picked)
+        elif len(picked) + EXACT_MAX <= POOL_MAX:
+            ratio = v_c / np.maximum(R_c[:, b], 1e-9)
+            top = np.argpartition(-ratio, EXACT_MAX)[:EXACT_MAX] if len(cand) > EXACT_MAX else np.arange(len(cand))
+            pool = np.union1d(top, picked)
+            sub, _ = _branch_and_bound(v_c[pool], R_c[pool], caps, city[pool], max_city, max_count,
+                                       start=np.searchsorted(pool, picked), max_nodes=POOL_NODES)
+            picked = pool[sub]
+    rows = cand[np.sort(picked)]
+
+    selection = scored.iloc[rows].join(inputs[["equity", "loan", "payment"]].iloc[rows])
+    income = _c(constraints, "revenus_mensuels")
+    payments = float(inputs["payment"].values[rows].sum()) + _c(constraints, "credits_mensuels")
+    rents = float(inputs["rent"].values[rows].sum())
+    summary = {
+        "objective": objective, "value": float(v[rows].sum()), "count": len(rows),
+        "equity": float(inputs["equity"].values[rows].sum()), "loan": float(inputs["loan"].values[rows].sum()),
+        "payment": payments, "cashflow_monthly": float(scored["cashflow_monthly"].to_numpy(dtype=float)[rows].sum()),
+        "debt_ratio_%": payments / (income + _c(constraints, "rent_weight") * rents) * 100.0 if income > 0 else np.nan,
+        "candidates": len(cand), "method": method, "optimal": optimal,
+    }
+    return selection, summary
@@ -0,0 +1,97 @@
+
+"""Lightweight stage timers: wall time, row count and resident-memory delta per step.
+
+    prof = Profiler()
+    with prof.stage("parse", rows=len(df)):
+        ...
+    prof.to_frame() / prof.to_json()
+
+Code under measurement takes `profiler=None` and uses `profiler or NULL_PROFILER`; the disabled
+profiler returns a shared no-op context, so instrumentation costs a method call per stage.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+
+_NOOP = nullcontext()
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_mb():
+    """Current resident set size in MB (Linux /proc); None elsewhere, where only the peak is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / 1e6
+    except OSError:
+        return None
+
+def peak_rss_mb():
+    """Peak resident set size of the process in MB; None if unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak * 1024 / 1e6  # bytes on macOS, KiB on Linux/BSD
+
+class Profiler:
+    """Collects one record per stage: name, seconds, rows, depth (nesting level), mem_delta_mb
+    (+ free-form extra fields). Records are appended when a stage ends, so nested stages come first."""
+
+    def __init__(self, enabled=True, memory=True):
+        self.enabled, self.memory = enabled, memory
+        self.records = []
+        self._depth = 0
+
+    def stage(self, name, rows=None, **extra):
+        if not self.enabled:
+            return _NOOP
+        return self._stage(name, rows, extra)
+
+    @contextmanager
+    def _stage(self, name, rows, extra):
+        mem0 = rss_mb() if self.memory else None
+        depth, self._depth = self._depth, self._depth + 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            self._depth = depth
+            mem1 = rss_mb() if self.memory else None
+            self.records.append(dict(name=name, seconds=seconds, rows=rows, depth=depth,
+                                     mem_delta_mb=None if mem0 is None or mem1 is None else mem1 - mem0, **extra))
+
+    def add(self, name, seconds, rows=None, **extra):
+        """Record a stage timed elsewhere (e.g. in a worker process)."""
+        if self.enabled:
+            self.records.append(dict(name=name, seconds=seconds, rows=rows, depth=self._depth, mem_delta_mb=None, **extra))
+
+    def to_frame(self):
+        """Records as a DataFrame with ms and share_% (of the total time of the outermost stages)."""
+        df = pd.DataFrame(self.records, columns=None if self.records else ["name", "seconds", "rows", "depth", "mem_delta_mb"])
+        if not df.empty:
+            df["ms"] = df["seconds"] * 1000.0
+            total = df.loc[df["depth"] == 0, "seconds"].sum()
+            df["share_%"] = df["seconds"] / total * 100.0 if total > 0 else 0.0
+        return df
+
+    def summary(self):
+        """Records aggregated by stage name: calls, total seconds, rows, memory delta."""
+        df = pd.DataFrame(self.records)
+        if df.empty:
+            return df
+        g = df.groupby("name", sort=False)
+        return pd.DataFrame({"calls": g.size(), "seconds": g["seconds"].sum(),
+                             "rows": g["rows"].sum(min_count=1), "mem_delta_mb": g["mem_delta_mb"].sum(min_count=1)}).reset_index()
+
+    def to_json(self, path=None, **meta):
+        text = json.dumps(dict(meta, peak_rss_mb=peak_rss_mb(), stages=self.records), indent=2, default=str)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+NULL_PROFILER = Profiler(enabled=False)
@@ -0,0 +1,70 @@
+
+"""Year-by-year projection of every listing as (listings, years) arrays, and the return metrics on top.
+
+Rents follow rent_indexation, fixed charges charges_indexation, the loan its amortization (interest /
+principal split from finance.loan_years) and the property is sold at the horizon: DVF median €/m² ×
+surface when available (else the negotiated price), grown by price_growth, minus resale_fee and the
+outstanding balance. Equity put in at t0 is the cash actually paid in (scoring.cash_paid_in: cost minus
+the loan), since notary fees and travaux financed by the loan are already repaid through it.
+"""
+import numpy as np
+import pandas as pd
+from .finance import loan_years, irr, npv
+from .params import DEFAULT_PARAMS
+from .scoring import cash_paid_in, run_stages
+
+PROJECTION_COLUMNS = ["irr_%", "npv", "equity_multiple", "resale_net", "cum_cashflow"]
+
+def _assumption(params, key):
+    # Defaults from core.params for params dicts saved before the projection keys existed
+    return params.get(key, DEFAULT_PARAMS[key])
+
+def project_stages(df, c, x, params, resale_price_sqm=None):
+    """project() from scoring-stage outputs `x` (see scoring.run_stages), e.g. inside another stage."""
+    H = int(_assumption(params, "proj_horizon"))
+    years = np.arange(H)
+
+    rent = x["rent_est_monthly"][:, None] * 12.0 * (1 + _assumption(params, "rent_indexation")) ** years
+    pct = min(max(params["vacancy_rate"] + params["mgmt_rate"] + params["nonrecup_rate"]
+                  + params["capex_rate"] + params["gli_rate"], 0.0), 0.95)  # same cap as monthly_net_rent
+    fixed = 12.0 * (params["pno_monthly"] + params["taxe_fonciere_monthly"] + params["compta_monthly"])
+    charges = rent * pct + fixed * (1 + _assumption(params, "charges_indexation")) ** years
+    loan = loan_years(x["to_finance"], params["taux"], params["duree_annees"], H, params["assurance"])
+    net_rent = rent - charges
+    cashflow = net_rent - loan["interest"] - loan["principal_paid"] - loan["insurance"]
+
+    price_now = x["expected_price"]
+    if resale_price_sqm is not None:
+        dvf_value = np.asarray(resale_price_sqm, dtype=float) * df[c["surface"]].astype(float).values
+        price_now = np.where(np.isfinite(dvf_value) & (dvf_value > 0), dvf_value, price_now)
+    resale_net = price_now * (1 + _assumption(params, "price_growth")) ** H * (1 - _assumption(params, "resale_fee"))
+
+    flows = np.empty((len(df), H + 1))
+    flows[:, 0] = -cash_paid_in(x["expected_price"], x["notary_fees"], x["to_finance"], params)
+    flows[:, 1:] = cashflow
+    flows[:, -1] += resale_net - loan["balance"][:, -1]
+    return dict(rent=rent, charges=charges, net_rent=net_rent, cashflow=cashflow, resale_net=resale_net,
+                flows=flows, **loan)
+
+def project(df, params, strategy="meuble", resale_price_sqm=None, cache=None, data_key=None):
+    """Yearly arrays (listings, horizon): rent, charges, net_rent, interest, principal_paid, insurance,
+    cashflow, balance; plus resale_net (listings,) and the equity flows (listings, horizon + 1).
+    `resale_price_sqm` (one value per listing, NaN = unknown) is typically the DVF median €/m²."""
+    c, x = run_stages(df, params, strategy, cache=cache, data_key=data_key)
+    return project_stages(df, c, x, dict(params, strategy=strategy), resale_price_sqm)
+
+def projection_metrics(df, params, strategy="meuble", resale_price_sqm=None, cache=None, data_key=None):
+    """PROJECTION_COLUMNS per listing (index of df): IRR (%), NPV at discount_rate, equity multiple
+    (distributions / equity put in, yearly shortfalls counting as equity), net resale value and
+    cumulated cashflow over the horizon."""
+    p = project(df, params, strategy, resale_price_sqm, cache, data_key)
+    flows = p["flows"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        multiple = np.maximum(flows, 0).sum(axis=1) / -np.minimum(flows, 0).sum(axis=1)
+    return pd.DataFrame({
+        "irr_%": irr(flows) * 100.0,
+        "npv": npv(flows, _assumption(params, "discount_rate")),
+        "equity_multiple": multiple,
+        "resale_net": p["resale_net"],
+        "cum_cashflow": p["cashflow"].sum(axis=1),
+    }, index=df.index, columns=PROJECTION_COLUMNS)
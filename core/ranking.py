@@ -0,0 +1,32 @@
+
+import numpy as np
+
+def top_n(df, key, n, ascending=False, mask=None):
+    """The `n` best rows of `df` by `key` (largest first unless ascending), sorted, without sorting the
+    whole frame: argpartition selects the candidates, then only those n are ordered. NaN ranks last;
+    ties keep the original row order. `mask` optionally restricts the candidates (boolean array)."""
+    idx = np.flatnonzero(mask) if mask is not None else np.arange(len(df))
+    values = df[key].to_numpy(dtype=float, na_value=np.nan)[idx]
+    values = np.where(np.isnan(values), np.inf, values if ascending else -values)  # smallest first
+    n = max(0, min(int(n), len(idx)))
+    if n == 0:
+        return df.iloc[[]]
+    if n < len(idx):
+        kth = values[np.argpartition(values, n - 1)[n - 1]]
+        better = np.flatnonzero(values < kth)
+        part = np.concatenate([better, np.flatnonzero(values == kth)[:n - len(better)]])
+    else:
+        part = np.arange(len(idx))
+    part = part[np.lexsort((part, values[part]))]
+    return df.iloc[idx[part]]
+
+def filter_mask(df, only_rentable=False, net_yield_min=None, score_min=None):
+    """Boolean mask for the Dashboard thresholds (NaN yields/scores count as 0, like fillna(0))."""
+    mask = np.ones(len(df), dtype=bool)
+    if only_rentable:
+        mask &= df["cashflow_monthly"].to_numpy(dtype=float, na_value=np.nan) >= 0
+    if net_yield_min is not None:
+        mask &= np.nan_to_num(df["net_yield_%"].to_numpy(dtype=float, na_value=np.nan), nan=0.0) >= net_yield_min
+    if score_min is not None:
+        mask &= np.nan_to_num(df["investor_score"].to_numpy(dtype=float, na_value=np.nan), nan=0.0) >= score_min
+    return mask
@@ -0,0 +1,95 @@
+
+"""Rate tables over time and precomputed payment / borrowing-capacity surfaces for the Financement page.
+
+A rate history is the long table (date, duration_years, rate): one file with a date column, or several
+monthly snapshots such as rates_2025-08.csv (date taken from the file name). Several sources for the same
+month and duration are averaged.
+
+The surface holds the monthly payment per € borrowed (annuity + insurance) for every rate × duration
+of a grid; payments are linear in the principal, so any principal (or budget, for the borrowing
+capacity) is a product with it. Lookups interpolate linearly between grid rates (well under 0.01% off
+at 5 bp steps) and the whole history is served by array indexing, without recomputing annuities.
+Rates or durations outside the grid (before the mid-90s French rates exceeded 8%) fall back to the
+exact annuity.
+"""
+import re
+import numpy as np
+import pandas as pd
+from .finance import pmt_array
+
+RATE_GRID = {"rate": (0.0, 0.08, 0.0005), "years": (5, 30, 1)}
+
+def rates_by_years(rates_df):
+    """{duration_years: annual rate} of a snapshot (rate_percent in %); the last row wins per duration."""
+    years = rates_df["duration_years"].astype(int).tolist()
+    return dict(zip(years, (rates_df["rate_percent"].astype(float) / 100.0).tolist()))
+
+def snapshot_date(name):
+    """Month of a snapshot file name ('rates_2025-08.csv' -> Timestamp('2025-08-01')), None if absent."""
+    match = re.search(r"(\d{4})[-_]?(\d{2})", str(name))
+    return pd.Timestamp(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def rate_history(frames, names=None):
+    """Long history (date, duration_years, rate) from rate tables: each has a date / month column,
+    or its date comes from its name (snapshot_date). Rates averaged per (date, duration)."""
+    parts = []
+    for i, df in enumerate(frames):
+        cols = {c.lower(): c for c in df.columns}
+        date_col = cols.get("date") or cols.get("month") or cols.get("mois")
+        if date_col:
+            dates = pd.to_datetime(df[date_col]).dt.to_period("M").dt.to_timestamp()
+        else:
+            date = snapshot_date(names[i]) if names is not None else None
+            if date is None:
+                raise ValueError(f"Date introuvable pour {names[i] if names is not None else i} (colonne date ou nom rates_AAAA-MM).")
+            dates = pd.Series(date, index=df.index)
+        parts.append(pd.DataFrame({"date": dates.values, "duration_years": df[cols["duration_years"]].astype(int).values,
+                                   "rate": df[cols["rate_percent"]].astype(float).values / 100.0}))
+    history = pd.concat(parts, ignore_index=True)
+    return history.groupby(["date", "duration_years"], as_index=False)["rate"].mean().sort_values(["date", "duration_years"])
+
+def _axis(spec):
+    start, stop, step = spec
+    return np.round(np.arange(start, stop + step / 2, step), 10)
+
+def build_surface(insurance_rate_annual=0.0, grid=None):
+    """Payment per € borrowed (rate, years) in € / month, with its rate and years axes."""
+    grid = dict(RATE_GRID, **(grid or {}))
+    rate, years = _axis(grid["rate"]), _axis(grid["years"])
+    factor = pmt_array(rate[:, None] / 12.0, years[None, :] * 12, 1.0) + insurance_rate_annual / 12.0
+    return {"rate": rate, "years": years.astype(int), "factor": factor, "insurance": float(insurance_rate_annual)}
+
+def _factor(surface, rate, years):
+    """Payment per € borrowed at (rate, years) arrays, interpolated between grid rates; exact annuity
+    outside the grid."""
+    rate, years = np.broadcast_arrays(np.asarray(rate, dtype=float), np.asarray(years, dtype=float))
+    axis, grid_years = surface["rate"], surface["years"]
+    inside = (rate >= axis[0]) & (rate <= axis[-1]) & (years >= grid_years[0]) & (years <= grid_years[-1]) \
+        & (years == np.round(years))
+    j = np.clip(np.nan_to_num(years).astype(int) - grid_years[0], 0, len(grid_years) - 1)
+    pos = np.clip(np.nan_to_num((rate - axis[0]) / (axis[1] - axis[0])), 0, len(axis) - 1)
+    lo = np.minimum(pos.astype(int), len(axis) - 2)
+    w = pos - lo
+    f = surface["factor"]
+    out = f[lo, j] * (1 - w) + f[lo + 1, j] * w
+    if not inside.all():
+        exact = pmt_array(rate / 12.0, np.round(years * 12), 1.0) + surface["insurance"] / 12.0
+        out = np.where(inside, out, exact)
+    return out
+
+def payment_lookup(surface, principal, rate, years):
+    """Monthly payment (annuity + insurance) from the surface; broadcasts over arrays."""
+    return np.asarray(principal, dtype=float) * _factor(surface, rate, years)
+
+def capacity_lookup(surface, monthly_budget, rate, years):
+    """Largest principal whose payment fits `monthly_budget`; broadcasts over arrays."""
+    return np.asarray(monthly_budget, dtype=float) / _factor(surface, rate, years)
+
+def history_series(surface, history, years, principal, monthly_budget):
+    """Per date of `history`: rate, monthly payment of `principal` and max borrowable for `monthly_budget`
+    at a `years` duration (dates without that duration are skipped)."""
+    h = history[history["duration_years"] == int(years)]
+    return pd.DataFrame({"rate_%": h["rate"].values * 100,
+                         "payment": payment_lookup(surface, principal, h["rate"].values, years),
+                         "capacity": capacity_lookup(surface, monthly_budget, h["rate"].values, years)},
+                        index=pd.DatetimeIndex(h["date"].values, name="date"))
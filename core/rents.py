@@ -1,4 +1,5 @@
 
+import numpy as np
 import pandas as pd
 
 def normalize_cols(df):
@@ -26,3 +27,54 @@ def apply_rent_cap(total_rent, surface_m2, cap_per_m2=None, apply_cap=False):
     if not apply_cap or not cap_per_m2 or cap_per_m2 <= 0:
         return total_rent
     return min(total_rent, cap_per_m2 * surface_m2)
+
+def build_rent_index(bench_df):
+    """Pre-build the (city, property_type) -> €/m² lookup once per benchmark.
+    Keeps the first row per key, like estimate_rent_per_m2. Returns None if the bench is unusable."""
+    if bench_df is None or bench_df.empty:
+        return None
+    cols = normalize_cols(bench_df)
+    city_col = cols.get("city"); pt_col = cols.get("property_type"); rpm2_col = cols.get("rent_per_m2")
+    if not city_col or not rpm2_col:
+        return None
+    city_keys = bench_df[city_col].str.lower()
+    rpm2 = bench_df[rpm2_col].astype(float)
+    by_city = pd.Series(rpm2.values, index=city_keys.values)
+    by_city = by_city[by_city.index.notna() & ~by_city.index.duplicated(keep="first")]
+    by_city_type = None
+    if pt_col:
+        pt_keys = bench_df[pt_col].str.lower()
+        idx = pd.MultiIndex.from_arrays([city_keys.values, pt_keys.values])
+        by_city_type = pd.Series(rpm2.values, index=idx)
+        keep = city_keys.notna().values & pt_keys.notna().values & ~idx.duplicated(keep="first")
+        by_city_type = by_city_type[keep]
+    return {"city_type": by_city_type, "city": by_city}
+
+def estimate_rent_per_m2_batch(cities, property_types, rent_index, fallback_per_city):
+    """Vectorized estimate_rent_per_m2: city+type, then city, then fallback dict, as column-wise joins.
+    `cities`/`property_types` are string Series (property_types may be None)."""
+    city_keys = cities.astype(str).str.lower().str.strip()
+    if property_types is None:
+        pt_keys = pd.Series("all", index=city_keys.index)
+    else:
+        raw = property_types.astype(str)
+        pt_keys = raw.where(raw != "", "all").str.lower().str.strip()
+    default = fallback_per_city.get("default", 20.0)
+    out = city_keys.map(fallback_per_city).fillna(default).astype(float).values
+    if rent_index is None:
+        return out
+    found = city_keys.map(rent_index["city"]).values.astype(float)
+    if rent_index["city_type"] is not None:
+        idx = pd.MultiIndex.from_arrays([city_keys.values, pt_keys.values])
+        by_ct = rent_index["city_type"].reindex(idx).values.astype(float)
+        by_ct[(pt_keys == "").values] = np.nan
+        found = np.where(np.isnan(by_ct), found, by_ct)
+    return np.where(np.isnan(found), out, found)
+
+def apply_rent_cap_batch(total_rent, surface_m2, cap_per_m2=None, apply_cap=False):
+    """Vectorized apply_rent_cap; `apply_cap` may be a bool or a boolean array (per listing)."""
+    total_rent = np.asarray(total_rent, dtype=float)
+    if not cap_per_m2 or cap_per_m2 <= 0:
+        return total_rent
+    capped = np.minimum(total_rent, cap_per_m2 * np.asarray(surface_m2, dtype=float))
+    return np.where(apply_cap, capped, total_rent)
@@ -0,0 +1,80 @@
+
+import numpy as np
+import pandas as pd
+from .finance import pmt_array
+from .scoring import (resolve_columns, expected_prices, acquisition_costs, rent_inputs, estimated_rent,
+                      monthly_net_rent, investor_score)
+
+CUBE_AXES = ["rate_bp", "duration_years", "strategy", "vacancy_rate"]
+
+def scenario_cube(df, params, rate_bp=(0, 50, 100, 200), durations=(15, 20, 25),
+                  strategies=("nu", "meuble", "colocation"), vacancy_rates=None):
+    """Score every listing under the Cartesian grid rate_bp × durations × strategies × vacancy_rates
+    in one broadcasted pass. Negotiation, fees and rent lookup are computed once per listing.
+
+    Returns a long DataFrame: one row per (listing, scenario); `listing` holds the index of `df`."""
+    c = resolve_columns(df)
+    if vacancy_rates is None:
+        vacancy_rates = (params["vacancy_rate"],)
+    rate_bp = np.asarray(rate_bp, dtype=float)
+    durations = np.asarray(durations, dtype=int)
+    vacancy = np.asarray(vacancy_rates, dtype=float)
+    # Axes: listing, rate, duration, strategy, vacancy
+    n, R, D, S, V = len(df), len(rate_bp), len(durations), len(strategies), len(vacancy)
+
+    # Shared, scenario-independent stages
+    expected_price = expected_prices(df, c, params)
+    notary_fees, to_finance = acquisition_costs(expected_price, params)
+    insurance = to_finance * (params["assurance"] / 12.0)
+    surface, rpm2, capped = rent_inputs(df, c, params)
+
+    # Financing: (n, R, D, 1, 1)
+    rate_m = (params["taux"] + rate_bp / 10000.0) / 12.0
+    payment = pmt_array(rate_m[None, :, None], durations[None, None, :] * 12, to_finance[:, None, None])
+    payment = payment[:, :, :, None, None]
+
+    # Rent: (n, 1, 1, S, 1), net rent: (n, 1, 1, S, V)
+    rent = np.stack([estimated_rent(surface, rpm2, capped, params, s) for s in strategies], axis=1)
+    rent = rent[:, None, None, :]
+    net_rent = np.stack([monthly_net_rent(rent, v, params["mgmt_rate"], params["nonrecup_rate"], params["capex_rate"],
+                                          params["gli_rate"], params["pno_monthly"], params["taxe_fonciere_monthly"],
+                                          params["compta_monthly"]) for v in vacancy], axis=-1)
+    rent = rent[..., None]
+
+    ins = insurance[:, None, None, None, None]
+    shape = (n, R, D, S, V)
+    cashflow = np.broadcast_to(net_rent - payment - ins, shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gross_yield = np.broadcast_to(rent * 12.0 / expected_price[:, None, None, None, None] * 100.0, shape)
+        denom_net = expected_price + notary_fees + params["travaux"]
+        denom_net = np.where(denom_net == 0, np.nan, denom_net)[:, None, None, None, None]
+        net_yield = np.broadcast_to((net_rent - ins) * 12.0 / denom_net * 100.0, shape)
+        cash_in = params["apport"] + notary_fees + params["travaux"]
+        cash_in = np.where(cash_in == 0, np.nan, cash_in)[:, None, None, None, None]
+        coc = cashflow * 12.0 / cash_in * 100.0
+
+    # Score normalized across listings within each scenario, as compute_scores does
+    dom = df[c["dom"]].astype(float).values[:, None, None, None, None] if c["dom"] else None
+    score = investor_score(cashflow, net_yield, gross_yield, dom)
+
+    grid = pd.MultiIndex.from_product([df.index, rate_bp.astype(int), durations, list(strategies), vacancy],
+                                      names=["listing"] + CUBE_AXES)
+    out = pd.DataFrame({
+        "cashflow_monthly": cashflow.ravel(),
+        "gross_yield_%": gross_yield.ravel(),
+        "net_yield_%": net_yield.ravel(),
+        "coc_%": np.broadcast_to(coc, shape).ravel(),
+        "investor_score": np.broadcast_to(score, shape).ravel(),
+    }, index=grid)
+    return out.reset_index()
+
+def robust_scores(cube):
+    """Per-listing summary across scenarios: worst-case score/cashflow and share of scenarios with cashflow ≥ 0."""
+    g = cube.groupby("listing", sort=False)
+    out = pd.DataFrame({
+        "robust_score": g["investor_score"].min(),
+        "median_score": g["investor_score"].median(),
+        "worst_cashflow_monthly": g["cashflow_monthly"].min(),
+        "positive_cf_share_%": (cube["cashflow_monthly"] >= 0).groupby(cube["listing"], sort=False).mean() * 100.0,
+    })
+    return out.sort_values(["robust_score", "worst_cashflow_monthly"], ascending=[False, False])
@@ -1,7 +1,12 @@
 
+import hashlib
+import warnings
+import weakref
 import numpy as np
 import pandas as pd
-from .rents import estimate_rent_per_m2, apply_rent_cap
+from .finance import pmt_array
+from .profiling import NULL_PROFILER
+from .rents import build_rent_index, estimate_rent_per_m2_batch, apply_rent_cap_batch
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
@@ -11,108 +16,304 @@ def monthly_net_rent(gross_monthly_rent, vacancy_rate, mgmt_rate, nonrecup_rate,
     deductions_pct = clamp(vacancy_rate + mgmt_rate + nonrecup_rate + capex_rate + gli_rate, 0.0, 0.95)
     return gross_monthly_rent * (1 - deductions_pct) - (pno_monthly + tf_monthly + compta_monthly)
 
-def compute_scores(df, params, strategy="meuble"):
-    df = df.copy()
+STRATEGY_MULTIPLIERS = {"nu": 1.00, "meuble": 1.10, "colocation": 1.40}  # +10% meublé, +40% coloc (à affiner selon marché)
+SCORE_WEIGHTS = {"cashflow": 0.40, "net_yield": 0.25, "dom": 0.15, "gross_yield": 0.20}
+TAX_OUTPUT = ["tax_regime", "tax_monthly", "cashflow_after_tax", "net_yield_after_tax_%"]  # see core.tax
+GLOBAL_GROUP = "__all__"  # score_bounds() group label when normalizing across all rows
+
+def strategy_multiplier(strategy):
+    return STRATEGY_MULTIPLIERS.get(strategy.lower(), 1.00)
+
+def resolve_columns(df):
+    """Map logical fields to the CSV's column names (price/prix, surface/surface_m2, city/ville...)."""
     cols = {c.lower(): c for c in df.columns}
-    price_col = cols.get("price") or cols.get("prix")
-    surf_col  = cols.get("surface_m2") or cols.get("surface") or cols.get("surface_m²")
-    city_col  = cols.get("city") or cols.get("ville")
-    type_col  = cols.get("property_type") or cols.get("type")
-    dom_col   = cols.get("days_on_market") or cols.get("dom") or cols.get("jours_en_ligne")
-    url_col   = cols.get("url") or cols.get("lien")
-
-    required = [price_col, surf_col, city_col]
-    if any(c is None for c in required):
+    c = {
+        "price": cols.get("price") or cols.get("prix"),
+        "surface": cols.get("surface_m2") or cols.get("surface") or cols.get("surface_m²"),
+        "city": cols.get("city") or cols.get("ville"),
+        "type": cols.get("property_type") or cols.get("type"),
+        "zipcode": cols.get("zipcode") or cols.get("code_postal") or cols.get("cp"),
+        "dom": cols.get("days_on_market") or cols.get("dom") or cols.get("jours_en_ligne"),
+        "url": cols.get("url") or cols.get("lien"),
+    }
+    if any(c[k] is None for k in ("price", "surface", "city")):
         raise ValueError("CSV annonces: colonnes minimales requises = price, surface_m2, city")
+    return c
 
-    # Negotiation
-    base_neg = params["base_neg"]
-    extra_per_30d = params["extra_per_30d"]
-    neg_max = params["neg_max"]
+def expected_prices(df, c, params):
+    """Listing price after negotiation (base + extra per 30 days online, capped at neg_max)."""
+    dom_col = c["dom"]
     if dom_col and df[dom_col].notna().any():
-        extra = (df[dom_col].fillna(0).astype(float) / 30.0) * extra_per_30d
+        extra = (df[dom_col].fillna(0).astype(float).values / 30.0) * params["extra_per_30d"]
     else:
         extra = 0.0
-    neg_rate = (base_neg + extra).clip(0, neg_max)
-    df["expected_price"] = df[price_col].astype(float) * (1 - neg_rate)
-
-    # Acquisition costs
-    df["notary_fees"] = df["expected_price"] * params["frais_notaires"]
-    df["travaux"] = params["travaux"]
-    df["apport"] = params["apport"]
-
-    # Financing
-    df["to_finance"] = (df["expected_price"] + df["notary_fees"] + df["travaux"] - df["apport"]).clip(lower=0)
-    # Monthly payments: use selected duration and rate
-    years = params["duree_annees"]
-    rate_m = params["taux"] / 12.0
-    def pmt(rate_m, n, p):
-        if p <= 0: return 0.0
-        if rate_m == 0: return p / n
-        return p * (rate_m * (1 + rate_m) ** n) / ((1 + rate_m) ** n - 1)
-
-    n_months = int(years * 12)
-    df["monthly_payment"] = df["to_finance"].apply(lambda p: pmt(rate_m, n_months, p))
-    df["insurance_monthly"] = df["to_finance"] * (params["assurance"] / 12.0)
-
-    # Rent estimation + strategy uplift
-    rpm2_fallback = params["rpm2_fallback"]
-    rent_bench_df = params.get("rent_bench_df")
-    apply_cap_flag = params["apply_cap"]
-    cap_per_m2 = params["cap_per_m2"]
-    encadrement_cities = params["rent_control_cities"]
-
-    def strat_multiplier(pt):
-        s = strategy.lower()
-        if s == "nu": return 1.00
-        if s == "meuble": return 1.10  # +10% typiquement
-        if s == "colocation": return 1.40  # +40% (à affiner selon marché)
-        return 1.00
-
-    def row_rent(row):
-        city = str(row[city_col]); pt = str(row[type_col]) if type_col else "all"
-        rpm2 = estimate_rent_per_m2(city, pt, rent_bench_df, rpm2_fallback)
-        est = float(row[surf_col]) * rpm2 * strat_multiplier(pt)
-        capped = apply_rent_cap(est, float(row[surf_col]), cap_per_m2, apply_cap_flag and city.lower() in encadrement_cities)
-        return capped
-
-    df["rent_est_monthly"] = df.apply(row_rent, axis=1)
+    neg_rate = np.clip(params["base_neg"] + extra, 0, params["neg_max"])
+    return df[c["price"]].astype(float).values * (1 - neg_rate)
+
+def acquisition_costs(expected_price, params):
+    """Return (notary_fees, to_finance) arrays; travaux and apport stay scalars."""
+    notary_fees = expected_price * params["frais_notaires"]
+    to_finance = np.clip(expected_price + notary_fees + params["travaux"] - params["apport"], 0, None)
+    return notary_fees, to_finance
+
+def cash_paid_in(expected_price, notary_fees, to_finance, params):
+    """Cash the buyer actually puts in at purchase: total cost minus the loan (apport unless the loan is
+    clipped at 0). Notary fees and travaux financed by the loan are repaid through it, not paid in."""
+    return expected_price + notary_fees + params["travaux"] - to_finance
+
+_rent_indexes = {}  # benchmark fingerprint -> rent index (last 8 benchmarks)
+
+def rent_index(bench_df):
+    """build_rent_index memoized on the benchmark's content: the index is derived from rent_bench_df
+    alone, so the rent_lookup stage and params_hash depend on that table only."""
+    if bench_df is None:
+        return None
+    key = fingerprint(bench_df)
+    if key not in _rent_indexes:
+        if len(_rent_indexes) >= 8:
+            _rent_indexes.pop(next(iter(_rent_indexes)))
+        _rent_indexes[key] = build_rent_index(bench_df)
+    return _rent_indexes[key]
+
+def rent_inputs(df, c, params):
+    """Strategy-independent rent inputs: (surface, €/m², rent-control mask)."""
+    index = rent_index(params.get("rent_bench_df"))
+    # Look up each distinct (city, type) pair once, then broadcast back with integer codes
+    city_codes, city_uniques = pd.factorize(df[c["city"]], use_na_sentinel=False)
+    if c["type"]:
+        type_codes, type_uniques = pd.factorize(df[c["type"]], use_na_sentinel=False)
+        types = pd.Series(type_uniques).astype(str)
+    else:
+        type_codes, types = np.zeros(len(df), dtype=np.intp), pd.Series(["all"])
+    pairs, inverse = np.unique(city_codes * len(types) + type_codes, return_inverse=True)
+    cities = pd.Series(city_uniques).astype(str)
+    pair_cities = cities.iloc[pairs // len(types)].reset_index(drop=True)
+    pair_types = types.iloc[pairs % len(types)].reset_index(drop=True)
+    rpm2 = estimate_rent_per_m2_batch(pair_cities, pair_types, index, params["rpm2_fallback"])[inverse]
+    surface = df[c["surface"]].astype(float).values
+    capped = params["apply_cap"] and cities.str.lower().isin(params["rent_control_cities"]).values[city_codes]
+    return surface, rpm2, capped
+
+def estimated_rent(surface, rpm2, capped, params, strategy):
+    est = surface * rpm2 * strategy_multiplier(strategy)
+    return apply_rent_cap_batch(est, surface, params["cap_per_m2"], capped)
+
+def normalize(values, groups=None, bounds=None):
+    """Min-max scale along axis 0 (non-finite values ignored for the bounds); 0.5 when flat or empty.
+    With `groups` (one label per row, 1-D values only) the bounds are taken per group.
+    `bounds` = (lo, hi), scalars or per-row arrays, overrides the bounds (e.g. merged across chunks)."""
+    a = np.asarray(values, dtype=float)
+    if bounds is not None:
+        lo, hi = bounds
+    elif groups is None:
+        finite = np.where(np.isfinite(a), a, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lo = np.nanmin(finite, axis=0); hi = np.nanmax(finite, axis=0)
+    else:
+        g = pd.Series(np.where(np.isfinite(a), a, np.nan)).groupby(np.asarray(groups))
+        lo = g.transform("min").values; hi = g.transform("max").values
+    flat = ~(hi > lo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (a - lo) / np.where(flat, 1.0, hi - lo)
+    return np.where(flat, 0.5, out)
+
+def score_bounds(cashflow, net_yield, gross_yield, dom=None, groups=None):
+    """Finite min/max of each score feature, per group (or under GLOBAL_GROUP). Bounds from several
+    chunks combine with merge_score_bounds(), giving the same scores as one pass over all rows."""
+    feats = pd.DataFrame({"cashflow": np.asarray(cashflow, dtype=float), "net_yield": np.asarray(net_yield, dtype=float),
+                          "gross_yield": np.asarray(gross_yield, dtype=float),
+                          "dom": np.asarray(dom, dtype=float) if dom is not None else np.nan})
+    feats = feats.where(np.isfinite(feats))
+    g = feats.groupby(np.asarray(groups) if groups is not None else np.full(len(feats), GLOBAL_GROUP))
+    return pd.concat({"min": g.min(), "max": g.max()}, axis=1)
+
+def merge_score_bounds(parts):
+    b = pd.concat(parts)
+    return pd.concat({"min": b["min"].groupby(level=0).min(), "max": b["max"].groupby(level=0).max()}, axis=1)
 
+def investor_score(cashflow, net_yield, gross_yield, dom=None, groups=None, bounds=None):
+    """Weighted score /100 from min-max normalized features (normalized along axis 0, or per group).
+    With `bounds` from score_bounds()/merge_score_bounds() the normalization uses those bounds."""
+    w = SCORE_WEIGHTS
+    feats = {"cashflow": cashflow, "net_yield": net_yield, "gross_yield": gross_yield, "dom": dom}
+    norm = {}
+    for name, values in feats.items():
+        if values is None:
+            continue
+        b = None
+        if bounds is not None:
+            rows = bounds.reindex(np.asarray(groups) if groups is not None else np.full(len(values), GLOBAL_GROUP))
+            b = (rows[("min", name)].values, rows[("max", name)].values)
+        norm[name] = normalize(values, groups, b)
+    norm_dom = norm.get("dom", 0.5)
+    score = w["cashflow"] * norm["cashflow"] + w["net_yield"] * norm["net_yield"] \
+        + w["dom"] * (1 - norm_dom) + w["gross_yield"] * norm["gross_yield"]
+    return np.where(np.isnan(score), 0, score) * 100.0
+
+_frame_tokens = {}  # id -> (weakref, token); parameter DataFrames are treated as immutable
+
+def fingerprint(value):
+    """Comparable token for a parameter value (DataFrames by content, sets/dicts by items)."""
+    if isinstance(value, pd.DataFrame):
+        ref, token = _frame_tokens.get(id(value), (None, None))
+        if ref is None or ref() is not value:
+            token = ("df", tuple(value.columns), int(pd.util.hash_pandas_object(value, index=True).sum()))
+            _frame_tokens[id(value)] = (weakref.ref(value, lambda _, k=id(value): _frame_tokens.pop(k, None)), token)
+        return token
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value, key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((k, fingerprint(v)) for k, v in value.items()))
+    return value
+
+# ---- Scoring stages: fn(df, cols, params, outputs so far) -> dict of arrays ----
+
+def _stage_prices(df, c, p, x):
+    return {"expected_price": expected_prices(df, c, p)}
+
+def _stage_acquisition(df, c, p, x):
+    notary_fees, to_finance = acquisition_costs(x["expected_price"], p)
+    return {"notary_fees": notary_fees, "to_finance": to_finance}
+
+def _stage_financing(df, c, p, x):
+    n_months = int(p["duree_annees"] * 12)
+    return {"monthly_payment": pmt_array(p["taux"] / 12.0, n_months, x["to_finance"]),
+            "insurance_monthly": x["to_finance"] * (p["assurance"] / 12.0)}
+
+def _stage_rent_lookup(df, c, p, x):
+    surface, rpm2, capped = rent_inputs(df, c, p)
+    return {"surface": surface, "rpm2": rpm2, "capped": capped}
+
+def _stage_rent(df, c, p, x):
+    return {"rent_est_monthly": estimated_rent(x["surface"], x["rpm2"], x["capped"], p, p["strategy"])}
+
+def _stage_net_rent(df, c, p, x):
     # Operating net rent (deductions + fixed)
-    vacancy_rate = params["vacancy_rate"]; mgmt_rate = params["mgmt_rate"]
-    nonrecup_rate = params["nonrecup_rate"]; capex_rate = params["capex_rate"]
-    gli_rate = params["gli_rate"]; pno_monthly = params["pno_monthly"]; tf_monthly = params["taxe_fonciere_monthly"]; compta_monthly = params["compta_monthly"]
+    return {"net_rent_monthly": monthly_net_rent(x["rent_est_monthly"], p["vacancy_rate"], p["mgmt_rate"],
+                                                 p["nonrecup_rate"], p["capex_rate"], p["gli_rate"],
+                                                 p["pno_monthly"], p["taxe_fonciere_monthly"], p["compta_monthly"])}
 
-    df["net_rent_monthly"] = df["rent_est_monthly"].apply(lambda r: monthly_net_rent(r, vacancy_rate, mgmt_rate, nonrecup_rate, capex_rate, gli_rate, pno_monthly, tf_monthly, compta_monthly))
+def _stage_metrics(df, c, p, x):
+    cashflow = x["net_rent_monthly"] - x["monthly_payment"] - x["insurance_monthly"]
+    denom_net = x["expected_price"] + x["notary_fees"] + p["travaux"]
+    cash_in = p["apport"] + x["notary_fees"] + p["travaux"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "cashflow_monthly": cashflow,
+            "gross_yield_%": (x["rent_est_monthly"] * 12.0) / x["expected_price"] * 100.0,
+            "net_yield_%": ((x["net_rent_monthly"] - x["insurance_monthly"]) * 12.0) / np.where(denom_net == 0, np.nan, denom_net) * 100.0,
+            "coc_%": (cashflow * 12.0) / np.where(cash_in == 0, np.nan, cash_in) * 100.0,
+        }
 
-    # Cashflow
-    df["cashflow_monthly"] = df["net_rent_monthly"] - df["monthly_payment"] - df["insurance_monthly"]
+def _stage_score(df, c, p, x):
+    dom = df[c["dom"]] if c["dom"] else None
+    # "city": normalize within each city (as when scoring one city at a time); "global": across all rows
+    groups = df[c["city"]].astype(str).values if p.get("score_scope", "global") == "city" else None
+    return {"investor_score": investor_score(x["cashflow_monthly"], x["net_yield_%"], x["gross_yield_%"], dom, groups)}
 
-    # Yields
-    df["gross_yield_%"] = (df["rent_est_monthly"] * 12.0) / df["expected_price"] * 100.0
-    denom_net = (df["expected_price"] + df["notary_fees"] + df["travaux"]).replace(0, np.nan)
-    df["net_yield_%"] = ((df["net_rent_monthly"] - df["insurance_monthly"]) * 12.0) / denom_net * 100.0
+def _stage_tax(df, c, p, x):
+    # Opt-in: projects every listing over the horizon, so it is skipped unless tax_enabled
+    if not p.get("tax_enabled"):
+        return {}
+    from .tax import tax_stage  # core.tax imports this module (via core.projection)
+    return tax_stage(df, c, x, p)
 
-    # Cash-on-cash
-    cash_in = (df["apport"] + df["notary_fees"] + df["travaux"]).replace(0, np.nan)
-    df["coc_%"] = (df["cashflow_monthly"] * 12.0) / cash_in * 100.0
+# (name, parameter keys, upstream stages, fn) in execution order
+SCORING_STAGES = [
+    ("prices", ("base_neg", "extra_per_30d", "neg_max"), (), _stage_prices),
+    ("acquisition", ("frais_notaires", "travaux", "apport"), ("prices",), _stage_acquisition),
+    ("financing", ("taux", "duree_annees", "assurance"), ("acquisition",), _stage_financing),
+    ("rent_lookup", ("rent_bench_df", "rpm2_fallback", "apply_cap", "rent_control_cities"), (), _stage_rent_lookup),
+    ("rent", ("strategy", "cap_per_m2"), ("rent_lookup",), _stage_rent),
+    ("net_rent", ("vacancy_rate", "mgmt_rate", "nonrecup_rate", "capex_rate", "gli_rate",
+                  "pno_monthly", "taxe_fonciere_monthly", "compta_monthly"), ("rent",), _stage_net_rent),
+    ("metrics", ("travaux", "apport"), ("prices", "acquisition", "financing", "rent", "net_rent"), _stage_metrics),
+    ("score", ("score_scope",), ("metrics",), _stage_score),
+    ("tax", ("tax_enabled", "tax_regime", "tmi", "social_rate", "land_share", "building_years", "furniture_share",
+             "furniture_years", "works_years", "proj_horizon", "rent_indexation", "charges_indexation"),
+     ("metrics",), _stage_tax),
+]
 
-    # Normalize features for score
-    def normalize(series):
-        s = series.replace([np.inf, -np.inf], np.nan).dropna()
-        if s.empty or s.max() == s.min():
-            return pd.Series([0.5] * len(series), index=series.index)
-        return (series - s.min()) / (s.max() - s.min())
+def run_stages(df, params, strategy="meuble", cache=None, data_key=None, profiler=None):
+    """Run SCORING_STAGES and return (cols, outputs). With a `cache` dict and a `data_key` identifying
+    the listings (e.g. a content hash), only stages whose parameters or upstream stages changed are recomputed.
+    A core.profiling.Profiler records one timing per stage (cached stages included, flagged)."""
+    prof = profiler or NULL_PROFILER
+    c = resolve_columns(df)
+    p = dict(params, strategy=strategy)
+    if cache is None:
+        cache = {}
+    if data_key is None or cache.get("_data_key") != data_key:
+        cache.clear()
+        cache["_data_key"] = data_key
+    outputs, recomputed = {}, set()
+    for name, keys, upstream, fn in SCORING_STAGES:
+        token = tuple(fingerprint(p.get(k)) for k in keys)
+        hit = cache.get(name)
+        stale = hit is None or hit[0] != token or bool(recomputed.intersection(upstream))
+        with prof.stage(f"scoring.{name}", rows=len(df), cached=not stale):
+            if stale:
+                cache[name] = (token, fn(df, c, p, outputs))
+                recomputed.add(name)
+        outputs.update(cache[name][1])
+    cache["_last_recomputed"] = [name for name, *_ in SCORING_STAGES if name in recomputed]
+    return c, outputs
 
-    norm_cf = normalize(df["cashflow_monthly"])
-    norm_net_yield = normalize(df["net_yield_%"])
-    norm_dom = normalize(df[dom_col]) if dom_col in df.columns else pd.Series([0.5] * len(df), index=df.index)
+def params_hash(params):
+    """Stable hex digest of a params dict."""
+    token = fingerprint(params)
+    return hashlib.sha1(repr(token).encode()).hexdigest()
 
-    df["investor_score"] = (0.40 * norm_cf) + (0.25 * norm_net_yield) + (0.15 * (1 - norm_dom)) + (0.20 * normalize(df["gross_yield_%"]))
-    df["investor_score"] = df["investor_score"].fillna(0) * 100.0
+def compact_listings(df):
+    """Keep only the columns scoring reads, with categorical city/type, float32 floats and downcast integers."""
+    c = resolve_columns(df)
+    keep = [c[k] for k in ("price", "surface", "city", "type", "dom", "zipcode") if c[k]]
+    out = {}
+    for col in keep:
+        s = df[col]
+        if col in (c["city"], c["type"], c["zipcode"]):
+            s = s.astype("category")
+        elif pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            s = s.astype("float32")
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
 
-    # Sort
-    df = df.sort_values(["cashflow_monthly", "investor_score"], ascending=[False, False])
+def attach_columns(results, source_df, columns=None):
+    """Join display columns (url, title, id... by default every source column not in `results`)
+    back onto a scored subset, typically the displayed top-N."""
+    if columns is None:
+        columns = [col for col in source_df.columns if col not in results.columns]
+    return results.join(source_df.loc[results.index, columns])
+
+def cashflow_breakdown(listing, params, strategy="meuble"):
+    """Full-precision monthly cashflow decomposition for one listing (1-row DataFrame)."""
+    _, x = run_stages(listing, params, strategy)
+    rent = float(x["rent_est_monthly"][0])
+    pct = {"Vacance": params["vacancy_rate"], "Gestion locative": params["mgmt_rate"],
+           "Charges non récupérables": params["nonrecup_rate"], "CapEx / entretien": params["capex_rate"], "GLI": params["gli_rate"]}
+    total_pct = sum(pct.values())
+    scale = clamp(total_pct, 0.0, 0.95) / total_pct if total_pct > 0 else 0.0  # same 95% cap as monthly_net_rent
+    rows = [("Loyer estimé (brut)", rent)]
+    rows += [(label, -rent * rate * scale) for label, rate in pct.items()]
+    rows += [("PNO", 0.0 - params["pno_monthly"]), ("Taxe foncière", 0.0 - params["taxe_fonciere_monthly"]),
+             ("Comptabilité", 0.0 - params["compta_monthly"]),
+             ("Loyer net", float(x["net_rent_monthly"][0])),
+             ("Mensualité (hors assur.)", -float(x["monthly_payment"][0])),
+             ("Assurance empr.", -float(x["insurance_monthly"][0])),
+             ("Cashflow net", float(x["cashflow_monthly"][0]))]
+    return pd.DataFrame(rows, columns=["poste", "€ / mois"])
+
+def compute_scores(df, params, strategy="meuble", cache=None, data_key=None, compact=False, sort=True, profiler=None):
+    """Score listings. With compact=True the output keeps float32 metrics and no text columns
+    (url...); use attach_columns() on the rows actually displayed. sort=False skips the full
+    sort when the caller ranks with core.ranking.top_n."""
+    prof = profiler or NULL_PROFILER
+    c, x = run_stages(df, params, strategy, cache=cache, data_key=data_key, profiler=profiler)
+    price_col, surf_col, city_col = c["price"], c["surface"], c["city"]
+    dom_col, url_col = c["dom"], c["url"]
 
     # Final columns
     out_cols = [
@@ -121,11 +322,19 @@ def compute_scores(df, params, strategy="meuble"):
         "monthly_payment", "insurance_monthly",
         "cashflow_monthly", "gross_yield_%", "net_yield_%", "coc_%", "investor_score"
     ]
-    if dom_col in df.columns:
+    if dom_col:
         out_cols.insert(3, dom_col)
-    if url_col in df.columns:
+    out_cols += [col for col in TAX_OUTPUT if col in x]
+    if url_col and not compact:
         out_cols.append(url_col)
-    for c in out_cols:
-        if c not in df.columns: # safety
-            df[c] = None
-    return df[out_cols]
+    with prof.stage("scoring.output", rows=len(df)):
+        out = pd.DataFrame({col: (x[col].astype(np.float32, copy=False) if compact and x[col].dtype.kind == "f" else x[col])
+                            if col in x else df[col].values
+                            for col in out_cols}, index=df.index)
+
+    if not sort:
+        return out
+    # Sort by cashflow then score, descending (stable, NaN last like sort_values)
+    with prof.stage("scoring.sort", rows=len(df)):
+        order = np.lexsort((-x["investor_score"], -x["cashflow_monthly"]))
+        return out.iloc[order]
@@ -0,0 +1,213 @@
+
+"""Local listing store (SQLite file): daily feed snapshots, price history and incremental scoring.
+
+    conn = open_store()
+    upsert_snapshot(conn, feed_df, seen_on="2025-08-01")   # new / changed rows flagged dirty
+    listings, scores = query_scores(conn, params, strategy, city="Brest")  # rescores dirty rows first
+
+Listings are keyed by the feed's id (else url). A row is rescored when its price, surface, city,
+zipcode or type changes, or when its age crosses a DOM_RESCORE_DAYS boundary (the negotiation margin
+grows with days on market), or when the parameters change. Between two boundaries the stored
+expected_price and cashflow of an unchanged listing lag its age by up to DOM_RESCORE_DAYS - 1 days of
+negotiation margin (extra_per_30d × 6/30, 0.1% of the price with the defaults); DOM_RESCORE_DAYS = 1
+rescores on every change of age. Scores keep the raw metrics; the per-city min/max of the score features
+over the active rows are refreshed in SQL after each rescore, and investor_score is normalized with them
+at query time, so a partial rescore normalizes like a full one.
+
+Use one connection per thread / session (open_store): upsert_snapshot works in a connection-local temp
+table and transaction. Concurrent writers on separate connections are serialized by SQLite.
+"""
+import sqlite3
+from datetime import date
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .dvf import normalize_zipcode
+from .scoring import compute_scores, investor_score, merge_score_bounds, params_hash, resolve_columns, GLOBAL_GROUP
+
+STORE_PATH = Path(".cache/listings.sqlite")
+DOM_RESCORE_DAYS = 7
+LISTING_COLUMNS = ["listing_id", "city", "zipcode", "property_type", "price", "surface_m2", "days_on_market", "title", "url"]
+SCORE_COLUMNS = ["expected_price", "rent_est_monthly", "net_rent_monthly", "monthly_payment", "insurance_monthly",
+                 "cashflow_monthly", "gross_yield_%", "net_yield_%", "coc_%"]
+# investor_score features (score_bounds names) -> stored columns
+BOUND_FEATURES = {"cashflow": "cashflow_monthly", "net_yield": "net_yield_%", "gross_yield": "gross_yield_%",
+                  "dom": "days_on_market"}
+CHUNK_ROWS = 200_000
+
+def _q(name):
+    return '"' + name + '"'
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY, city TEXT, zipcode TEXT, property_type TEXT, price REAL, surface_m2 REAL,
+    days_on_market REAL, title TEXT, url TEXT, first_seen TEXT, last_seen TEXT, row_hash TEXT, dirty INTEGER);
+CREATE INDEX IF NOT EXISTS ix_listings_city ON listings(city);
+CREATE INDEX IF NOT EXISTS ix_listings_zipcode ON listings(zipcode);
+CREATE INDEX IF NOT EXISTS ix_listings_type ON listings(property_type);
+CREATE INDEX IF NOT EXISTS ix_listings_last_seen ON listings(last_seen);
+CREATE INDEX IF NOT EXISTS ix_listings_dirty ON listings(dirty) WHERE dirty = 1;
+CREATE TABLE IF NOT EXISTS price_history (
+    listing_id TEXT, seen_on TEXT, price REAL, PRIMARY KEY (listing_id, seen_on)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (listing_id TEXT PRIMARY KEY, {", ".join(_q(c) + " REAL" for c in SCORE_COLUMNS)});
+CREATE TABLE IF NOT EXISTS score_bounds (
+    city TEXT PRIMARY KEY, {", ".join(f"min_{k} REAL, max_{k} REAL" for k in BOUND_FEATURES)});
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+def open_store(path=STORE_PATH, timeout=30.0):
+    """New connection to the store; not to be shared between concurrent threads."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # check_same_thread=False: a Streamlit session may rerun on another thread, never two at once
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _feed_frame(df):
+    """Feed rows in the store's columns (resolve_columns aliases); id, else url, is the key."""
+    c = resolve_columns(df)
+    cols = {k.lower(): k for k in df.columns}
+    key = cols.get("id") or c["url"]
+    if key is None:
+        raise ValueError("Base locale : une colonne id ou url est requise pour suivre les annonces.")
+    def text(col):
+        return df[col].astype("string").values if col else None
+    out = pd.DataFrame({
+        "listing_id": text(key), "city": text(c["city"]),
+        "zipcode": normalize_zipcode(df[c["zipcode"]]).values if c["zipcode"] else None,
+        "property_type": text(c["type"]),
+        "price": df[c["price"]].astype(float).values, "surface_m2": df[c["surface"]].astype(float).values,
+        "days_on_market": df[c["dom"]].astype(float).values if c["dom"] else np.nan,
+        "title": text(cols.get("title") or cols.get("titre")), "url": text(c["url"]),
+    })
+    out = out.dropna(subset=["listing_id"]).drop_duplicates("listing_id", keep="last")
+    # Columns that change the score (days on market handled separately)
+    out["row_hash"] = pd.util.hash_pandas_object(out[["price", "surface_m2", "city", "zipcode", "property_type"]],
+                                                 index=False).astype(str).values
+    return out
+
+def _records(frame):
+    return frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+def upsert_snapshot(conn, df, seen_on=None):
+    """Merge one feed snapshot: insert new listings, update changed ones, append price changes to
+    price_history. Listings missing from the snapshot are kept (inactive). Returns counts."""
+    seen_on = str(seen_on or date.today())
+    feed = _feed_frame(df)
+    cols = list(feed.columns)
+    with conn:
+        # Take the write lock up front: a read-then-write transaction cannot wait for another writer
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS temp.snapshot")
+        conn.execute(f"CREATE TEMP TABLE snapshot ({', '.join(cols)})")
+        conn.executemany(f"INSERT INTO temp.snapshot VALUES ({', '.join('?' * len(cols))})", _records(feed))
+        conn.execute("CREATE INDEX temp.ix_snapshot ON snapshot(listing_id)")
+        new, price_changes = conn.execute("""
+            SELECT SUM(l.listing_id IS NULL), SUM(l.listing_id IS NOT NULL AND l.price IS NOT s.price)
+            FROM temp.snapshot s LEFT JOIN listings l USING (listing_id)""").fetchone()
+        conn.execute("""
+            INSERT OR IGNORE INTO price_history
+            SELECT s.listing_id, :seen, s.price FROM temp.snapshot s LEFT JOIN listings l USING (listing_id)
+            WHERE l.listing_id IS NULL OR l.price IS NOT s.price""", {"seen": seen_on})
+        # Without a days_on_market column, age = days since first seen
+        has_dom = feed["days_on_market"].notna().any()
+        age = "COALESCE(excluded.days_on_market, 0)" if has_dom else "julianday(:seen) - julianday(listings.first_seen)"
+        conn.execute(f"""
+            INSERT INTO listings ({', '.join(cols)}, first_seen, last_seen, dirty)
+            SELECT {', '.join(c if c != 'days_on_market' else 'COALESCE(days_on_market, 0)' for c in cols)}, :seen, :seen, 1
+            FROM temp.snapshot WHERE true
+            ON CONFLICT (listing_id) DO UPDATE SET
+                {', '.join(f'{c} = excluded.{c}' for c in cols if c not in ('listing_id', 'days_on_market'))},
+                days_on_market = {age},
+                last_seen = :seen,
+                dirty = listings.dirty OR listings.row_hash IS NOT excluded.row_hash
+                    OR CAST(listings.days_on_market / :bucket AS INTEGER) != CAST(({age}) / :bucket AS INTEGER)""",
+                     {"seen": seen_on, "bucket": DOM_RESCORE_DAYS})
+        dirty = conn.execute("SELECT COUNT(*) FROM listings WHERE dirty = 1").fetchone()[0]
+        _set_meta(conn, "bounds_stale", "1")  # the active set changed
+        conn.execute("DROP TABLE temp.snapshot")
+    return {"rows": len(feed), "new": int(new or 0), "price_changes": int(price_changes or 0), "to_rescore": dirty}
+
+def _score_key(params, strategy):
+    # score_scope only affects the query-time normalization
+    return f"{strategy}:{params_hash({k: v for k, v in params.items() if k != 'score_scope'})}"
+
+def _read(conn, sql, args=()):
+    return pd.read_sql_query(sql, conn, params=args)
+
+def _meta(conn, name):
+    row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+def _set_meta(conn, name, value):
+    conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+def _active(conn):
+    return conn.execute("SELECT MAX(last_seen) FROM listings").fetchone()[0]
+
+def rescore(conn, params, strategy="meuble", chunk_rows=CHUNK_ROWS):
+    """compute_scores on listings that are new or changed (all of them when the parameters changed),
+    then refresh the per-city score bounds of the active rows. Returns the number of rows scored."""
+    key = _score_key(params, strategy)
+    if _meta(conn, "params_key") != key:
+        with conn:
+            conn.execute("UPDATE listings SET dirty = 1")
+            _set_meta(conn, "params_key", key)
+    select = f"SELECT {', '.join(LISTING_COLUMNS)} FROM listings WHERE dirty = 1 LIMIT ?"
+    done = 0
+    while True:  # scored rows drop out of the selection
+        chunk = _read(conn, select, (chunk_rows,))
+        if chunk.empty:
+            break
+        out = compute_scores(chunk, params, strategy, sort=False)
+        rows = pd.concat([chunk["listing_id"], out[SCORE_COLUMNS]], axis=1)
+        with conn:
+            conn.executemany(f"INSERT OR REPLACE INTO scores VALUES ({', '.join('?' * rows.shape[1])})", _records(rows))
+            conn.executemany("UPDATE listings SET dirty = 0 WHERE listing_id = ?", ((i,) for i in chunk["listing_id"]))
+            _set_meta(conn, "bounds_stale", "1")
+        done += len(chunk)
+    if _meta(conn, "bounds_stale") == "1":
+        agg = ", ".join(f"MIN({_q(v)}), MAX({_q(v)})" for v in BOUND_FEATURES.values())
+        with conn:
+            conn.execute("DELETE FROM score_bounds")
+            conn.execute(f"INSERT INTO score_bounds SELECT l.city, {agg} FROM listings l JOIN scores s USING (listing_id) "
+                         "WHERE l.last_seen = ? AND l.city IS NOT NULL GROUP BY l.city", (_active(conn),))
+            _set_meta(conn, "bounds_stale", "0")
+    return done
+
+def store_cities(conn):
+    """Cities of the active listings (latest snapshot)."""
+    return [r[0] for r in conn.execute("SELECT DISTINCT city FROM listings WHERE last_seen = ? ORDER BY city",
+                                       (_active(conn),)) if r[0] is not None]
+
+def query_scores(conn, params, strategy="meuble", city=None, zipcode=None, property_type=None):
+    """(listings, scores) of the active rows matching the indexed filters, both indexed by listing_id;
+    scores has the compute_scores columns. Rescores new / changed rows first. investor_score uses the
+    stored bounds of every active row (score_scope "global") or of the row's city ("city")."""
+    rescore(conn, params, strategy)
+    where, args = ["l.last_seen = ?"], [_active(conn)]
+    for col, value in (("city", city), ("zipcode", zipcode), ("property_type", property_type)):
+        if value is not None:
+            where.append(f"l.{col} = ?"); args.append(value)
+    rows = _read(conn, f"SELECT l.*, {', '.join('s.' + _q(c) for c in SCORE_COLUMNS)} FROM listings l "
+                       f"JOIN scores s USING (listing_id) WHERE {' AND '.join(where)}", args).set_index("listing_id")
+    listings = rows[[c for c in LISTING_COLUMNS if c != "listing_id"]]
+
+    bounds = _read(conn, "SELECT * FROM score_bounds").set_index("city").astype(float)
+    bounds.columns = pd.MultiIndex.from_tuples([tuple(c.split("_", 1)) for c in bounds.columns])
+    groups = rows["city"].values
+    if params.get("score_scope", "global") != "city":
+        bounds = merge_score_bounds([bounds.rename(lambda _: GLOBAL_GROUP)])
+        groups = None
+    scores = rows[["city", "surface_m2", "price", "days_on_market"] + SCORE_COLUMNS].copy()
+    scores["investor_score"] = investor_score(rows["cashflow_monthly"].values, rows["net_yield_%"].values,
+                                              rows["gross_yield_%"].values, rows["days_on_market"].values,
+                                              groups, bounds)
+    scores["url"] = rows["url"]
+    return listings, scores
+
+def price_history(conn, listing_id):
+    return _read(conn, "SELECT seen_on, price FROM price_history WHERE listing_id = ? ORDER BY seen_on", (str(listing_id),))
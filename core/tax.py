@@ -0,0 +1,116 @@
+
+"""French income tax on rental income, per listing and per year (arrays of shape (listings, years)).
+
+Regimes: location nue -> micro-foncier (30% allowance) or réel foncier (charges and interest deducted,
+non-interest deficit charged to global income up to 10 700 €/year, the rest carried forward 10 years);
+meublé / colocation -> micro-BIC (50% allowance) or LMNP réel (charges, interest and depreciation of
+building / furniture / works; depreciation never creates a deficit and its excess is carried forward
+without limit, ordinary deficits 10 years). Tax = taxable × (marginal rate + social contributions).
+The only Python loop runs over years; every step is vectorized over listings.
+Ceilings (micro) are checked per listing, not per household.
+"""
+import numpy as np
+from .params import DEFAULT_PARAMS
+from .projection import project_stages
+
+REGIMES = {
+    "micro_foncier": {"strategies": ("nu",), "allowance": 0.30, "ceiling": 15_000},
+    "reel_foncier": {"strategies": ("nu",)},
+    "micro_bic": {"strategies": ("meuble", "colocation"), "allowance": 0.50, "ceiling": 77_700},
+    "lmnp_reel": {"strategies": ("meuble", "colocation")},
+}
+REGIME_LABELS = {"micro_foncier": "Micro-foncier", "reel_foncier": "Réel foncier",
+                 "micro_bic": "Micro-BIC", "lmnp_reel": "LMNP réel"}
+DEFICIT_YEARS = 10
+GLOBAL_DEFICIT_CAP = 10_700
+
+def _p(params, key):
+    return params.get(key, DEFAULT_PARAMS[key])
+
+def regimes_for(strategy):
+    return [r for r, spec in REGIMES.items() if strategy in spec["strategies"]]
+
+def _use_deficits(result, stock, h):
+    """Charge the deficits of years h-10..h-1 (rows of the (years, listings) `stock`), oldest first,
+    against a positive result. Returns the remaining result; `stock` is updated in place."""
+    window = stock[max(0, h - DEFICIT_YEARS):h]
+    if not len(window):
+        return result
+    before = np.cumsum(window, axis=0) - window  # older deficits, per vintage
+    total = np.minimum(np.maximum(result, 0.0), before[-1] + window[-1])
+    window -= np.clip(total - before, 0.0, window)
+    return result - total
+
+def depreciation(x, params, years):
+    """Yearly LMNP depreciation (listings, years): building (price and notary fees, land excluded),
+    furniture, works."""
+    price = x["expected_price"]
+    base = (price + x["notary_fees"]) * (1 - _p(params, "land_share"))
+    furniture = price * _p(params, "furniture_share")
+    t = np.arange(years)
+    building = (base - furniture)[:, None] / _p(params, "building_years") * (t < _p(params, "building_years"))
+    furn = furniture[:, None] / _p(params, "furniture_years") * (t < _p(params, "furniture_years"))
+    works = np.full(years, float(params["travaux"]) / _p(params, "works_years")) * (t < _p(params, "works_years"))
+    return building + furn + works[None, :]
+
+def income_tax(regime, proj, x, params):
+    """Yearly tax (listings, years) under `regime`; negative when a deficit lowers tax on other income.
+    NaN for listings above a micro regime's ceiling."""
+    rate = _p(params, "tmi") + _p(params, "social_rate")
+    receipts = proj["rent"] * (1 - params["vacancy_rate"])
+    n, H = receipts.shape
+    spec = REGIMES[regime]
+    if "allowance" in spec:
+        tax = receipts * (1 - spec["allowance"]) * rate
+        return np.where(receipts[:, :1] > spec["ceiling"], np.nan, tax)
+
+    # Year-major copies: each step of the loop reads and writes contiguous rows
+    before_interest = np.ascontiguousarray(proj["net_rent"].T)
+    results = before_interest - (proj["interest"] + proj["insurance"]).T
+    stock = np.zeros((H, n))  # deficit carried forward, by year of origin
+    tax = np.empty((H, n))
+    if regime == "reel_foncier":
+        # Deficit from charges other than interest goes to global income (capped), the rest is carried
+        global_part = np.clip(-before_interest, 0.0, GLOBAL_DEFICIT_CAP)
+        carried = np.maximum(-results, 0.0) - global_part
+        for h in range(H):
+            tax[h] = np.maximum(_use_deficits(results[h], stock, h), 0.0) * rate
+            stock[h] = carried[h]
+        return (tax - global_part * _p(params, "tmi")).T
+
+    # LMNP réel
+    dep = depreciation(x, params, H).T
+    ard = np.zeros(n)  # depreciation carried forward (no time limit)
+    for h in range(H):
+        result = _use_deficits(results[h], stock, h)
+        stock[h] = np.maximum(-result, 0.0)
+        available = dep[h] + ard
+        used = np.clip(result, 0.0, available)
+        ard = available - used
+        tax[h] = np.maximum(result - used, 0.0) * rate
+    return tax.T
+
+def tax_stage(df, c, x, params):
+    """Scoring stage on top of the pre-tax metrics: average monthly tax over the projection horizon for
+    each regime open to the strategy (tax_<regime>), then the regime kept (params["tax_regime"], or the
+    cheapest one with "auto"), its tax, the after-tax cashflow and net yield."""
+    proj = project_stages(df, c, x, params)
+    regimes = regimes_for(params["strategy"])
+    monthly = np.column_stack([income_tax(r, proj, x, params).mean(axis=1) / 12.0 for r in regimes])
+    out = {f"tax_{r}": monthly[:, i] for i, r in enumerate(regimes)}
+    wanted = params.get("tax_regime", "auto")
+    if wanted in regimes:
+        best = np.full(len(df), regimes.index(wanted))
+    else:
+        best = np.argmin(np.where(np.isnan(monthly), np.inf, monthly), axis=1)
+    tax = monthly[np.arange(len(df)), best]
+    denom_net = x["expected_price"] + x["notary_fees"] + params["travaux"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out.update({
+            "tax_regime": np.asarray(regimes, dtype=object)[best],
+            "tax_monthly": tax,
+            "cashflow_after_tax": x["cashflow_monthly"] - tax,
+            "net_yield_after_tax_%": ((x["net_rent_monthly"] - x["insurance_monthly"] - tax) * 12.0)
+                                     / np.where(denom_net == 0, np.nan, denom_net) * 100.0,
+        })
+    return out
@@ -2,8 +2,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from core.scoring import compute_scores
-from core.dvf import load_dvf_medians, price_gap_vs_dvf
+from core.scoring import compute_scores, compact_listings, attach_columns, cashflow_breakdown, params_hash, resolve_columns
+from core.ranking import top_n, filter_mask
+from core.dvf import load_dvf_medians, build_dvf_index, dvf_price_gaps
+from core.datastore import load_csv
+from core.scenarios import scenario_cube, robust_scores
+from core.montecarlo import monte_carlo
+from core.projection import projection_metrics
+from core.profiling import Profiler
+from core.store import open_store, upsert_snapshot, store_cities, query_scores, price_history
+from core.ingest import normalize_listings, deduplicate
+from core.portfolio import PORTFOLIO_DEFAULTS, PORTFOLIO_OBJECTIVES, optimize_portfolio
 
 st.header("📊 Dashboard – Top opportunités par ville")
 params = st.session_state.get("params", None)
@@ -12,53 +21,162 @@ if params is None:
     st.stop()
 
 uploaded = st.file_uploader("📥 Annonces (CSV)", type=["csv"], key="listings")
+others = st.file_uploader("📥 Autres sources (CSV, optionnel : fusion + dédoublonnage)", type=["csv"],
+                          accept_multiple_files=True, key="other_sources")
 bench = st.file_uploader("📥 Barème loyers (CSV, optionnel)", type=["csv"], key="bench")
 dvf = st.file_uploader("📥 DVF – Médians prix/m² (CSV optionnel)", type=["csv"], key="dvf")
 
 rent_bench_df = None
 dvf_df = None
+# Stage timings of this run (no-op unless the performance panel is shown)
+prof = Profiler(enabled=st.sidebar.checkbox("⏱️ Panneau performance", value=False, key="show_perf"))
 
+def store_connection():
+    """SQLite listing store (.cache/listings.sqlite), one connection per session: SQLite serializes
+    the writers, and each session keeps its own temp tables and transactions."""
+    if "store_conn" not in st.session_state:
+        st.session_state["store_conn"] = open_store()
+    return st.session_state["store_conn"]
+
+# Uploaded CSVs are parsed once, then memory-mapped from the local columnar store
 if bench is not None:
-    rent_bench_df = pd.read_csv(bench)
-    params["rent_bench_df"] = rent_bench_df
+    with prof.stage("page.load_bench"):
+        rent_bench_df, _ = load_csv(bench)
+    params["rent_bench_df"] = rent_bench_df  # its lookup index is memoized by core.scoring.rent_index
 else:
     params["rent_bench_df"] = None  # rely on fallback editable table
 
 if dvf is not None:
-    dvf_df = load_dvf_medians(pd.read_csv(dvf))
+    with prof.stage("page.load_dvf"):
+        dvf_raw, dvf_hash = load_csv(dvf)
+        dvf_df = load_dvf_medians(dvf_raw)
+
+@st.cache_data(max_entries=4)
+def dvf_index(dvf_hash, _dvf_df):
+    """DVF medians per match level, built once per DVF file content."""
+    return build_dvf_index(_dvf_df)
+
+@st.cache_data(max_entries=4, show_spinner="Fusion des sources…")
+def merged_listings(sources_hash, _frames, _names):
+    """All sources normalized and deduplicated, once per set of files."""
+    return deduplicate(pd.concat([normalize_listings(f, n) for f, n in zip(_frames, _names)], ignore_index=True))
+
+@st.cache_data(max_entries=8, show_spinner="Calcul des scores…")
+def score_all(file_hash, params_key, strategy, _df, _params, _stage_cache=None, _prof=None):
+    """Score the whole listings file once per (file content, params); evicts beyond 8 entries.
+    Underscored args are not hashed by Streamlit: the two keys stand for them. On a miss, _stage_cache
+    (the caller's session cache) lets a parameter change recompute only the stages it affects.
+    Compact mode: float32 metrics, no text columns (joined back for displayed rows only)."""
+    return compute_scores(compact_listings(_df), _params, strategy=strategy, compact=True, sort=False,
+                          cache=_stage_cache, data_key=file_hash, profiler=_prof)
+
+@st.cache_data(max_entries=8, show_spinner="Scénarios de stress…")
+def robust_view(view_key, params_key, _df_city, _params):
+    """Robust score of one city's listings, once per (listings, city, params)."""
+    return robust_scores(scenario_cube(_df_city, _params))
 
-if uploaded is not None:
-    df = pd.read_csv(uploaded)
-    st.write(f"Annonces chargées : **{df.shape[0]}** lignes")
+@st.cache_data(max_entries=8, show_spinner="Projection…")
+def projection_view(view_key, params_key, strategy, resale_key, _df_city, _params, _resale_sqm):
+    """Multi-year projection of one city's listings, once per (listings, city, params, DVF resale prices)."""
+    return projection_metrics(_df_city, _params, strategy, resale_price_sqm=_resale_sqm)
+
+@st.cache_data(max_entries=8, show_spinner="Simulation Monte Carlo…")
+def risk_view(view_key, params_key, strategy, n_paths, _df_city, _params):
+    """Monte Carlo risk of one city's listings, once per (listings, city, params, paths)."""
+    return monte_carlo(_df_city, _params, strategy, n_paths=n_paths, seed=42)
+
+# Local listing store: daily snapshots with price history, only new or changed rows rescored
+use_store = st.sidebar.checkbox("💾 Base locale (historique des annonces)", value=False, key="use_store")
+if use_store:
+    conn = store_connection()
+    if uploaded is not None and st.sidebar.button("Enregistrer ce fichier comme relevé du jour"):
+        with prof.stage("page.store_upsert"):
+            stats = upsert_snapshot(conn, load_csv(uploaded)[0])
+        st.sidebar.success(f"{stats['rows']:,} annonces : {stats['new']:,} nouvelles, "
+                           f"{stats['price_changes']:,} changements de prix, {stats['to_rescore']:,} à rescorer.")
+    store_city_list = store_cities(conn)
+    if not store_city_list:
+        st.sidebar.info("Base vide : importez un fichier puis enregistrez-le.")
+        use_store = False
+
+if uploaded is not None or use_store:
+    if use_store:
+        # Indexed city filter in the store instead of scanning the whole file
+        cities, file_hash = store_city_list, "store"
+    else:
+        with prof.stage("page.load_listings"):
+            df, file_hash = load_csv(uploaded, float_dtype="float32")  # big feeds: half the memory
+            if others:
+                loaded = [load_csv(f, float_dtype="float32") for f in others]
+                file_hash = "+".join([file_hash] + [h for _, h in loaded])
+                n_rows = len(df) + sum(len(f) for f, _ in loaded)
+                df = merged_listings(file_hash, [df] + [f for f, _ in loaded], [uploaded.name] + [f.name for f in others])
+                st.caption(f"{len(others) + 1} sources, {n_rows:,} annonces → {len(df):,} après dédoublonnage.")
+        st.write(f"Annonces chargées : **{df.shape[0]}** lignes")
+        cols = {c.lower(): c for c in df.columns}
+        city_col = cols.get("city") or cols.get("ville")
+        if not city_col:
+            st.error("Le CSV doit contenir une colonne 'city' (ou 'ville').")
+            st.stop()
+        cities = sorted(df[city_col].dropna().astype(str).unique().tolist())
 
     # City picker based on data
-    cols = {c.lower(): c for c in df.columns}
-    city_col = cols.get("city") or cols.get("ville")
-    if not city_col:
-        st.error("Le CSV doit contenir une colonne 'city' (ou 'ville').")
-        st.stop()
-    cities = sorted(df[city_col].dropna().astype(str).unique().tolist())
     selected_city = st.selectbox("Ville", options=cities, index=0)
-
-    # Filter by city
-    df_city = df[df[city_col].astype(str) == selected_city].copy()
+    scope = st.radio("Normalisation du score", ["Par ville", "Globale (toutes villes)"], index=0, horizontal=True)
+    params["score_scope"] = "city" if scope == "Par ville" else "global"
 
     try:
-        results = compute_scores(df_city, params, strategy=params.get("strategy", "meuble"))
+        # Whole file scored once (memoized); the city is a cheap view over the cached result
+        strategy = params.get("strategy", "meuble")
+        if use_store:
+            with prof.stage("page.store_query"):
+                df, results = query_scores(conn, params, strategy, city=selected_city)
+            st.write(f"Base locale : **{len(df)}** annonces actives à {selected_city}")
+            cols = {c.lower(): c for c in df.columns}
+            city_col, df_city = "city", df
+        else:
+            with prof.stage("page.score_all", rows=len(df)):  # near zero when memoized
+                scored = score_all(file_hash, params_hash(params), strategy, df, params,
+                                   st.session_state.setdefault("scoring_cache", {}), prof)
+            st.session_state["scored_listings"] = {"key": f"{file_hash}-{params_hash(params)}", "scored": scored, "listings": df}
+            with prof.stage("page.city_view"):
+                results = scored[scored[city_col].astype(str) == selected_city].copy()
+                df_city = df.loc[results.index]
+        # Key of the city view for the optional analyses below (store rows change between snapshots)
+        view_key = (f"store-{int(pd.util.hash_pandas_object(df_city).sum())}" if use_store else file_hash) + f"|{selected_city}"
+        params_key = params_hash(params)
+        gaps = None
         # DVF gap (optional)
         if dvf_df is not None:
-            price_col = cols.get("price") or cols.get("prix")
-            surf_col  = cols.get("surface_m2") or cols.get("surface") or cols.get("surface_m²")
-            gaps = []
-            for i, row in results.iterrows():
-                gaps.append(price_gap_vs_dvf(price=row[price_col], surface_m2=row[surf_col], city=selected_city, dvf_df=dvf_df))
-            results["price_gap_vs_dvf_%"] = gaps
+            with prof.stage("page.dvf_gaps", rows=len(df_city)):
+                rc = resolve_columns(df)
+                gaps = dvf_price_gaps(df_city, dvf_index(dvf_hash, dvf_df),
+                                      rc["price"], rc["surface"], rc["city"], rc["zipcode"], rc["type"])
+                results = results.join(gaps[["price_gap_vs_dvf_%", "dvf_match_level"]])
+
+        # Stress test: worst case over rate × duration × strategy scenarios (optional)
+        if st.checkbox("Ajouter un score robuste (stress taux +0/+50/+100/+200 bp × 15/20/25 ans × stratégies)", value=False):
+            with prof.stage("page.robust_score", rows=len(df_city)):
+                robust = robust_view(view_key, params_key, df_city, params)
+                results = results.join(robust[["robust_score", "worst_cashflow_monthly"]])
+
+        # Multi-year projection: resale at the DVF median €/m² when a DVF file is loaded
+        if st.checkbox("Ajouter la projection (TRI, VAN, multiple ; hypothèses dans Paramètres)", value=False):
+            with prof.stage("page.projection", rows=len(df_city)):
+                resale_sqm = gaps["dvf_median_price_sqm"].values if gaps is not None else None
+                results = results.join(projection_view(view_key, params_key, strategy, dvf_hash if gaps is not None else None,
+                                                       df_city, params, resale_sqm))
+
+        # Monte Carlo risk: vacancy, capex shocks, rent growth, resale price over 10 years (optional)
+        mc_on = st.checkbox("Ajouter le risque Monte Carlo (10 ans : vacance, travaux imprévus, loyers, revente)", value=False)
+        if mc_on:
+            n_paths = st.select_slider("Nombre de trajectoires", options=[1000, 2000, 5000, 10000], value=2000)
+            with prof.stage("page.monte_carlo", rows=len(df_city), paths=n_paths):
+                risk = risk_view(view_key, params_key, strategy, n_paths, df_city, params)
+                results = results.join(risk)
 
         # Auto-filter rentable (cashflow >= 0)
         st.checkbox("Ne montrer que les biens rentables (cashflow ≥ 0 €/mois)", value=True, key="only_rentable")
-        filt = results.copy()
-        if st.session_state["only_rentable"]:
-            filt = filt[filt["cashflow_monthly"] >= 0]
 
         # Thresholds
         col1, col2, col3, col4 = st.columns(4)
@@ -67,46 +185,69 @@ if uploaded is not None:
         with col2:
             score_min = st.number_input("Score investisseur min (/100)", value=0, step=5)
         with col3:
-            topn = st.number_input("Top N", min_value=1, value=min(20, len(filt)), step=1)
+            topn = st.number_input("Top N", min_value=1, value=20, step=1)
         with col4:
-            sort_key = st.selectbox("Trier par", ["cashflow_monthly","investor_score","net_yield_%","gross_yield_%"], index=0)
-        filt = filt[(filt["net_yield_%"].fillna(0) >= net_yield_min) & (filt["investor_score"].fillna(0) >= score_min)]
-        filt = filt.sort_values(sort_key, ascending=False)
+            sort_key = st.selectbox("Trier par", [c for c in ["cashflow_monthly","investor_score","net_yield_%","gross_yield_%","robust_score",
+                                                              "cashflow_after_tax","net_yield_after_tax_%",
+                                                              "irr_%","npv","equity_multiple","mc_cf_p5","mc_irr_p50","mc_p_loss_%"] if c in results.columns], index=0)
+        # Partial selection of the top N instead of filtering + fully sorting every candidate
+        with prof.stage("page.filter_rank", rows=len(results)):
+            mask = filter_mask(results, st.session_state["only_rentable"], net_yield_min, score_min)
+            filt = top_n(results, sort_key, int(topn), ascending=(sort_key == "mc_p_loss_%"), mask=mask)
+        st.caption(f"{int(mask.sum())} biens correspondent aux filtres.")
 
         st.subheader(f"🏆 Opportunités – {selected_city}")
-        st.dataframe(
-            filt.head(int(topn)).style.format({
-                "expected_price": "€{:,.0f}".format,
-                "rent_est_monthly": "€{:,.0f}".format,
-                "net_rent_monthly": "€{:,.0f}".format,
-                "monthly_payment": "€{:,.0f}".format,
-                "insurance_monthly": "€{:,.0f}".format,
-                "cashflow_monthly": "€{:,.0f}".format,
-                "gross_yield_%": "{:.2f}%".format,
-                "net_yield_%": "{:.2f}%".format,
-                "coc_%": "{:.2f}%".format,
-                "investor_score": "{:.1f}".format,
-                "price_gap_vs_dvf_%": "{:.1f}%".format
-            }, na_rep="—"),
-            use_container_width=True
-        )
+        with prof.stage("page.render_table", rows=len(filt)):
+            st.dataframe(
+                attach_columns(filt, df).style.format({
+                    "expected_price": "€{:,.0f}".format,
+                    "rent_est_monthly": "€{:,.0f}".format,
+                    "net_rent_monthly": "€{:,.0f}".format,
+                    "monthly_payment": "€{:,.0f}".format,
+                    "insurance_monthly": "€{:,.0f}".format,
+                    "cashflow_monthly": "€{:,.0f}".format,
+                    "gross_yield_%": "{:.2f}%".format,
+                    "net_yield_%": "{:.2f}%".format,
+                    "coc_%": "{:.2f}%".format,
+                    "tax_monthly": "€{:,.0f}".format,
+                    "cashflow_after_tax": "€{:,.0f}".format,
+                    "net_yield_after_tax_%": "{:.2f}%".format,
+                    "investor_score": "{:.1f}".format,
+                    "robust_score": "{:.1f}".format,
+                    "worst_cashflow_monthly": "€{:,.0f}".format,
+                    "price_gap_vs_dvf_%": "{:.1f}%".format,
+                    "irr_%": "{:.1f}%".format,
+                    "npv": "€{:,.0f}".format,
+                    "equity_multiple": "×{:.2f}".format,
+                    "resale_net": "€{:,.0f}".format,
+                    "cum_cashflow": "€{:,.0f}".format,
+                    "mc_p_loss_%": "{:.0f}%".format,
+                    "mc_cf_p5": "€{:,.0f}".format,
+                    "mc_cf_p50": "€{:,.0f}".format,
+                    "mc_cf_p95": "€{:,.0f}".format,
+                    "mc_irr_p5": "{:.1f}%".format,
+                    "mc_irr_p50": "{:.1f}%".format,
+                    "mc_irr_p95": "{:.1f}%".format
+                }, na_rep="—"),
+                use_container_width=True
+            )
 
         # ---- Property detail panel ----
         st.markdown("---")
         st.subheader("🔎 Détail du bien sélectionné")
         # Build a selector: try using an 'id' or 'url' or row index
-        key_cols = [c for c in ["id","url","title"] if c in filt.columns]
-        label_col = key_cols[0] if key_cols else filt.columns[0]
+        key_cols = [c for c in ["id","url","title"] if c in df.columns]
+        label_col = key_cols[0] if key_cols else None
         options = filt.index.tolist()
         def labeler(idx):
             row = filt.loc[idx]
-            lab = str(row[label_col]) if label_col in filt.columns else f"Bien #{idx}"
+            lab = str(df.at[idx, label_col]) if label_col else f"Bien #{idx}"
             cf = row["cashflow_monthly"]
             return f"{lab}  —  CF: €{cf:,.0f}/mois"
         selected_idx = st.selectbox("Choisis un bien", options=options, format_func=labeler)
 
         if selected_idx is not None:
-            row = filt.loc[selected_idx]
+            row = attach_columns(filt.loc[[selected_idx]], df).iloc[0]
             price_col = cols.get("price") or cols.get("prix")
             surf_col  = cols.get("surface_m2") or cols.get("surface") or cols.get("surface_m²")
             dom_col   = cols.get("days_on_market") or cols.get("dom") or cols.get("jours_en_ligne")
@@ -127,23 +268,70 @@ if uploaded is not None:
                 st.metric("Cashflow (net)", f"€{row['cashflow_monthly']:,.0f}/mois")
 
             with st.expander("🧾 Décomposition cashflow (mensuel)"):
-                breakdown = pd.DataFrame({
-                    "poste": ["Loyer estimé (brut)","Loyer net après vacance/gestion/charges/CapEx/GLI","Mensualité (hors assur.)","Assurance empr.","Cashflow net"],
-                    "€ / mois": [
-                        row["rent_est_monthly"],
-                        row["net_rent_monthly"],
-                        row["monthly_payment"],
-                        row["insurance_monthly"],
-                        row["cashflow_monthly"],
-                    ]
-                })
+                # Full precision, computed for the selected property only
+                with prof.stage("page.breakdown", rows=1):
+                    breakdown = cashflow_breakdown(df.loc[[selected_idx]], params, strategy)
                 st.dataframe(breakdown.style.format({"€ / mois": "€{:,.0f}".format}), hide_index=True, use_container_width=True)
 
             if "price_gap_vs_dvf_%" in filt.columns and not pd.isna(row.get("price_gap_vs_dvf_%", np.nan)):
                 gap = row["price_gap_vs_dvf_%"]
-                st.info(f"Écart prix/m² vs DVF (ville): {gap:+.1f} %")
+                st.info(f"Écart prix/m² vs DVF ({row['dvf_match_level']}): {gap:+.1f} %")
+
+            if use_store:
+                history = price_history(conn, selected_idx)
+                if len(history) > 1:
+                    st.caption(f"Historique du prix (vue le {history['seen_on'].iloc[0]}, {len(history) - 1} changement(s))")
+                    st.line_chart(history.set_index("seen_on")["price"], height=180)
+
+        # ---- Portfolio: best combination under equity / debt-ratio / diversification constraints ----
+        st.markdown("---")
+        if st.checkbox("💼 Optimiser un portefeuille (apport total, taux d'endettement, diversification)", value=False):
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                apport_total = st.number_input("Apport total (€)", min_value=0, value=int(PORTFOLIO_DEFAULTS["apport_total"]), step=5000)
+                income = st.number_input("Revenus nets (€/mois, 0 = ignorer)", min_value=0, value=int(PORTFOLIO_DEFAULTS["revenus_mensuels"]), step=100)
+            with c2:
+                credits = st.number_input("Crédits en cours (€/mois)", min_value=0, value=0, step=50)
+                max_ratio = st.number_input("Taux d'endettement max (%)", min_value=0.0, max_value=100.0,
+                                            value=PORTFOLIO_DEFAULTS["taux_endettement_max"] * 100, step=1.0)
+            with c3:
+                capacity = st.number_input("Capacité d'emprunt (€, 0 = sans)", min_value=0, value=0, step=10000)
+                max_city = st.number_input("Biens max par ville (0 = sans)", min_value=0, value=PORTFOLIO_DEFAULTS["max_par_ville"], step=1)
+            with c4:
+                objective = st.selectbox("Maximiser", [c for c in PORTFOLIO_OBJECTIVES if c in results.columns])
+                # Whole file unless the objective was only computed for the city (TRI, VAN)
+                whole_file = not use_store and objective in scored.columns and st.checkbox("Toutes les villes", value=True)
+            pool = scored if whole_file else results
+            pool = pool[filter_mask(pool, st.session_state["only_rentable"], net_yield_min, score_min)]
+            constraints = {"apport_total": apport_total, "revenus_mensuels": income, "credits_mensuels": credits,
+                           "taux_endettement_max": max_ratio / 100, "capacite_emprunt": capacity, "max_par_ville": max_city}
+            with prof.stage("page.portfolio", rows=len(pool)):
+                selection, summary = optimize_portfolio(pool, params, objective, constraints)
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Biens", summary["count"])
+            m2.metric("Apport utilisé", f"€{summary['equity']:,.0f}")
+            m3.metric("Cashflow total", f"€{summary['cashflow_monthly']:,.0f}/mois")
+            m4.metric("Taux d'endettement", "—" if np.isnan(summary["debt_ratio_%"]) else f"{summary['debt_ratio_%']:.1f}%")
+            st.caption(f"{summary['candidates']:,} candidats ; " + ("solution exacte." if summary["optimal"] else "heuristique (glouton + recherche locale)."))
+            if len(selection):
+                st.dataframe(attach_columns(selection, df)
+                             .style.format({"equity": "€{:,.0f}".format, "loan": "€{:,.0f}".format, "payment": "€{:,.0f}".format,
+                                            "expected_price": "€{:,.0f}".format, "cashflow_monthly": "€{:,.0f}".format,
+                                            "investor_score": "{:.1f}".format}, na_rep="—"),
+                             use_container_width=True)
 
     except Exception as e:
         st.error(f"Erreur de calcul: {e}")
+
+    if prof.enabled:
+        with st.expander("⏱️ Performance (cette exécution)", expanded=True):
+            perf = prof.to_frame()
+            perf["name"] = perf["depth"].map(lambda d: "· " * d) + perf["name"]  # nested stages indented
+            st.caption("Les étapes scoring.* n'apparaissent que lorsque le score est recalculé (sinon résultat mémoïsé) ; cached = étape reprise du cache.")
+            st.dataframe(perf.drop(columns=["seconds", "depth"]).style.format({"ms": "{:,.1f}".format, "share_%": "{:.1f}%".format,
+                                                                      "mem_delta_mb": "{:+,.1f}".format}, na_rep="—"),
+                         hide_index=True, use_container_width=True)
+            st.download_button("Exporter (JSON)", prof.to_json(rows=len(df), file_hash=file_hash),
+                               file_name="dashboard_profile.json", mime="application/json")
 else:
     st.info("Importez vos **annonces**. Optionnel : **barème loyers** et **DVF**.")
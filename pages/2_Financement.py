@@ -1,7 +1,12 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from core.finance import build_financing_table, amortization_schedule
+from core.datastore import load_csv
+from core.rates import rates_by_years, rate_history, build_surface, payment_lookup, capacity_lookup, history_series
+
+AMORT_ROWS = 24  # amortization rows computed per view
 
 st.header("💶 Financement – Taux & mensualités")
 
@@ -10,15 +15,40 @@ if params is None:
     st.warning("Allez dans **Paramètres** pour initialiser taux, durée et assurance.")
     st.stop()
 
-st.markdown("Chargez un **tableau de taux** (CSV) ou utilisez les taux par défaut 2025‑08 (Observatoire CL/CSA).")
+st.markdown("Chargez un **tableau de taux** (CSV) ou utilisez les taux par défaut 2025‑08 (Observatoire CL/CSA). "
+            "Plusieurs relevés mensuels (ou un CSV avec une colonne `date`) donnent l'**historique** des mensualités et de la capacité d'emprunt.")
+
+rates_files = st.file_uploader("📥 Taux par durée (CSV) – colonnes: duration_years, rate_percent, source (date optionnelle ; sinon nom rates_AAAA-MM.csv)",
+                               type=["csv"], accept_multiple_files=True)
+
+@st.cache_data(max_entries=4)
+def history(rates_hash, _frames, _names):
+    """Long (date, duration_years, rate) table, once per set of rate files."""
+    return rate_history(_frames, _names)
 
-rates_file = st.file_uploader("📥 Taux par durée (CSV) – colonnes: duration_years, rate_percent, source", type=["csv"])
+@st.cache_data(max_entries=8)
+def surface(insurance_rate_annual):
+    """Payment per € borrowed over rate × duration, once per insurance rate."""
+    return build_surface(insurance_rate_annual)
 
-if rates_file is not None:
-    rates_df = pd.read_csv(rates_file)
+if rates_files:
+    loaded = [load_csv(f) for f in rates_files]
+    names = [f.name for f in rates_files]
 else:
-    rates_df = pd.read_csv("data/examples/rates_2025-08.csv")
+    loaded, names = [load_csv("data/examples/rates_2025-08.csv")], ["rates_2025-08.csv"]
+try:
+    hist = history("+".join(h for _, h in loaded) + "|" + "|".join(names), [df for df, _ in loaded], names)
+except (ValueError, KeyError) as e:
+    hist = None
+    if len(loaded) > 1:
+        st.warning(f"Historique indisponible : {e}")
 
+dates = sorted(hist["date"].unique()) if hist is not None else []
+if len(dates) > 1:
+    snapshot = st.select_slider("Relevé", options=dates, value=dates[-1], format_func=lambda d: pd.Timestamp(d).strftime("%Y-%m"))
+    rates_df = hist[hist["date"] == snapshot].assign(rate_percent=lambda h: h["rate"] * 100).drop(columns="rate")
+else:
+    rates_df = loaded[-1][0]
 st.write(rates_df)
 
 # Pick a principal to finance
@@ -26,9 +56,9 @@ principal = st.number_input("Montant à financer (€)", min_value=0, value=2500
 insurance = st.slider("Assurance emprunteur annuelle (% du capital)", 0.0, 1.0, float(params.get("assurance", 0.003)*100.0), 0.01) / 100.0
 
 # Build table
-rates_by_years = {int(r["duration_years"]): float(r["rate_percent"]) / 100.0 for _, r in rates_df.iterrows()}
+rates = rates_by_years(rates_df)
 stress = st.multiselect("Stress (bp)", [0, 50, 100, 150, 200], default=[0, 100])
-table = build_financing_table(principal, rates_by_years, insurance_rate_annual=insurance, stress_bp=stress)
+table = build_financing_table(principal, rates, insurance_rate_annual=insurance, stress_bp=stress)
 
 st.subheader("📋 Tableau de mensualités (avec stress)")
 st.dataframe(
@@ -41,17 +71,52 @@ st.dataframe(
     use_container_width=True
 )
 
-# Amortization detail for a chosen scenario
+# Sensitivity and history: lookups in the precomputed surface, no annuity recomputed on rerun
+grid = surface(insurance)
+st.markdown("---")
+col1, col2 = st.columns(2)
+with col1:
+    years = st.selectbox("Durée (ans)", sorted(rates.keys()), index=sorted(rates.keys()).index(25) if 25 in rates else 0)
+with col2:
+    budget = st.number_input("Mensualité max (€/mois, assurance incluse)", min_value=0, value=1200, step=50)
+
+if len(dates) > 1:
+    st.subheader(f"📈 Évolution sur {len(dates)} relevés ({years} ans)")
+    series = history_series(grid, hist, years, principal, budget)
+    if len(series):
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Taux", f"{series['rate_%'].iloc[-1]:.2f}%", f"{series['rate_%'].iloc[-1] - series['rate_%'].iloc[0]:+.2f} pt", delta_color="inverse")
+        c2.metric(f"Mensualité ({principal:,.0f} €)", f"€{series['payment'].iloc[-1]:,.0f}",
+                  f"{series['payment'].iloc[-1] - series['payment'].iloc[0]:+,.0f} €", delta_color="inverse")
+        c3.metric(f"Capacité ({budget:,.0f} €/mois)", f"€{series['capacity'].iloc[-1]:,.0f}",
+                  f"{series['capacity'].iloc[-1] - series['capacity'].iloc[0]:+,.0f} €")
+        st.line_chart(series[["payment"]].rename(columns={"payment": "Mensualité (€)"}), height=220)
+        st.line_chart(series[["capacity"]].rename(columns={"capacity": "Capacité d'emprunt (€)"}), height=220)
+    else:
+        st.info(f"Aucun relevé pour {years} ans.")
+
+st.subheader(f"🧮 Sensibilité – mensualité ({years} ans)")
+base_rate = rates[years]
+grid_rates = np.round(base_rate + np.arange(-4, 5) * 0.0025, 4)
+grid_principals = np.arange(50_000, 550_000, 50_000)
+sensitivity = pd.DataFrame(payment_lookup(grid, grid_principals[:, None], grid_rates[None, :], years),
+                           index=pd.Index([f"€{p:,.0f}" for p in grid_principals], name="capital"),
+                           columns=[f"{r * 100:.2f}%" for r in grid_rates])
+st.dataframe(sensitivity.style.format("€{:,.0f}".format), use_container_width=True)
+st.caption(f"Capacité d'emprunt pour {budget:,.0f} €/mois au taux du relevé : **€{float(capacity_lookup(grid, budget, base_rate, years)):,.0f}**.")
+
+# Amortization detail for a chosen scenario: only the rows on screen are computed
 st.markdown("---")
 col1, col2 = st.columns(2)
 with col1:
-    years = st.selectbox("Durée (ans)", sorted(rates_by_years.keys()), index=sorted(rates_by_years.keys()).index(25) if 25 in rates_by_years else 0)
+    rate = st.number_input("Taux annuel (%)", value=float(base_rate * 100), step=0.01)
 with col2:
-    rate = st.number_input("Taux annuel (%)", value=float(rates_by_years[years] * 100), step=0.01)
-df_amort = amortization_schedule(principal, annual_rate=rate/100.0, years=years, insurance_rate_annual=insurance)
-st.subheader("📆 Amortissement (extrait 24 mois)")
+    first = st.number_input("À partir du mois", min_value=1, max_value=int(years * 12), value=1, step=AMORT_ROWS)
+df_amort = amortization_schedule(principal, annual_rate=rate/100.0, years=years, insurance_rate_annual=insurance,
+                                 first=first, count=AMORT_ROWS)
+st.subheader(f"📆 Amortissement (mois {first} à {first + len(df_amort) - 1} sur {int(years * 12)})")
 st.dataframe(
-    df_amort.head(24).style.format({
+    df_amort.style.format({
         "payment_annuity": "€{:,.0f}".format,
         "interest": "€{:,.0f}".format,
         "principal_paid": "€{:,.0f}".format,
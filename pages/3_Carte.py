@@ -1,18 +1,128 @@
-
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pydeck as pdk
+from core.datastore import load_csv
+from core.ranking import top_n
+from core.scoring import attach_columns
+from core.geocode import GEO_MATCH_LEVELS, load_geocoder, geocode
+from core.geo import build_grid_index, radius_query, viewport_query, viewport, zoom_cell_km, aggregate_cells
+
+MAX_POINTS = 5000  # above this many listings in the zone, they are drawn as aggregated cells
 
 st.header("🗺️ Carte (bêta)")
-st.info("Pour garder l'app légère, la carte est optionnelle. Vous pouvez charger un CSV d'annonces géocodées (lat, lon) et afficher les scores (bientôt Folium).")
+st.info("Affiche les annonces scorées dans le **Dashboard**, ou un CSV d'annonces (lat, lon, ou à défaut city / "
+        f"zipcode, géocodés hors ligne ; investor_score optionnel). La **zone** est définie par les champs centre / rayon / zoom "
+        "ci-dessous : déplacer ou zoomer la carte elle-même ne refiltre pas les annonces. Au-delà de "
+        f"{MAX_POINTS:,} annonces dans la zone, la carte affiche des cellules agrégées (nombre, score moyen) ; "
+        "réduisez la zone (zoom du filtre, rayon, score min) pour voir les annonces une à une.")
+
+uploaded = st.file_uploader("📥 Annonces (CSV avec lat, lon ou city, zipcode ; investor_score optionnel)", type=["csv"])
+
+@st.cache_resource
+def geocoder():
+    """Commune table index, shared by every session."""
+    return load_geocoder()
+
+@st.cache_data(max_entries=4, show_spinner="Géocodage…")
+def geocoded(data_hash, _cities, _zipcodes):
+    """lat, lon, geo_match per listing, once per data content."""
+    return geocode(geocoder(), _cities, _zipcodes)
+
+@st.cache_data(max_entries=4)
+def grid_index(data_hash, _lat, _lon):
+    """Spatial index, built once per data content."""
+    return build_grid_index(_lat, _lon)
 
-uploaded = st.file_uploader("📥 Annonces géocodées (CSV avec colonnes lat, lon, investor_score)", type=["csv"])
 if uploaded is not None:
-    df = pd.read_csv(uploaded)
-    cols = {c.lower(): c for c in df.columns}
-    lat = cols.get("lat"); lon = cols.get("lon")
-    if not lat or not lon:
-        st.error("Le CSV doit contenir les colonnes lat, lon.")
-    else:
-        st.map(df.rename(columns={lat:"lat", lon:"lon"}))
+    df, data_hash = load_csv(uploaded, float_dtype="float32")
+elif "scored_listings" in st.session_state:
+    # Last Dashboard run: scores + display columns of the source file
+    source = st.session_state["scored_listings"]
+    df, data_hash = attach_columns(source["scored"], source["listings"]), source["key"]
+    st.caption(f"Annonces scorées du Dashboard ({len(df):,}).")
+else:
+    st.write("Scorez des annonces dans le **Dashboard** ou chargez un CSV pour afficher la carte.")
+    st.stop()
+
+cols = {c.lower(): c for c in df.columns}
+lat_col = cols.get("lat"); lon_col = cols.get("lon"); score_col = cols.get("investor_score")
+city_col = cols.get("city") or cols.get("ville"); zip_col = cols.get("zipcode") or cols.get("code_postal")
+if lat_col and lon_col:
+    lat = df[lat_col].to_numpy(dtype=float, na_value=np.nan)
+    lon = df[lon_col].to_numpy(dtype=float, na_value=np.nan)
+elif city_col:
+    geo = geocoded(data_hash, df[city_col], df[zip_col] if zip_col else None)
+    lat, lon = geo["lat"].to_numpy(), geo["lon"].to_numpy()
+    df = df.assign(lat=lat, lon=lon, geo_match=geo["geo_match"].values)
+    counts = geo["geo_match"].value_counts()
+    st.caption("Géocodage (centroïde de commune) : " + ", ".join(f"{lvl} {counts.get(lvl, 0):,}" for lvl in GEO_MATCH_LEVELS)
+               + f", non trouvées {int(geo['geo_match'].isna().sum()):,}."
+               + (" Table fournie limitée aux principales communes (~260 lignes) : les petites communes tombent sur le"
+                  " code postal, une ville approchante ou restent non trouvées ; voir README pour la base La Poste complète."
+                  if len(geocoder()["city_zip"]) < 1000 else ""))
+else:
+    st.error("Le CSV doit contenir les colonnes lat, lon (ou city, zipcode).")
+    st.stop()
+index = grid_index(data_hash, lat, lon)
+if not len(index["rows"]):
+    st.error("Aucune coordonnée valide.")
+    st.stop()
+score = df[score_col].to_numpy(dtype=float, na_value=np.nan) if score_col else None
+
+st.subheader("Zone (filtre)")
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    center_lat = st.number_input("Latitude du centre", value=float(np.median(index["lat"])), format="%.5f")
+with col2:
+    center_lon = st.number_input("Longitude du centre", value=float(np.median(index["lon"])), format="%.5f")
+with col3:
+    radius_km = st.number_input("Rayon (km, 0 = tout)", min_value=0.0, value=0.0, step=0.5)
+with col4:
+    score_min = st.number_input("Score min (/100)", value=0, step=5, disabled=score is None)
+zoom = st.slider("Zoom du filtre (sans rayon : zone = rectangle affiché à ce zoom)", 3, 16, 12 if radius_km else 6)
+
+# Candidate rows: radius query (nearest first) or the rectangle shown at the filter's centre / zoom.
+# The zone comes from these widgets, not from the pydeck view (Streamlit does not return it when panned).
+if radius_km > 0:
+    rows, dist = radius_query(index, center_lat, center_lon, radius_km)
 else:
-    st.write("Chargez un CSV pour afficher la carte.")
+    rows, dist = viewport_query(index, *viewport(center_lat, center_lon, zoom)), None
+keep = np.ones(len(rows), dtype=bool)
+if score is not None and score_min:
+    keep = np.nan_to_num(score[rows], nan=0.0) >= score_min
+rows = rows[keep]
+st.caption(f"{len(rows):,} annonces dans la zone" + (f" (rayon {radius_km:g} km)" if radius_km > 0 else f" (rectangle au zoom {zoom})"))
+
+values = score[rows] if score is not None else np.full(len(rows), np.nan)
+color = "[255 - value * 2.55, value * 2.55, 60, 180]"  # red (low score) -> green (high score)
+if len(rows) > MAX_POINTS:  # on the zone's row count; cells sized for the filter's zoom
+    cells = aggregate_cells(lat[rows], lon[rows], values, zoom_cell_km(zoom, center_lat))
+    cells["value"] = cells["value"].fillna(50.0)
+    cells["radius"] = zoom_cell_km(zoom, center_lat) * 1000 / 2 * np.sqrt(cells["count"] / cells["count"].max())
+    layer = pdk.Layer("ScatterplotLayer", cells, get_position="[lon, lat]", get_radius="radius",
+                      get_fill_color=color, pickable=True)
+    tooltip = {"text": "{count} annonces\nscore moyen {value}"}
+    st.caption(f"Affichage agrégé ({len(rows):,} annonces > {MAX_POINTS:,}) : {len(cells):,} cellules de "
+               f"{zoom_cell_km(zoom, center_lat):.1f} km.")
+else:
+    points = pd.DataFrame({"lat": lat[rows], "lon": lon[rows], "value": np.nan_to_num(values, nan=50.0)})
+    layer = pdk.Layer("ScatterplotLayer", points, get_position="[lon, lat]", get_radius=40,
+                      radius_min_pixels=3, get_fill_color=color, pickable=True)
+    tooltip = {"text": "score {value}"}
+layers = [layer]
+if radius_km > 0:
+    layers.append(pdk.Layer("ScatterplotLayer", pd.DataFrame({"lat": [center_lat], "lon": [center_lon]}),
+                            get_position="[lon, lat]", get_radius=radius_km * 1000, stroked=True, filled=False,
+                            get_line_color=[30, 90, 200], line_width_min_pixels=2))
+st.pydeck_chart(pdk.Deck(layers=layers, tooltip=tooltip, map_style=None,
+                         initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom)))
+
+if len(rows):
+    st.subheader("Annonces de la zone")
+    if dist is not None:  # nearest first
+        table = df.iloc[rows[:500]].copy()
+        table.insert(0, "distance_km", dist[keep][:500])
+    else:
+        table = top_n(df.iloc[rows], score_col, 500) if score_col else df.iloc[rows[:500]]
+    st.dataframe(table, use_container_width=True)
@@ -1,6 +1,7 @@
 
 import streamlit as st
 import pandas as pd
+from core.tax import REGIME_LABELS, regimes_for
 
 st.header("⚙️ Paramètres & hypothèses (globaux)")
 
@@ -26,6 +27,11 @@ p["frais_notaires"] = st.slider("Frais de notaire (% du prix)", 6.0, 9.0, 7.5, 0
 p["travaux"] = st.number_input("Travaux (EUR)", min_value=0, value=0, step=1000)
 p["apport"] = st.number_input("Apport (EUR)", min_value=0, value=0, step=1000)
 
+st.subheader("Négociation")
+p["base_neg"] = st.slider("Négociation de base (% du prix)", 0.0, 15.0, 3.0, 0.5) / 100.0
+p["extra_per_30d"] = st.slider("Négociation supplémentaire par 30 jours en ligne (%)", 0.0, 3.0, 0.5, 0.1) / 100.0
+p["neg_max"] = st.slider("Négociation max (% du prix)", 0.0, 25.0, 10.0, 0.5) / 100.0
+
 st.subheader("Charges récurrentes (mensuelles ou % du loyer)")
 p["vacancy_rate"] = st.slider("Vacance (% loyer)", 0.0, 15.0, 8.0, 0.5) / 100.0
 p["mgmt_rate"] = st.slider("Gestion locative (% loyer)", 0.0, 12.0, 7.0, 0.5) / 100.0
@@ -36,6 +42,26 @@ p["pno_monthly"] = st.number_input("PNO (€/mois)", min_value=0.0, value=12.0,
 p["taxe_fonciere_monthly"] = st.number_input("Taxe foncière (€/mois)", min_value=0.0, value=0.0, step=10.0)
 p["compta_monthly"] = st.number_input("Comptable/Expert LMNP (€/mois)", min_value=0.0, value=0.0, step=5.0)
 
+st.subheader("Projection (TRI, VAN, revente)")
+p["proj_horizon"] = st.slider("Horizon de détention (années)", 3, 30, 10, 1)
+p["rent_indexation"] = st.slider("Revalorisation annuelle des loyers (IRL, %)", 0.0, 5.0, 1.5, 0.1) / 100.0
+p["charges_indexation"] = st.slider("Indexation annuelle des charges fixes (%)", 0.0, 5.0, 2.0, 0.1) / 100.0
+p["price_growth"] = st.slider("Évolution annuelle du prix (%)", -5.0, 5.0, 1.0, 0.1) / 100.0
+p["resale_fee"] = st.slider("Frais de revente (% du prix)", 0.0, 10.0, 5.0, 0.5) / 100.0
+p["discount_rate"] = st.slider("Taux d'actualisation VAN (%)", 0.0, 15.0, 5.0, 0.5) / 100.0
+
+st.subheader("Fiscalité (cashflow après impôt)")
+p["tax_enabled"] = st.checkbox("Calculer l'impôt par régime (micro / réel, déficits reportables, amortissements LMNP)", value=False)
+p["tax_regime"] = st.selectbox("Régime", ["auto"] + regimes_for(p["strategy"]),
+                               format_func=lambda r: "Le moins imposé" if r == "auto" else REGIME_LABELS[r])
+p["tmi"] = st.select_slider("Tranche marginale d'imposition (%)", [0, 11, 30, 41, 45], 30) / 100.0
+p["social_rate"] = st.slider("Prélèvements sociaux (%)", 0.0, 20.0, 17.2, 0.1) / 100.0
+p["land_share"] = st.slider("Part du terrain, non amortissable (% du prix + notaire)", 0.0, 40.0, 15.0, 1.0) / 100.0
+p["building_years"] = st.slider("Amortissement du bâti (années)", 15, 50, 30, 1)
+p["furniture_share"] = st.slider("Mobilier (% du prix)", 0.0, 15.0, 5.0, 0.5) / 100.0
+p["furniture_years"] = st.slider("Amortissement du mobilier (années)", 3, 10, 7, 1)
+p["works_years"] = st.slider("Amortissement des travaux (années)", 5, 20, 10, 1)
+
 st.subheader("Villes ciblées & barème €/m² (fallback éditable)")
 st.caption("Charge un CSV barème dans le Dashboard pour écraser ces valeurs. Ici tu peux **éditer** les €/m² par ville si tu n'as pas de fichier.")
 if "rpm2_table" not in p:
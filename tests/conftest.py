@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+EXAMPLES = ROOT / "data" / "examples"
+
+@pytest.fixture
+def listings():
+    return pd.read_csv(EXAMPLES / "listings_example.csv")
+
+@pytest.fixture
+def rents():
+    return pd.read_csv(EXAMPLES / "rents_example.csv")
+
+@pytest.fixture
+def params():
+    from core.params import load_params
+    return load_params()
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from bench.synthetic import listings as synthetic_listings
+from core.batch import score_file
+from core.scoring import compute_scores
+
+def test_chunked_parallel_scores_match_single_process(tmp_path, params):
+    df = synthetic_listings(3000, seed=1)
+    src, out = tmp_path / "listings.csv", tmp_path / "scored.parquet"
+    df.to_csv(src, index=False)
+    assert score_file(src, out, params, "meuble", chunksize=700, workers=2) == len(df)
+    batch = pd.read_parquet(out)
+    single = compute_scores(pd.read_csv(src), params, "meuble", sort=False)
+    for col in ["expected_price", "cashflow_monthly", "net_yield_%", "investor_score"]:
+        np.testing.assert_allclose(batch[col].values, single[col].values, rtol=1e-9, err_msg=col)
+
+def test_parquet_output_survives_dtype_changes_between_chunks(tmp_path, params):
+    n = 50_000  # read_csv infers dtypes per chunk only past its internal buffer
+    df = pd.DataFrame({"city": "Brest", "price": 100_000, "surface_m2": [40] * n + [40.5] * n,
+                       "url": [None] * n + ["https://x"] * n})
+    src, out = tmp_path / "listings.csv", tmp_path / "scored.parquet"
+    df.to_csv(src, index=False)
+    assert score_file(src, out, params, "meuble", chunksize=n, workers=1) == 2 * n
+    result = pd.read_parquet(out)
+    assert result["surface_m2"].iloc[[0, -1]].tolist() == [40, 40.5]
+    assert result["url"].iloc[-1] == "https://x"
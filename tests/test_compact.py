@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from bench import synthetic
+from core.ranking import filter_mask, top_n
+from core.scoring import attach_columns, compact_listings, compute_scores
+
+METRICS = ["expected_price", "rent_est_monthly", "net_rent_monthly", "monthly_payment", "insurance_monthly",
+           "cashflow_monthly", "gross_yield_%", "net_yield_%", "coc_%", "investor_score"]
+# float32 inputs and outputs (~1e-7 relative): 1e-5 relative plus 0.01 absolute (a cent, or 0.01 point)
+RTOL, ATOL = 1e-5, 1e-2
+
+@pytest.fixture
+def feed():
+    df = synthetic.listings(20_000, seed=3, text=True)
+    return df.assign(city=df["city"].astype(str), property_type=df["property_type"].astype(str))
+
+@pytest.mark.parametrize("strategy", ["nu", "colocation"])
+def test_compact_scores_match_float64(feed, params, strategy):
+    params = dict(params, apport=15_000)
+    full = compute_scores(feed, params, strategy=strategy, sort=False)
+    compact = compute_scores(compact_listings(feed), params, strategy=strategy, compact=True, sort=False)
+    assert compact.index.equals(full.index) and "url" not in compact and "url" in full
+    for col in METRICS:
+        assert compact[col].dtype == np.float32
+        np.testing.assert_allclose(compact[col].values, full[col].values, rtol=RTOL, atol=ATOL, err_msg=col)
+    assert attach_columns(compact.head(5), feed)["url"].tolist() == feed["url"].head(5).tolist()
+
+@pytest.mark.parametrize("key", ["investor_score", "cashflow_monthly", "net_yield_%"])
+def test_compact_ranking_matches_float64(feed, params, key):
+    full = compute_scores(feed, params, sort=False)
+    compact = compute_scores(compact_listings(feed), params, compact=True, sort=False)
+    for only_rentable in (False, True):
+        mask = filter_mask(full, only_rentable=only_rentable)
+        np.testing.assert_array_equal(filter_mask(compact, only_rentable=only_rentable), mask)
+        want = top_n(full, key, 200, mask=mask)
+        got = top_n(compact, key, 200, mask=mask)
+        # Same rows in the same order, up to swaps between rows whose float64 values are within the tolerance
+        same = (got.index == want.index).mean()
+        np.testing.assert_allclose(full.loc[got.index, key].values, want[key].values, rtol=RTOL, atol=2 * ATOL)
+        assert same > 0.95
+    sorted_full = compute_scores(feed, params)
+    assert compute_scores(compact_listings(feed), params, compact=True).index.equals(sorted_full.index)
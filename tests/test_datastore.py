@@ -0,0 +1,30 @@
+import pandas as pd
+from core.datastore import load_csv
+
+def test_rates_keep_float64(tmp_path):
+    src = tmp_path / "rates.csv"
+    pd.DataFrame({"duration_years": [20, 25], "rate_percent": [3.05, 3.11]}).to_csv(src, index=False)
+    df, _ = load_csv(src, store_dir=tmp_path / "store")
+    again, _ = load_csv(src, store_dir=tmp_path / "store")  # memory-mapped copy
+    assert again["rate_percent"].tolist() == [3.05, 3.11]
+    assert df["rate_percent"].dtype == "float64"
+
+def test_read_options_are_part_of_the_key(tmp_path):
+    src = tmp_path / "communes.csv"
+    pd.DataFrame({"city": ["Ajaccio"], "zipcode": ["02000"]}).to_csv(src, index=False)
+    plain, key_plain = load_csv(src, store_dir=tmp_path / "store")
+    text, key_text = load_csv(src, store_dir=tmp_path / "store", dtype={"zipcode": str})
+    compact, key_compact = load_csv(src, store_dir=tmp_path / "store", float_dtype="float32")
+    assert len({key_plain, key_text, key_compact}) == 3
+    assert str(text["zipcode"].iloc[0]) == "02000"
+    assert str(plain["zipcode"].iloc[0]) == "2000"
+
+def test_concurrent_first_loads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    src = tmp_path / "listings.csv"
+    pd.DataFrame({"city": ["Brest", "Lyon"] * 5_000, "price": range(10_000)}).to_csv(src, index=False)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: load_csv(src, store_dir=tmp_path / "store"), range(8)))
+    assert len({key for _, key in results}) == 1
+    assert all(df["price"].sum() == sum(range(10_000)) for df, _ in results)
+    assert [p.suffix for p in (tmp_path / "store").iterdir()] == [".feather"]
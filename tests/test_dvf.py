@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from core.dvf import build_dvf_index, dvf_price_gaps, price_gap_vs_dvf
+
+# No aggregate rows, several zipcode rows per class: coarser levels take the median of the finer medians
+DVF = pd.DataFrame({"city": ["Brest", "Brest", "Brest", "Paris", "Paris"],
+                    "zipcode": ["29200", "29200", "29000", "75015", "75019"],
+                    "property_type": ["appartement", "maison", "appartement", "appartement", "appartement"],
+                    "median_price_sqm": [2600.0, 2400.0, 3000.0, 10500.0, 9000.0]})
+LISTINGS = pd.DataFrame({"city": ["Brest", "Brest", "Brest", "brest ", "Paris", "Paris", "Paris", "Brest", "Lyon"],
+                         "zipcode": ["29200", "29200", "29280", None, "75011", "75019", "75015", "29280", "69001"],
+                         "property_type": ["T2", "Maison", "T3", "Villa", "Studio", "Loft", "Parking", "Local", "T2"]})
+EXPECTED = [(2600.0, "city+zipcode+property_type"), (2400.0, "city+zipcode+property_type"), (2800.0, "city+property_type"),
+            (2400.0, "city+property_type"), (9750.0, "city+property_type"), (9000.0, "city+zipcode+property_type"),
+            (10500.0, "city+zipcode"), (2600.0, "city"), (np.nan, None)]
+
+def _gaps(dvf):
+    df = LISTINGS.assign(price=100_000.0, surface_m2=40.0)
+    return df, dvf_price_gaps(df, build_dvf_index(dvf), "price", "surface_m2", "city", "zipcode", "property_type")
+
+def test_match_levels_without_aggregate_rows():
+    df, gaps = _gaps(DVF)
+    median, level = zip(*EXPECTED)
+    np.testing.assert_array_equal(gaps["dvf_median_price_sqm"].values, median)
+    assert gaps["dvf_match_level"].tolist() == list(level)
+    scalar = [price_gap_vs_dvf(p, s, c, DVF, t, z) for p, s, c, t, z in
+              zip(df["price"], df["surface_m2"], df["city"], df["property_type"], df["zipcode"])]
+    np.testing.assert_allclose(np.array(scalar, dtype=float), gaps["price_gap_vs_dvf_%"].values, rtol=1e-12)
+
+def test_aggregate_rows_take_precedence():
+    agg = pd.DataFrame({"city": ["Brest", "Brest"], "zipcode": [None, None], "property_type": [None, "appartement"],
+                        "median_price_sqm": [2750.0, 2900.0]})
+    _, gaps = _gaps(pd.concat([DVF, agg], ignore_index=True))
+    assert gaps["dvf_median_price_sqm"].tolist()[2] == 2900.0  # Brest appartement, unknown zipcode
+    assert gaps["dvf_median_price_sqm"].tolist()[7] == 2750.0  # Brest, class not in DVF
+    assert price_gap_vs_dvf(100_000.0, 40.0, "Brest", pd.concat([DVF, agg], ignore_index=True)) == \
+        (2500.0 - 2750.0) / 2750.0 * 100.0
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from core.dvf_ingest import ingest_dvf
+
+GROUPS = [("BREST", "29200", "Appartement", "Brest", 2600), ("BREST", "29200", "Maison", "Brest", 2300),
+          ("PARIS 15", "75015", "Appartement", "Paris", 10500), ("PARIS 19", "75019", "Appartement", "Paris", 9000)]
+
+def _official_file(path, n=300, seed=0):
+    """Official yearly file layout: one row per lot, the mutation's value repeated, decimal comma; some
+    mutations have two lots, a dependency without surface, mixed types or a non-sale nature."""
+    rng = np.random.default_rng(seed)
+    rows, sales = [], []
+    for m in range(n * len(GROUPS)):
+        commune, zipcode, kind, city, ppm2 = GROUPS[m % len(GROUPS)]
+        surface = round(float(rng.uniform(20, 120)), 1)
+        value = round(surface * ppm2 * rng.lognormal(0, 0.15), 2) + m / 100  # unique (date, value, zipcode, city)
+        nature = "Echange" if m % 37 == 0 else "Vente"
+        date = f"{1 + m % 28:02d}/0{1 + m % 9}/2024"
+        lots = [surface] if m % 3 else [surface * 0.6, surface * 0.4]
+        for s in lots:
+            rows.append((date, nature, f"{value:.2f}".replace(".", ","), zipcode, commune, kind, f"{s:.1f}".replace(".", ",")))
+        if m % 5 == 0:
+            rows.append((date, nature, f"{value:.2f}".replace(".", ","), zipcode, commune, "Dépendance", ""))
+        mixed = m % 41 == 0
+        if mixed:
+            rows.append((date, nature, f"{value:.2f}".replace(".", ","), zipcode, commune,
+                         "Maison" if kind == "Appartement" else "Appartement", "30,0"))
+        if nature == "Vente" and not mixed:
+            sales.append((city, zipcode, kind.lower(), value / sum(float(f"{s:.1f}") for s in lots)))
+    header = "Date mutation|Nature mutation|Valeur fonciere|Code postal|Commune|Type local|Surface reelle bati"
+    path.write_text("\n".join([header] + ["|".join(r) for r in rows]) + "\n", encoding="utf-8")
+    return pd.DataFrame(sales, columns=["city", "zipcode", "property_type", "price_sqm"])
+
+def _finest(table):
+    fine = table.dropna(subset=["zipcode", "property_type"])
+    fine = fine.assign(property_type=fine["property_type"].str.lower())
+    return fine.set_index(["city", "zipcode", "property_type"]).sort_index()
+
+def test_chunking_does_not_change_medians(tmp_path):
+    _official_file(tmp_path / "vf.txt", n=60)
+    one = ingest_dvf(str(tmp_path / "vf.txt"), chunksize=1_000_000)
+    pd.testing.assert_frame_equal(ingest_dvf(str(tmp_path / "vf.txt"), chunksize=7), one)
+
+def test_sketch_medians_close_to_exact(tmp_path):
+    sales = _official_file(tmp_path / "vf.txt")
+    table = _finest(ingest_dvf(str(tmp_path / "vf.txt"), chunksize=50))
+    exact = sales.groupby(["city", "zipcode", "property_type"])["price_sqm"]
+    assert table["n_sales"].tolist() == exact.size().sort_index().tolist()
+    np.testing.assert_allclose(table["median_price_sqm"].values, exact.median().sort_index().values, rtol=0.01)
+    np.testing.assert_allclose(table["q25_price_sqm"].values, exact.quantile(0.25).sort_index().values, rtol=0.015)
+
+def test_geo_dvf_mutation_ids(tmp_path):
+    path = tmp_path / "geo.csv"
+    pd.DataFrame({"id_mutation": ["a", "a", "b"], "date_mutation": ["2024-01-02"] * 3, "nature_mutation": "Vente",
+                  "valeur_fonciere": [200_000.0, 200_000.0, 90_000.0], "code_postal": "29200", "nom_commune": "Brest",
+                  "type_local": "Appartement", "surface_reelle_bati": [50.0, 30.0, 40.0]}).to_csv(path, index=False)
+    table = _finest(ingest_dvf(str(path), chunksize=2, min_sales=1))
+    assert table["n_sales"].tolist() == [2]
+    assert 2250 * 0.98 <= table["median_price_sqm"].iloc[0] <= 2500 * 1.02  # 200k/80m² and 90k/40m²
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core.finance import amortization_schedule, build_financing_table, pmt, pmt_array
+
+def _loop_schedule(principal, annual_rate, years, insurance_rate_annual):
+    """Month-by-month amortization, as computed before the closed form."""
+    months, rate_m = int(years * 12), annual_rate / 12.0
+    annuity, balance, rows = pmt(rate_m, months, principal), principal, []
+    for i in range(1, months + 1):
+        interest = balance * rate_m
+        balance = max(0.0, balance - (annuity - interest))
+        insurance = principal * insurance_rate_annual / 12.0
+        rows.append((i, annuity, interest, annuity - interest, insurance, annuity + insurance, balance))
+    return pd.DataFrame(rows, columns=["period", "payment_annuity", "interest", "principal_paid", "insurance",
+                                       "payment_total", "balance"])
+
+@pytest.mark.parametrize("principal, rate, years", [(250_000, 0.035, 25), (90_000, 0.0, 10), (400_000, 0.081, 30)])
+def test_closed_form_matches_loop(principal, rate, years):
+    full = amortization_schedule(principal, rate, years, insurance_rate_annual=0.003)
+    expected = _loop_schedule(principal, rate, years, 0.003)
+    for col in expected.columns:
+        np.testing.assert_allclose(full[col].values, expected[col].values, rtol=1e-9, atol=1e-6, err_msg=col)
+    window = amortization_schedule(principal, rate, years, insurance_rate_annual=0.003, first=100, count=24)
+    pd.testing.assert_frame_equal(window.reset_index(drop=True), full.iloc[99:123].reset_index(drop=True))
+
+def test_vector_payments_match_scalar():
+    rates = np.array([0.0, 0.01, 0.035, 0.07]) / 12
+    months = np.array([120, 240, 300])
+    principals = np.array([0.0, 50_000.0, 310_000.0])
+    got = pmt_array(rates[:, None, None], months[None, :, None], principals[None, None, :])
+    expected = [[[pmt(r, n, p) for p in principals] for n in months] for r in rates]
+    np.testing.assert_allclose(got, expected, rtol=1e-12)
+    table = build_financing_table(200_000, {20: 0.032, 25: 0.034}, insurance_rate_annual=0.003, stress_bp=[0, 100])
+    assert table["monthly_payment_total"].tolist() == pytest.approx(
+        [pmt((r + bp / 1e4) / 12, y * 12, 200_000) + 50.0 for y, r in ((20, 0.032), (25, 0.034)) for bp in (0, 100)])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from core.geo import _candidates, _project, build_grid_index, haversine_km, radius_query, viewport_query
+
+CENTRES = {"brest": (48.39, -4.49), "reunion": (-21.11, 55.53), "buenos_aires": (-34.60, -58.38), "tromso": (69.65, 18.96)}
+
+def _points(centre, n=3000, spread=0.6, seed=0):
+    """Points scattered around a centre, with NaN and out-of-range coordinates mixed in."""
+    rng = np.random.default_rng(seed)
+    lat = centre[0] + rng.normal(0, spread, n)
+    lon = centre[1] + rng.normal(0, spread, n)
+    lat[::97], lon[::89] = np.nan, np.nan
+    lat[5], lon[6] = 95.0, -190.0
+    return lat, lon
+
+@pytest.mark.parametrize("name", CENTRES)
+@pytest.mark.parametrize("cell_km", [0.5, 2.0])
+def test_radius_query_matches_haversine(name, cell_km):
+    lat, lon = _points(CENTRES[name])
+    index = build_grid_index(lat, lon, cell_km)
+    rng = np.random.default_rng(1)
+    for qlat, qlon, r in zip(CENTRES[name][0] + rng.normal(0, 0.5, 20), CENTRES[name][1] + rng.normal(0, 0.5, 20),
+                             rng.uniform(0.2, 40, 20)):
+        rows, dist = radius_query(index, qlat, qlon, r)
+        with np.errstate(invalid="ignore"):
+            expected = np.flatnonzero(haversine_km(qlat, qlon, lat, lon) <= r)
+        np.testing.assert_array_equal(np.sort(rows), expected)
+        np.testing.assert_array_equal(dist, np.sort(dist))
+
+@pytest.mark.parametrize("name", CENTRES)
+def test_viewport_query_matches_mask(name):
+    lat, lon = _points(CENTRES[name])
+    index = build_grid_index(lat, lon, 1.0)
+    la, lo = CENTRES[name]
+    for d in (0.01, 0.3, 2.0, 50.0):
+        box = (la - d, la + d / 2, lo - d / 2, lo + d)
+        with np.errstate(invalid="ignore"):
+            mask = (lat >= box[0]) & (lat <= box[1]) & (lon >= box[2]) & (lon <= box[3])
+            mask &= (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        np.testing.assert_array_equal(viewport_query(index, *box), np.flatnonzero(mask))
+
+@pytest.mark.parametrize("name", CENTRES)
+def test_candidates_are_exactly_the_overlapping_cells(name):
+    lat, lon = _points(CENTRES[name])
+    index = build_grid_index(lat, lon, 1.0)
+    x, y = _project(index["lat"], index["lon"], index["lat0"])
+    cx, cy = np.floor(x), np.floor(y)
+    x0, y0 = _project(*CENTRES[name], index["lat0"])
+    for half in (0.3, 5.0, 500.0):  # the widest box takes the occupied-cells scan
+        box = (x0 - half, x0 + half, y0 - half, y0 + half)
+        inside = (cx >= np.floor(box[0])) & (cx <= np.floor(box[1])) & (cy >= np.floor(box[2])) & (cy <= np.floor(box[3]))
+        np.testing.assert_array_equal(np.sort(_candidates(index, *box)), np.flatnonzero(inside))
+
+def test_empty_index():
+    index = build_grid_index([np.nan], [np.nan])
+    assert len(radius_query(index, 48.0, -4.0, 10.0)[0]) == 0
+    assert len(viewport_query(index, 47.0, 49.0, -5.0, -3.0)) == 0
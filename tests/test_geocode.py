@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from core.geocode import build_geocoder, city_key, geocode, load_geocoder
+
+TABLE = pd.DataFrame({
+    "city": ["Paris", "Paris", "Lyon", "Saint-Denis", "Saint-Denis", "Saint-Étienne", "Brest"],
+    "zipcode": ["75015", "75019", "69003", "97400", "93200", "42000", "29200"],
+    "lat": [48.84, 48.88, 45.76, -20.88, 48.94, 45.44, 48.39],
+    "lon": [2.29, 2.38, 4.85, 55.45, 2.36, 4.39, -4.49],
+})
+
+def test_city_key_normalization():
+    got = city_key(["Saint-Étienne", "ST ETIENNE ", "Paris 15e", "Lyon 3ème arrondissement", "PARIS 19",
+                    "Marseille Cedex 08", "  ", None]).tolist()
+    assert got[:6] == ["saint etienne", "saint etienne", "paris", "lyon", "paris", "marseille"]
+    assert pd.isna(got[6]) and pd.isna(got[7])
+
+def test_match_levels():
+    geo = geocode(build_geocoder(TABLE),
+                  ["Paris 15e", "paris", "Inconnue", "Saint Denis", "St-Denis", "Brset", "Lyon 3ème arrondissement", "Nulle part", None],
+                  ["75015", None, "29200", "93200", None, "29200", "69099", None, "42000"])
+    assert geo["geo_match"].tolist() == ["ville+cp", "ville", "cp", "ville+cp", "ville", "cp", "ville", None, "cp"]
+    np.testing.assert_allclose(geo["lat"].values[:7], [48.84, 48.86, 48.39, 48.94, -20.88, 48.39, 45.76])
+    assert np.isnan(geo["lat"].values[7])
+    # City + zipcode absent from the table falls back to the city; a typo without zipcode to the fuzzy match
+    fuzzy = geocode(build_geocoder(TABLE), ["Bresst", "Saint Etiene", "Bresst"], [None, None, "00000"])
+    assert fuzzy["geo_match"].tolist() == ["approx", "approx", "approx"]
+    assert geocode(build_geocoder(TABLE), ["Bresst"], fuzzy=False)["geo_match"].tolist() == [None]
+
+def test_distinct_pairs_broadcast_back(listings):
+    geocoder = load_geocoder()
+    cities = pd.concat([listings["city"]] * 3, ignore_index=True)
+    geo = geocode(geocoder, cities)
+    one = geocode(geocoder, listings["city"])
+    np.testing.assert_array_equal(geo["lat"].values, np.tile(one["lat"].values, 3))
+    assert geo["geo_match"].notna().all()
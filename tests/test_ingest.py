@@ -0,0 +1,15 @@
+import pandas as pd
+from core.ingest import deduplicate, normalize_listings
+
+def _feed(source, zipcodes, prices=(200_000, 310_000)):
+    return normalize_listings(pd.DataFrame({"price": prices, "surface": [45.0, 70.0], "city": ["Brest", "Brest"],
+                                            "zipcode": zipcodes, "type": ["T2", "T3"]}), source)
+
+def test_missing_zipcode_still_merges():
+    merged = deduplicate(pd.concat([_feed("a", ["29200", "29200"]), _feed("b", [None, None], (201_000, 309_000))],
+                                   ignore_index=True))
+    assert len(merged) == 2 and merged["dup_count"].tolist() == [2, 2]
+
+def test_conflicting_zipcodes_do_not_merge():
+    merged = deduplicate(pd.concat([_feed("a", ["29200", "29200"]), _feed("b", ["29280", "29200"])], ignore_index=True))
+    assert merged["dup_count"].tolist() == [1, 2, 1]
@@ -0,0 +1,22 @@
+import numpy as np
+from bench.synthetic import listings as synthetic_listings
+from core.montecarlo import monte_carlo
+from core.scoring import compute_scores
+
+def test_zero_volatility_matches_cashflow(listings, params):
+    params = dict(params, vacancy_rate=0.0)  # no vacancy draws
+    flat = {"rent_growth_mu": 0.0, "rent_growth_sigma": 0.0, "capex_shock_prob": 0.0}
+    risk = monte_carlo(listings, params, "meuble", n_paths=50, horizon_years=1, assumptions=flat, irr_paths=0)
+    expected = compute_scores(listings, params, strategy="meuble", sort=False)["cashflow_monthly"]
+    for col in ("mc_cf_p5", "mc_cf_p50", "mc_cf_p95"):
+        np.testing.assert_allclose(risk[col].values, expected.values, rtol=1e-9, atol=1e-6)
+
+def test_chunking_does_not_change_results(params):
+    df = synthetic_listings(300, seed=6)
+    whole = monte_carlo(df, params, n_paths=200, irr_paths=50)
+    np.testing.assert_allclose(monte_carlo(df, params, n_paths=200, irr_paths=50, chunk_rows=37).values, whole.values)
+
+def test_irr_equity_is_cash_paid_in(listings, params):
+    from core.montecarlo import listing_coefficients
+    *_, cash_in = listing_coefficients(listings, dict(params, apport=20_000.0, travaux=15_000.0))
+    np.testing.assert_allclose(cash_in, 20_000.0)
@@ -0,0 +1,49 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from bench.synthetic import listings
+from core.portfolio import _problem, optimize_portfolio, portfolio_inputs
+from core.scoring import compute_scores
+
+def _brute_force(scored, params, objective, constraints):
+    """Best feasible subset value, enumerating every subset."""
+    inputs = portfolio_inputs(scored, params, objective)
+    R, caps = _problem(inputs, constraints)
+    v, city = inputs["value"].values, scored["city"].values
+    best = 0.0
+    for k in range(1, (constraints.get("max_biens", 0) or len(v)) + 1):
+        for subset in combinations(range(len(v)), k):
+            s = list(subset)
+            if (np.all(R[s].sum(axis=0) <= caps + 1e-9) and np.isfinite(v[s]).all()
+                    and np.unique(city[s], return_counts=True)[1].max() <= constraints["max_par_ville"]):
+                best = max(best, v[s].sum())
+    return best
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("apport", [0.0, 8_000.0])  # debt ratio binding / equity binding
+def test_matches_brute_force(params, seed, apport):
+    params = dict(params, apport=apport)
+    scored = compute_scores(listings(2_000, seed=seed), params)
+    scored = scored.iloc[np.random.default_rng(seed).choice(len(scored), 13, replace=False)]
+    scored = scored.assign(city=np.array(["A", "B", "C", "D"])[np.arange(13) % 4])
+    constraints = {"apport_total": 40_000.0, "revenus_mensuels": 4_000.0, "max_par_ville": 2, "max_biens": 0}
+    for objective in ("investor_score", "cashflow_monthly"):
+        expected = _brute_force(scored, params, objective, constraints)
+        _, exact = optimize_portfolio(scored, params, objective, constraints, method="exact")
+        _, heuristic = optimize_portfolio(scored, params, objective, constraints, method="heuristic")
+        assert exact["optimal"] and exact["value"] == pytest.approx(expected)
+        assert heuristic["value"] == pytest.approx(expected)  # restricted branch and bound covers 13 candidates
+
+def test_pruned_pool_keeps_heuristic_value(params, monkeypatch):
+    import core.portfolio as portfolio
+    scored = compute_scores(listings(5_000, seed=4), params)
+    constraints = {"apport_total": 500_000.0, "revenus_mensuels": 30_000.0}
+    _, pruned = optimize_portfolio(scored, params, "cashflow_monthly", constraints)
+    monkeypatch.setattr(portfolio, "_prune", lambda v, R, city, max_city, size, b=0: np.arange(len(v)))
+    _, full = optimize_portfolio(scored, params, "cashflow_monthly", constraints)
+    assert pruned["value"] >= full["value"] - 1e-6
+
+def test_equity_is_cash_paid_in(listings, params):
+    params = dict(params, apport=10_000.0, travaux=12_000.0)  # the loan covers fees and travaux beyond apport
+    inputs = portfolio_inputs(compute_scores(listings, params), params)
+    np.testing.assert_allclose(inputs["equity"].values, 10_000.0)
@@ -0,0 +1,28 @@
+import json
+import sys
+import pytest
+from core import profiling
+from core.profiling import Profiler, peak_rss_mb, rss_mb
+
+def test_rss_is_none_without_proc(monkeypatch):
+    def no_proc(*args, **kwargs):
+        raise OSError
+    monkeypatch.setattr("builtins.open", no_proc)
+    assert rss_mb() is None
+    prof = Profiler()
+    with prof.stage("step"):
+        pass
+    assert prof.records[0]["mem_delta_mb"] is None
+
+@pytest.mark.parametrize("platform, maxrss, expected", [("darwin", 300_000_000, 300.0), ("linux", 300_000, 307.2)])
+def test_peak_rss_units(monkeypatch, platform, maxrss, expected):
+    resource = pytest.importorskip("resource")
+    monkeypatch.setattr(profiling.sys, "platform", platform)
+    monkeypatch.setattr(resource, "getrusage", lambda who: type("Usage", (), {"ru_maxrss": maxrss})())
+    assert peak_rss_mb() == pytest.approx(expected)
+
+def test_current_rss_below_peak():
+    if sys.platform != "linux":
+        pytest.skip("/proc only")
+    assert 0 < rss_mb() <= peak_rss_mb() * 1.01
+    assert json.loads(Profiler().to_json())["peak_rss_mb"] > 0
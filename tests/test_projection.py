@@ -0,0 +1,37 @@
+import numpy as np
+from core.finance import amortization_schedule, loan_years, irr, npv
+from core.params import DEFAULT_PARAMS
+from core.projection import projection_metrics
+from core.scoring import compute_scores
+
+def test_loan_years_matches_monthly_schedule():
+    principals = np.array([80_000.0, 250_000.0])
+    years = loan_years(principals, 0.0311, 20, 25, 0.003)
+    for i, p in enumerate(principals):
+        sched = amortization_schedule(p, 0.0311, 20, 0.003)
+        by_year = sched.groupby((sched["period"] - 1) // 12)[["interest", "principal_paid", "insurance"]].sum()
+        for col in by_year.columns:
+            np.testing.assert_allclose(years[col][i, :20], by_year[col].values, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(years["balance"][i, :20], sched["balance"].values[11::12], atol=1e-6)
+        assert np.all(years["interest"][i, 20:] == 0)
+
+def test_irr_zeroes_npv():
+    flows = np.array([[-30_000.0, 2_000, 2_000, 2_000, 40_000], [-10_000.0, 500, 500, 500, 11_000]])
+    rates = irr(flows)
+    np.testing.assert_allclose(npv(flows, rates), 0.0, atol=1e-4)
+
+def test_projection_defaults_come_from_params(listings, params):
+    without = {k: v for k, v in params.items() if k not in ("proj_horizon", "discount_rate", "price_growth")}
+    a = projection_metrics(listings, params, "meuble")
+    b = projection_metrics(listings, without, "meuble")
+    assert params["proj_horizon"] == DEFAULT_PARAMS["proj_horizon"]
+    np.testing.assert_allclose(a["npv"].values, b["npv"].values)
+
+def test_year0_flow_is_cash_paid_in(listings, params):
+    from core.projection import project
+    params = dict(params, apport=20_000.0, travaux=15_000.0)  # loan covers price, notary fees and travaux beyond apport
+    flows = project(listings, params, "meuble")["flows"]
+    np.testing.assert_allclose(flows[:, 0], -20_000.0)
+    cash = compute_scores(listings, dict(params, apport=1e7), sort=False)  # no loan: the whole cost is paid in
+    no_loan = project(listings, dict(params, apport=1e7), "meuble")["flows"]
+    np.testing.assert_allclose(no_loan[:, 0], -(cash["expected_price"].values * (1 + params["frais_notaires"]) + 15_000.0))
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from core.ranking import top_n
+
+def test_top_n_matches_full_sort():
+    rng = np.random.default_rng(0)
+    score = rng.integers(0, 50, 2_000).astype(float)  # many ties
+    score[rng.random(2_000) < 0.1] = np.nan
+    df = pd.DataFrame({"score": score}, index=rng.permutation(2_000))
+    mask = rng.random(2_000) < 0.7
+    for n in (1, 10, 500, 5_000):
+        for ascending in (False, True):
+            expected = df.sort_values("score", ascending=ascending, kind="stable", na_position="last").head(n)
+            assert top_n(df, "score", n, ascending=ascending).index.equals(expected.index)
+        expected = df[mask].sort_values("score", ascending=False, kind="stable", na_position="last").head(n)
+        assert top_n(df, "score", n, mask=mask).index.equals(expected.index)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from core.finance import pmt_array, amortization_schedule
+from core.rates import build_surface, payment_lookup, capacity_lookup, rate_history, rates_by_years
+
+def _exact(principal, rate, years, insurance):
+    return pmt_array(rate / 12.0, years * 12, principal) + principal * insurance / 12.0
+
+def test_surface_lookup_matches_annuity_inside_grid():
+    surface = build_surface(0.003)
+    rng = np.random.default_rng(0)
+    rate, years = rng.uniform(0.005, 0.075, 2000), rng.integers(5, 31, 2000)
+    np.testing.assert_allclose(payment_lookup(surface, 250_000, rate, years), _exact(250_000, rate, years, 0.003), rtol=1e-4)
+    np.testing.assert_allclose(capacity_lookup(surface, _exact(250_000, rate, years, 0.003), rate, years), 250_000, rtol=1e-4)
+
+def test_surface_lookup_is_exact_outside_grid():
+    surface = build_surface(0.003)
+    for rate, years in [(0.035, 3), (0.035, 35), (0.09, 25), (0.12, 15)]:
+        np.testing.assert_allclose(payment_lookup(surface, 250_000, rate, years), _exact(250_000, rate, years, 0.003), rtol=1e-12)
+
+def test_rate_history_from_snapshots():
+    snap = pd.DataFrame({"duration_years": [20, 25, 25], "rate_percent": [3.0, 3.1, 3.3]})
+    history = rate_history([snap, snap.assign(rate_percent=snap["rate_percent"] + 1)], ["rates_2025-07.csv", "rates_2025-08.csv"])
+    assert list(history["date"].dt.strftime("%Y-%m").unique()) == ["2025-07", "2025-08"]
+    assert np.isclose(history.loc[history["duration_years"] == 25, "rate"].iloc[0], 0.032)
+    assert rates_by_years(snap) == {20: 0.03, 25: 0.033}
+
+def test_amortization_window_matches_full_schedule():
+    full = amortization_schedule(250_000, 0.0311, 25, 0.003)
+    window = amortization_schedule(250_000, 0.0311, 25, 0.003, first=100, count=24)
+    pd.testing.assert_frame_equal(window.reset_index(drop=True), full.iloc[99:123].reset_index(drop=True))
+    assert len(amortization_schedule(250_000, 0.0311, 25, first=290, count=24)) == 11
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from bench import synthetic
+from core.rents import apply_rent_cap, build_rent_index, estimate_rent_per_m2, estimate_rent_per_m2_batch
+from core.scoring import compute_scores, strategy_multiplier
+
+@pytest.fixture
+def feed():
+    """Synthetic listings and rent benchmark, plus cities and types the benchmark does not know."""
+    cities = synthetic.make_cities(40, seed=5)
+    df = synthetic.listings(400, cities=cities, seed=5)
+    df = df.assign(city=df["city"].astype(str), property_type=df["property_type"].astype(str))
+    df.loc[::7, "city"] = "Nowhere"
+    df.loc[::5, "property_type"] = "Loft"
+    return df, synthetic.rent_grid(cities, seed=5, coverage=0.6)
+
+def test_batch_matches_scalar(feed, rents, params):
+    df, bench = feed
+    for b in (bench, rents, None):
+        expected = [estimate_rent_per_m2(c, t, b, params["rpm2_fallback"]) for c, t in zip(df["city"], df["property_type"])]
+        got = estimate_rent_per_m2_batch(df["city"], df["property_type"], build_rent_index(b), params["rpm2_fallback"])
+        np.testing.assert_array_equal(got, expected)
+
+def test_compute_scores_matches_row_wise(listings, rents, params):
+    params = dict(params, rent_bench_df=rents, cap_per_m2=25.0)
+    for strategy in ("nu", "meuble", "colocation"):
+        def row_rent(row):  # the former DataFrame.apply
+            rpm2 = estimate_rent_per_m2(row["city"], row["property_type"], rents, params["rpm2_fallback"])
+            est = row["surface_m2"] * rpm2 * strategy_multiplier(strategy)
+            return apply_rent_cap(est, row["surface_m2"], params["cap_per_m2"],
+                                  params["apply_cap"] and row["city"].lower() in params["rent_control_cities"])
+        scored = compute_scores(listings, params, strategy=strategy, sort=False)
+        np.testing.assert_array_equal(scored["rent_est_monthly"].values, listings.apply(row_rent, axis=1).values)
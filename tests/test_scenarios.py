@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from core.scenarios import robust_scores, scenario_cube
+from core.scoring import compute_scores
+
+METRICS = ["cashflow_monthly", "gross_yield_%", "net_yield_%", "coc_%", "investor_score"]
+
+@pytest.mark.parametrize("strategy", ["nu", "meuble", "colocation"])
+def test_base_scenario_matches_compute_scores(listings, rents, params, strategy):
+    params = dict(params, rent_bench_df=rents, apport=20_000)
+    cube = scenario_cube(listings, params, rate_bp=(0, 100), durations=(15, params["duree_annees"]),
+                         strategies=("nu", "meuble", "colocation"))
+    base = cube[(cube["rate_bp"] == 0) & (cube["duration_years"] == params["duree_annees"]) & (cube["strategy"] == strategy)]
+    scored = compute_scores(listings, params, strategy=strategy, sort=False)
+    np.testing.assert_array_equal(base["listing"].values, listings.index.values)
+    for col in METRICS:
+        np.testing.assert_allclose(base[col].values, scored[col].values, rtol=1e-12, err_msg=col)
+
+def test_rate_stress_lowers_cashflow(listings, rents, params):
+    cube = scenario_cube(listings, dict(params, rent_bench_df=rents), rate_bp=(0, 200), durations=(20,), strategies=("nu",))
+    cf = cube.pivot(index="listing", columns="rate_bp", values="cashflow_monthly")
+    assert (cf[200] < cf[0]).all()
+    robust = robust_scores(cube)
+    assert (robust["worst_cashflow_monthly"] == cf[200].loc[robust.index]).all()
@@ -0,0 +1,12 @@
+import numpy as np
+from core.scoring import compute_scores
+
+def test_stage_cache_follows_rent_bench(listings, rents, params):
+    cache = {}
+    params = dict(params, rent_bench_df=rents)
+    compute_scores(listings, params, cache=cache, data_key="listings")
+    edited = rents.assign(rent_per_m2=rents["rent_per_m2"] * 1.1)  # same shape, new content
+    cached = compute_scores(listings, dict(params, rent_bench_df=edited), cache=cache, data_key="listings")
+    assert "rent_lookup" in cache["_last_recomputed"]
+    fresh = compute_scores(listings, dict(params, rent_bench_df=edited))
+    np.testing.assert_allclose(cached["rent_est_monthly"].to_numpy(float), fresh["rent_est_monthly"].to_numpy(float))
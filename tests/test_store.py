@@ -0,0 +1,41 @@
+import threading
+import numpy as np
+import pandas as pd
+from core.scoring import compute_scores
+from core.store import open_store, upsert_snapshot, query_scores, SCORE_COLUMNS
+
+def _feed(prefix, n=2000):
+    return pd.DataFrame({"id": [f"{prefix}{i}" for i in range(n)], "city": "Brest", "zipcode": "29200",
+                         "price": 100_000.0 + np.arange(n), "surface_m2": 40.0, "days_on_market": 10.0})
+
+def test_concurrent_upserts_on_separate_connections(tmp_path):
+    path = tmp_path / "store.sqlite"
+    open_store(path).close()
+    errors = []
+
+    def run(prefix):
+        try:
+            upsert_snapshot(open_store(path), _feed(prefix))
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(p,)) for p in "abc"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert open_store(path).execute("SELECT COUNT(*) FROM listings").fetchone()[0] == 6000
+
+def test_incremental_rescore_matches_full_scoring(tmp_path, listings, params):
+    conn = open_store(tmp_path / "store.sqlite")
+    upsert_snapshot(conn, listings, seen_on="2025-08-01")
+    query_scores(conn, params, "meuble")
+    changed = listings.copy()
+    changed.loc[0, "price"] = 99_000
+    upsert_snapshot(conn, changed, seen_on="2025-08-02")
+    _, scores = query_scores(conn, params, "meuble")
+    full = compute_scores(changed, params, "meuble", sort=False)
+    full.index = changed["id"].astype(str).values
+    np.testing.assert_allclose(scores.loc[full.index, SCORE_COLUMNS].values.astype(float),
+                               full[SCORE_COLUMNS].values.astype(float), rtol=1e-9)
@@ -0,0 +1,56 @@
+import numpy as np
+from core.params import DEFAULT_PARAMS
+from core.tax import DEFICIT_YEARS, GLOBAL_DEFICIT_CAP, depreciation, income_tax
+
+def _projection(n=40, H=15, seed=0):
+    rng = np.random.default_rng(seed)
+    rent = rng.uniform(6_000, 12_000, (n, 1)) * 1.015 ** np.arange(H)
+    net_rent = rent * 0.75 - rng.uniform(0, 9_000, (n, H)) * (rng.random((n, H)) < 0.3)  # some work years
+    interest = rng.uniform(2_000, 8_000, (n, 1)) * np.linspace(1, 0.3, H)
+    return ({"rent": rent, "net_rent": net_rent, "interest": interest, "insurance": np.full((n, H), 300.0)},
+            {"expected_price": rng.uniform(100_000, 250_000, n), "notary_fees": rng.uniform(7_000, 18_000, n)})
+
+def _use(result, stock, h):
+    for y in range(max(0, h - DEFICIT_YEARS), h):  # oldest deficits first
+        used = min(max(result, 0.0), stock[y])
+        stock[y] -= used
+        result -= used
+    return result
+
+def _reference(regime, proj, x, params):
+    """Year by year, listing by listing."""
+    rate = params["tmi"] + params["social_rate"]
+    n, H = proj["rent"].shape
+    dep = depreciation(x, params, H)
+    out = np.zeros((n, H))
+    for i in range(n):
+        stock, ard = [0.0] * H, 0.0
+        for h in range(H):
+            before = proj["net_rent"][i, h]
+            result = before - proj["interest"][i, h] - proj["insurance"][i, h]
+            if regime == "reel_foncier":
+                global_part = min(max(-before, 0.0), GLOBAL_DEFICIT_CAP)
+                out[i, h] = max(_use(result, stock, h), 0.0) * rate - global_part * params["tmi"]
+                stock[h] = max(-result, 0.0) - global_part
+            else:
+                result = _use(result, stock, h)
+                stock[h] = max(-result, 0.0)
+                available = dep[i, h] + ard
+                used = min(max(result, 0.0), available)
+                ard = available - used
+                out[i, h] = max(result - used, 0.0) * rate
+    return out
+
+def test_real_regimes_match_scalar_reference():
+    params = dict(DEFAULT_PARAMS, travaux=20_000)
+    proj, x = _projection()
+    for regime in ("reel_foncier", "lmnp_reel"):
+        np.testing.assert_allclose(income_tax(regime, proj, x, params), _reference(regime, proj, x, params),
+                                   rtol=1e-9, atol=1e-6, err_msg=regime)
+
+def test_micro_regimes_and_defaults():
+    proj, x = _projection()
+    params = {k: v for k, v in DEFAULT_PARAMS.items() if k not in ("tmi", "social_rate")}
+    tax = income_tax("micro_bic", proj, x, params)
+    expected = proj["rent"] * (1 - params["vacancy_rate"]) * 0.5 * (DEFAULT_PARAMS["tmi"] + DEFAULT_PARAMS["social_rate"])
+    np.testing.assert_allclose(tax, expected)